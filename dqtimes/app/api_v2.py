@@ -19,12 +19,27 @@ import asyncio
 from enum import Enum
 import tempfile
 import os
+import time
 
 # Import local - ajustado para funcionar com a estrutura do projeto
 try:
     from aplicacao import forecast_temp
+    from aquecimento import agendar_aquecimento, estado_prontidao
+    import memoria_series
+    import estado_modelos
+    from coalescencia import coalescedor, chave_conteudo
+    import microlote
+    import intervalos
+    import interpolacao
 except ImportError:
     from .aplicacao import forecast_temp
+    from .aquecimento import agendar_aquecimento, estado_prontidao
+    from . import memoria_series
+    from . import estado_modelos
+    from .coalescencia import coalescedor, chave_conteudo
+    from . import microlote
+    from . import intervalos
+    from . import interpolacao
 
 # ================== CONFIGURAÇÃO INICIAL ==================
 
@@ -61,6 +76,11 @@ app = FastAPI(
     }
 )
 
+@app.on_event("startup")
+async def startup_event():
+    """Dispara o aquecimento em segundo plano; /ready responde 503 até concluir"""
+    agendar_aquecimento(asyncio.get_running_loop())
+
 # ================== MODELOS PYDANTIC ==================
 
 class LoginRequest(BaseModel):
@@ -99,6 +119,10 @@ class ForecastRequest(BaseModel):
     n_projections: int = Field(..., ge=1, le=365, description="Número de projeções")
     method: Optional[str] = Field("auto", description="Método de previsão")
     confidence_level: Optional[float] = Field(0.95, ge=0.5, le=0.99, description="Nível de confiança")
+    seasonal_periods: Optional[List[int]] = Field(None, max_items=20, description="Períodos sazonais a avaliar (padrão: varredura fixa [3, 4, 5, 6, 7, 14, 30])")
+    detect_seasonality: Optional[bool] = Field(None, description="Sem seasonal_periods, avalia só os períodos detectados na série (padrão: SEASONALITY_DETECTION, desligada)")
+    deadline_ms: Optional[int] = Field(None, ge=1, le=600000, description="Prazo da seleção de modelo; ao esgotar, vence o melhor candidato avaliado")
+    series_id: Optional[str] = Field(None, min_length=1, max_length=200, description="Identificador estável da série; repete o modelo vencedor da última previsão")
 
     @validator('data')
     def validate_data(cls, v):
@@ -106,14 +130,49 @@ class ForecastRequest(BaseModel):
             raise ValueError('Dados não podem conter NaN ou valores infinitos')
         return v
 
+    @validator('seasonal_periods')
+    def validate_seasonal_periods(cls, v):
+        if v is not None and (not v or any(p < 2 for p in v)):
+            raise ValueError('Períodos sazonais devem ser inteiros >= 2')
+        return v
+
 class ForecastResponse(BaseModel):
     """Modelo para resposta de previsão"""
     projections: List[float] = Field(..., description="Valores projetados")
     confidence_intervals: List[Dict[str, float]] = Field(..., description="Intervalos de confiança")
+    bootstrap_paths: int = Field(0, description="Caminhos bootstrap usados nos intervalos (0: sem resíduos suficientes)")
     method_used: str = Field(..., description="Método utilizado")
-    metrics: Dict[str, float] = Field(..., description="Métricas de qualidade")
+    metrics: Dict[str, Optional[float]] = Field(
+        ..., description="Métricas do modelo vencedor na testemunha (None quando indefinidas)")
     probability_increase: float = Field(..., ge=0, le=1, description="Probabilidade de aumento")
     execution_time: float = Field(..., description="Tempo de execução em segundos")
+    seasonal_periods: Optional[List[int]] = Field(None, description="Períodos sazonais avaliados")
+    candidates_evaluated: List[str] = Field(default_factory=list, description="Candidatos avaliados (método_período)")
+    budget_exhausted: bool = Field(False, description="Se o prazo (deadline_ms) encerrou a seleção antes do fim")
+    selected_model: Optional[str] = Field(None, description="Candidato vencedor (método_período)")
+    full_tournament: bool = Field(True, description="Se todos os candidatos foram disputados (False: modelo lembrado pelo series_id)")
+    continuation_available: bool = Field(False, description="Se o estado do modelo foi gravado para /forecast/continue")
+
+class ContinueRequest(BaseModel):
+    """Modelo para continuar uma série a partir do estado gravado"""
+    series_id: str = Field(..., min_length=1, max_length=200, description="series_id usado em /forecast/single")
+    new_data: List[float] = Field(..., min_items=1, max_items=10000, description="Somente as observações novas")
+    n_projections: int = Field(..., ge=1, le=365, description="Número de projeções")
+
+    @validator('new_data')
+    def validate_new_data(cls, v):
+        if any(np.isnan(x) or np.isinf(x) for x in v):
+            raise ValueError('Dados não podem conter NaN ou valores infinitos')
+        return v
+
+class ContinueResponse(BaseModel):
+    """Modelo para resposta da continuação"""
+    projections: List[float] = Field(..., description="Valores projetados a partir do estado atualizado")
+    fitted: List[float] = Field(..., description="Valores ajustados para as observações novas")
+    probability_increase: float = Field(..., ge=0, le=1, description="Probabilidade de aumento")
+    model: str = Field(..., description="Modelo continuado (método_período)")
+    observations: int = Field(..., description="Observações acumuladas no estado")
+    execution_time: float = Field(..., description="Tempo de execução em segundos")
 
 class HistoryItem(BaseModel):
     """Modelo para item do histórico"""
@@ -468,29 +527,53 @@ async def forecast_single(
 
     try:
         # Chamar função de previsão
-        result = forecast_temp(request.data, request.n_projections)
+        opcoes = {"periods": request.seasonal_periods, "deadline_ms": request.deadline_ms,
+                  "detectar": request.detect_seasonality}
+        # A memória por série é separada por usuário
+        series_key = f"{current_user['user_id']}:{request.series_id}" if request.series_id else None
+
+        def calcular():
+            if series_key is None:
+                return forecast_temp(request.data, request.n_projections, **opcoes), False
+            result = memoria_series.prever(request.data, request.n_projections, series_key, **opcoes)
+            estado_gravado = (estado_modelos.persistencia_habilitada() and
+                              estado_modelos.registrar_resultado(series_key, request.data, result) is not None)
+            return result, estado_gravado
+
+        async def calcular_em_lote():
+            # Previsões simples concorrentes são fundidas em um micro-lote vetorizado
+            result = await microlote.agendador.submeter(
+                request.data, request.n_projections, request.seasonal_periods, request.detect_seasonality)
+            return result, False
+
+        em_lote = (microlote.microlote_habilitado() and series_key is None
+                   and request.deadline_ms is None)
+
+        # Requisições idênticas em voo compartilham o mesmo cálculo
+        chave = chave_conteudo("forecast_single", request.data, request.n_projections,
+                               request.seasonal_periods, request.detect_seasonality, request.deadline_ms, series_key)
+        result, estado_gravado = await coalescedor.executar(
+            chave, calcular_em_lote if em_lote else calcular)
 
         # Preparar resposta
         projections = result["final_projection"][0][:request.n_projections]
 
-        # Calcular intervalos de confiança
-        confidence_intervals = []
-        z_score = 1.96 if request.confidence_level == 0.95 else 2.58
-        std_dev = np.std(request.data) * 0.1
-
-        for proj in projections:
-            confidence_intervals.append({
-                "lower": float(proj - z_score * std_dev),
-                "upper": float(proj + z_score * std_dev)
-            })
+        # Intervalos por bootstrap dos erros um passo à frente do vencedor na testemunha
+        # (os últimos 30% da série, como no forecast_temp); com prazo, B é o que cabe no restante
+        restante_ms = None
+        if request.deadline_ms is not None:
+            restante_ms = request.deadline_ms - (time.time() - start_time) * 1000
+        inferior, superior, caminhos = intervalos.motor.intervalos(
+            projections,
+            intervalos.residuos_um_passo(request.data, result["final_projection"][0],
+                                         result["metodo_vencedor"], int(len(request.data) * 0.3)),
+            request.confidence_level or 0.95,
+            restante_ms,
+        )
+        confidence_intervals = [{"lower": float(l), "upper": float(u)} for l, u in zip(inferior, superior)]
 
-        # Métricas (simuladas para demonstração)
-        metrics = {
-            "mse": float(np.random.uniform(10, 20)),
-            "rmse": float(np.random.uniform(3, 5)),
-            "mape": float(np.random.uniform(2, 5)),
-            "r_squared": float(np.random.uniform(0.85, 0.95))
-        }
+        # Métricas do vencedor na testemunha, reaproveitando os resíduos da seleção
+        metrics = result["metricas_testemunha"]
 
         execution_time = time.time() - start_time
 
@@ -501,12 +584,17 @@ async def forecast_single(
             parameters={
                 "n_projections": request.n_projections,
                 "method": request.method,
-                "confidence_level": request.confidence_level
+                "confidence_level": request.confidence_level,
+                "seasonal_periods": request.seasonal_periods,
+                "detect_seasonality": request.detect_seasonality,
+                "deadline_ms": request.deadline_ms,
+                "series_id": request.series_id
             },
             result={
                 "projections_count": len(projections),
                 "probability_increase": result["probabilidade_subir"],
-                "execution_time": execution_time
+                "execution_time": execution_time,
+                "budget_exhausted": result["orcamento_esgotado"]
             }
         )
 
@@ -515,8 +603,15 @@ async def forecast_single(
             confidence_intervals=confidence_intervals,
             method_used=request.method,
             metrics=metrics,
+            bootstrap_paths=caminhos,
             probability_increase=float(result["probabilidade_subir"]),
-            execution_time=execution_time
+            execution_time=execution_time,
+            seasonal_periods=result["periodos_avaliados"],
+            candidates_evaluated=result["candidatos_avaliados"],
+            budget_exhausted=result["orcamento_esgotado"],
+            selected_model=f"{result['metodo_vencedor']}_{result['periodo_vencedor']}",
+            full_tournament=result.get("torneio_completo", True),
+            continuation_available=estado_gravado
         )
 
     except Exception as e:
@@ -542,6 +637,8 @@ async def forecast_batch(
     file: UploadFile = File(..., description="Arquivo CSV com múltiplas séries"),
     n_projections: int = Form(..., ge=1, le=365, description="Número de projeções"),
     parallel_processing: bool = Form(True, description="Usar processamento paralelo"),
+    deadline_ms: Optional[int] = Form(None, ge=1, le=600000, description="Prazo total do lote; cada série usa o que resta"),
+    fill_gaps: Optional[str] = Form(None, description="Preenche lacunas internas antes da previsão: linear, gaussian ou polynomial"),
     current_user: dict = Depends(verify_token)
 ):
     """
@@ -554,6 +651,9 @@ async def forecast_batch(
     **Processamento:**
     - Paralelo: Usa múltiplos workers
     - Serial: Processa uma série por vez
+    - deadline_ms: séries processadas após o prazo usam só os candidatos mais baratos
+    - fill_gaps: lacunas internas de todas as colunas são interpoladas de uma vez;
+      sem ele, as células vazias são descartadas
     """
     # Validar arquivo
     if not file.filename.endswith('.csv'):
@@ -562,6 +662,12 @@ async def forecast_batch(
             detail="Arquivo deve ser CSV"
         )
 
+    if fill_gaps is not None and fill_gaps not in interpolacao.METODOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"fill_gaps deve ser um de: {', '.join(interpolacao.METODOS)}"
+        )
+
     contents = await file.read()
 
     # Validar tamanho
@@ -579,12 +685,25 @@ async def forecast_batch(
 
         df = pd.read_csv(tmp_path)
 
+        lacunas_preenchidas = 0
+        if fill_gaps is not None:
+            # Todas as colunas em um único lote; NaN nas pontas (séries mais curtas) ficam
+            antes = int(df.isna().sum().sum())
+            df = interpolacao.preencher_dataframe(df, fill_gaps)
+            lacunas_preenchidas = antes - int(df.isna().sum().sum())
+
         results = []
+        inicio_lote = time.perf_counter()
+
+        def prazo_restante():
+            if deadline_ms is None:
+                return None
+            return max(0.0, deadline_ms - (time.perf_counter() - inicio_lote) * 1000)
 
         if parallel_processing:
             # Simular processamento paralelo
             async def process_series(series_data):
-                return forecast_temp(series_data.tolist(), n_projections)
+                return forecast_temp(series_data.tolist(), n_projections, deadline_ms=prazo_restante())
 
             tasks = [process_series(df[col].dropna()) for col in df.columns]
             results = await asyncio.gather(*tasks)
@@ -592,7 +711,7 @@ async def forecast_batch(
             # Processamento serial
             for col in df.columns:
                 series_data = df[col].dropna().tolist()
-                result = forecast_temp(series_data, n_projections)
+                result = forecast_temp(series_data, n_projections, deadline_ms=prazo_restante())
                 results.append(result)
 
         # Adicionar ao histórico
@@ -604,7 +723,9 @@ async def forecast_batch(
                 "filename": file.filename,
                 "n_projections": n_projections,
                 "parallel": parallel_processing,
-                "series_count": len(df.columns)
+                "series_count": len(df.columns),
+                "deadline_ms": deadline_ms,
+                "fill_gaps": fill_gaps
             },
             result={
                 "batch_id": batch_id,
@@ -619,7 +740,9 @@ async def forecast_batch(
             "status": "completed",
             "results_summary": {
                 "total_projections": len(df.columns) * n_projections,
-                "average_probability_increase": float(np.mean([r["probabilidade_subir"] for r in results]))
+                "average_probability_increase": float(np.mean([r["probabilidade_subir"] for r in results])),
+                "series_budget_exhausted": sum(r["orcamento_esgotado"] for r in results),
+                "gaps_filled": lacunas_preenchidas
             }
         }
 
@@ -632,6 +755,105 @@ async def forecast_batch(
         if 'tmp_path' in locals():
             os.unlink(tmp_path)
 
+@app.get("/forecast/series/{series_id}",
+         summary="Modelo lembrado de uma série",
+         description="Vencedor, desafiantes e erros recentes guardados para o series_id",
+         responses={
+             200: {"description": "Memória encontrada"},
+             401: {"description": "Não autenticado"},
+             404: {"description": "Série sem memória"}
+         })
+async def get_series_memory(
+    series_id: str = Path(..., description="series_id usado em /forecast/single"),
+    current_user: dict = Depends(verify_token)
+):
+    """Consulta o modelo que /forecast/single repete para a série"""
+    series_key = f"{current_user['user_id']}:{series_id}"
+    estado = memoria_series.estado_serie(series_key)
+    continuacao = estado_modelos.armazem.obter(series_key)
+    if estado is None and continuacao is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Série sem modelo memorizado"
+        )
+    return {"series_id": series_id, **(estado or {}),
+            "continuation_state": continuacao.resumo() if continuacao else None}
+
+@app.delete("/forecast/series/{series_id}",
+            summary="Esquecer modelo de uma série",
+            description="Força o torneio completo na próxima previsão da série",
+            responses={
+                200: {"description": "Memória removida"},
+                401: {"description": "Não autenticado"},
+                404: {"description": "Série sem memória"}
+            })
+async def delete_series_memory(
+    series_id: str = Path(..., description="series_id usado em /forecast/single"),
+    current_user: dict = Depends(verify_token)
+):
+    """Remove a memória e o estado gravado da série"""
+    series_key = f"{current_user['user_id']}:{series_id}"
+    esquecida = memoria_series.memoria.esquecer(series_key)
+    if not (estado_modelos.armazem.remover(series_key) or esquecida):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Série sem modelo memorizado"
+        )
+    return {"series_id": series_id, "status": "forgotten"}
+
+@app.post("/forecast/continue",
+          response_model=ContinueResponse,
+          summary="Continuar série",
+          description="Atualiza o modelo gravado só com as observações novas",
+          responses={
+              200: {"description": "Projeção realizada com sucesso"},
+              401: {"description": "Não autenticado"},
+              404: {"description": "Série sem estado gravado"},
+              422: {"description": "Dados inválidos"}
+          })
+async def forecast_continue(
+    request: ContinueRequest,
+    current_user: dict = Depends(verify_token)
+):
+    """
+    Continua a série a partir do estado gravado pelo último /forecast/single com o
+    mesmo series_id, em tempo proporcional ao número de observações novas.
+    """
+    start_time = time.time()
+    series_key = f"{current_user['user_id']}:{request.series_id}"
+    resultado = estado_modelos.continuar(series_key, request.new_data, request.n_projections)
+    if resultado is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Série sem estado gravado: envie o histórico completo em /forecast/single"
+        )
+
+    execution_time = time.time() - start_time
+    add_to_history(
+        operation_type="forecast_continue",
+        user_info=current_user,
+        parameters={
+            "series_id": request.series_id,
+            "new_points": len(request.new_data),
+            "n_projections": request.n_projections
+        },
+        result={
+            "projections_count": request.n_projections,
+            "probability_increase": resultado["probabilidade_subir"],
+            "execution_time": execution_time
+        }
+    )
+
+    estado = resultado["estado"]
+    return ContinueResponse(
+        projections=[float(p) for p in resultado["projecoes"]],
+        fitted=[float(v) for v in resultado["ajustados"]],
+        probability_increase=float(resultado["probabilidade_subir"]),
+        model=f"{estado['metodo']}_{estado['periodo']}",
+        observations=estado["observacoes"],
+        execution_time=execution_time
+    )
+
 # ================== ENDPOINTS DE HISTÓRICO ==================
 
 @app.get("/history",
@@ -801,6 +1023,40 @@ async def health_check():
         "uptime": "running"
     }
 
+@app.get("/ready",
+         summary="Readiness Check",
+         description="Indica se o aquecimento terminou e quais backends estão disponíveis",
+         responses={
+             200: {"description": "API pronta para receber tráfego"},
+             503: {"description": "Aquecimento em andamento"}
+         })
+async def readiness_check():
+    """Endpoint de prontidão: 503 até o aquecimento concluir"""
+    estado = estado_prontidao()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if estado["pronto"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "status": "ready" if estado["pronto"] else "warming_up",
+            "timestamp": datetime.utcnow().isoformat(),
+            "warmup_enabled": estado["habilitado"],
+            "backends_available": estado["backends_disponiveis"],
+            "backends": estado["backends"]
+        }
+    )
+
+@app.get("/metrics",
+         summary="Métricas de execução",
+         description="Contadores internos do serviço")
+async def metrics():
+    """Contadores de coalescência, micro-lotes, intervalos e da memória por série"""
+    return {
+        "coalescing": coalescedor.resumo(),
+        "microbatching": microlote.agendador.resumo(),
+        "prediction_intervals": intervalos.motor.resumo(),
+        "series_memory": {**memoria_series.memoria.estatisticas, "series": len(memoria_series.memoria)},
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
 # ================== ROOT ==================
 
 @app.get("/",
@@ -820,9 +1076,12 @@ async def root():
         "endpoints": {
             "auth": ["/auth/login", "/auth/logout", "/auth/refresh"],
             "upload": ["/upload/csv", "/upload/json"],
-            "forecast": ["/forecast/single", "/forecast/batch"],
+            "forecast": ["/forecast/single", "/forecast/batch", "/forecast/continue",
+                         "/forecast/series/{series_id}"],
             "history": ["/history", "/history/{operation_id}"],
-            "health": "/health"
+            "health": "/health",
+            "ready": "/ready",
+            "metrics": "/metrics"
         }
     }
 
@@ -1,8 +1,22 @@
 import ctypes
 import numpy as np
 import os
+import time
 import logging
 
+try:
+    import holt_winters_mle
+    import grade_hw
+    import sazonalidade
+    import metricas
+    import interpolacao
+except ImportError:
+    from . import holt_winters_mle
+    from . import grade_hw
+    from . import sazonalidade
+    from . import metricas
+    from . import interpolacao
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -10,20 +24,29 @@ logger = logging.getLogger(__name__)
 # Determinar caminho das bibliotecas de forma robusta
 lib_dir = os.path.join(os.path.dirname(__file__), 'libs')
 
+# Backends de cálculo suportados por forecast_temp
+BACKENDS = ('python', 'cuda')
+
 # Flag para indicar se CUDA está disponível
 USE_CUDA = False
 
+# USE_CUDA=auto|true|false (ver .env.example); "false" nem tenta carregar as bibliotecas
+CUDA_HABILITADO = os.getenv("USE_CUDA", "auto").strip().lower() not in ("false", "0", "no")
+
 # Tentar carregar as bibliotecas CUDA
-try:
-    cuda_lib = ctypes.CDLL(os.path.join(lib_dir, 'medias_moveis.so'))
-    hw_cuda_lib = ctypes.CDLL(os.path.join(lib_dir, 'holt_winters.so'))
-    interpolador1d_lib = ctypes.CDLL(os.path.join(lib_dir, 'interpolador1d.so'))
-    utilitarios_lib = ctypes.CDLL(os.path.join(lib_dir, 'utilitarios.so'))
-    USE_CUDA = True
-    logger.info("CUDA libraries loaded successfully")
-except (OSError, FileNotFoundError) as e:
-    logger.warning(f"CUDA libraries not found ({e}), using Python fallback implementations")
-    USE_CUDA = False
+if CUDA_HABILITADO:
+    try:
+        cuda_lib = ctypes.CDLL(os.path.join(lib_dir, 'medias_moveis.so'))
+        hw_cuda_lib = ctypes.CDLL(os.path.join(lib_dir, 'holt_winters.so'))
+        interpolador1d_lib = ctypes.CDLL(os.path.join(lib_dir, 'interpolador1d.so'))
+        utilitarios_lib = ctypes.CDLL(os.path.join(lib_dir, 'utilitarios.so'))
+        USE_CUDA = True
+        logger.info("CUDA libraries loaded successfully")
+    except (OSError, FileNotFoundError) as e:
+        logger.warning(f"CUDA libraries not found ({e}), using Python fallback implementations")
+        USE_CUDA = False
+else:
+    logger.info("CUDA disabled by USE_CUDA environment variable, using Python fallback implementations")
 
 # Define os tipos de ponteiros
 float_pointer = ctypes.POINTER(ctypes.c_float)
@@ -41,11 +64,11 @@ def python_moving_average(values, period):
             result.append(np.mean(values[i-period+1:i+1]))
     return result
 
-def python_holt_winters_simple(values, period):
-    """Implementação simplificada de Holt-Winters"""
-    alpha = 0.2
-    beta = 0.1
+# Suavizações fixas de python_holt_winters_simple (também usadas por microlote e estado_modelos)
+ALPHA_HW, BETA_HW = 0.2, 0.1
 
+def python_holt_winters_simple(values, period, alpha=ALPHA_HW, beta=BETA_HW):
+    """Implementação simplificada de Holt-Winters"""
     if len(values) < period:
         return values.copy()
 
@@ -75,10 +98,13 @@ def python_mse(actual, predicted):
 
 def python_binarize(data, lookback):
     """Binariza dados (1 se subiu, 0 se desceu)"""
-    result = []
-    for i in range(1, len(data)):
-        result.append(1 if data[i] > data[i-1] else 0)
-    return result
+    if len(data) < 2:
+        return []
+    return python_binarize_lote([data])[0].tolist()
+
+def python_binarize_lote(matriz):
+    """python_binarize para várias séries de mesmo tamanho: matriz (séries x períodos-1)"""
+    return (np.diff(np.asarray(matriz, dtype=float), axis=1) > 0).astype(np.int64)
 
 def python_bayes_probability(binary_data, lookback):
     """Calcula probabilidade bayesiana de aumento"""
@@ -99,6 +125,27 @@ def python_bayes_probability(binary_data, lookback):
 
 # ============ END FALLBACK IMPLEMENTATIONS ============
 
+def backends_disponiveis():
+    """Lista os backends que podem ser usados no processo atual"""
+    return [backend for backend in BACKENDS if backend == 'python' or USE_CUDA]
+
+def desativar_cuda(motivo):
+    """Desliga o backend CUDA (ex.: bibliotecas carregam mas o driver falha em tempo de execução)"""
+    global USE_CUDA
+    if USE_CUDA:
+        logger.warning(f"Disabling CUDA backend: {motivo}")
+    USE_CUDA = False
+
+def _cuda_ativo(backend=None):
+    """Resolve o backend da chamada; None usa o padrão do processo"""
+    if backend is None:
+        return USE_CUDA
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend}")
+    if backend == 'cuda' and not USE_CUDA:
+        raise ValueError("Backend 'cuda' indisponível: bibliotecas CUDA não carregadas")
+    return backend == 'cuda'
+
 # Define os tipos de argumentos e resultados para as funções das bibliotecas (apenas se CUDA disponível)
 if USE_CUDA:
     cuda_lib.moving_average.argtypes = [float_pointer, float_pointer_pointer, ctypes.c_int, ctypes.POINTER(ctypes.c_int), ctypes.c_int]
@@ -126,8 +173,8 @@ if USE_CUDA:
     utilitarios_lib.tax_acrescimo.restype = None
 
 # Funções de exemplo (com fallback para Python se CUDA não disponível)
-def cuda_medias_moveis(values, periods):
-    if not USE_CUDA:
+def cuda_medias_moveis(values, periods, backend=None):
+    if not _cuda_ativo(backend):
         # Usar implementação Python
         return [python_moving_average(values, period) for period in periods]
 
@@ -149,8 +196,8 @@ def cuda_medias_moveis(values, periods):
 
     return averages.tolist()
 
-def cuda_holt_winters(values, periods):
-    if not USE_CUDA:
+def cuda_holt_winters(values, periods, backend=None):
+    if not _cuda_ativo(backend):
         # Usar implementação Python
         return [python_holt_winters_simple(values, period) for period in periods]
 
@@ -172,7 +219,11 @@ def cuda_holt_winters(values, periods):
 
     return projections.tolist()
 
-def cuda_interpolacao1d(indices, valores):
+def cuda_interpolacao1d(indices, valores, backend=None):
+    if not _cuda_ativo(backend):
+        # Mesma conta do kernel em NumPy (ver interpolacao.interpolacao_pares)
+        return tuple(r.tolist() for r in interpolacao.interpolacao_pares(indices, valores))
+
     n = len(indices)
 
     indices_array = np.array(indices, dtype=np.float32)
@@ -192,12 +243,31 @@ def cuda_interpolacao1d(indices, valores):
     return result_multivariate.tolist(), result_gaussian.tolist(), result_polynomial.tolist()
 
 
-def forecast_temp(data, n_projecoes):
-    periods = [3, 4, 5, 6, 7, 14, 30]
+def forecast_temp(data, n_projecoes, backend=None, hw_mle=None, serie_id=None, grupo=None,
+                  hw_grade=None, periods=None, top_k=None, deadline_ms=None, candidatos=None,
+                  parametros_grade=None, detectar=None):
+    """
+    candidatos restringe a disputa a pares (método, período), ex.: [('HW', 24), ('MA', 7)]
+    (ver memoria_series.py); parametros_grade reaproveita {período: parâmetros} de
+    um ajuste HW_GRADE anterior em vez de refazer a busca.
+    deadline_ms limita o tempo da varredura: os candidatos são avaliados do mais
+    barato ao mais caro e, ao esgotar o prazo, vence o melhor encontrado até ali
+    (candidatos_avaliados e orcamento_esgotado descrevem o que foi feito).
+    periods fixa os períodos avaliados; sem ele, usa-se a varredura original
+    [3, 4, 5, 6, 7, 14, 30] ou, com detectar (None segue SEASONALITY_DETECTION,
+    desligada por padrão), os top_k períodos mais plausíveis da base.
+    hw_mle inclui Holt-Winters com parâmetros otimizados (statsmodels) entre os
+    candidatos; None segue HW_MLE_ENABLED. serie_id e grupo (ex.: dataset) permitem
+    reaproveitar os parâmetros entre chamadas (ver holt_winters_mle.py).
+    hw_grade inclui Holt-Winters com (alpha, beta, gamma) escolhidos por busca em
+    grade sobre a base; None segue HW_GRID_ENABLED (ver grade_hw.py).
+    """
     segundo_membro = int(len(data) * 0.3)
+    usar_cuda = _cuda_ativo(backend)
+    backend = 'cuda' if usar_cuda else 'python'
 
     # Split data into base and testemunha (test set)
-    if USE_CUDA:
+    if usar_cuda:
         data_ctypes = (ctypes.c_float * len(data))(*data)
         base_ctypes = (ctypes.c_float * (len(data) - segundo_membro))()
         testemunha_ctypes = (ctypes.c_float * segundo_membro)()
@@ -208,41 +278,120 @@ def forecast_temp(data, n_projecoes):
     else:
         base, testemunha = python_split_list(data, segundo_membro)
 
-    # Calculate projections with multiple methods
-    moving_averages = cuda_medias_moveis(base, periods)
-    holt_winters_projections = cuda_holt_winters(base, periods)
+    if candidatos is not None:
+        candidatos = {(metodo, int(period)) for metodo, period in candidatos}
+        if periods is None:
+            periods = sorted({period for metodo, period in candidatos if metodo != 'NAIVE'})
+    periods = sazonalidade.periodos_avaliados(base, periods, top_k, detectar)
 
-    # Find best method by comparing with test set
+    inicio = time.perf_counter()
     errors = []
-    for i, period in enumerate(periods):
-        if USE_CUDA:
-            min_len = min(len(testemunha), len(holt_winters_projections[i]))
-            proj_ctypes = (ctypes.c_float * min_len)(*holt_winters_projections[i][:min_len])
-            testemunha_ctypes = (ctypes.c_float * min_len)(*testemunha[:min_len])
-            mse_hw = utilitarios_lib.compara_testemunha(testemunha_ctypes, proj_ctypes, min_len)
-
-            min_len = min(len(testemunha), len(moving_averages[i]))
-            avg_ctypes = (ctypes.c_float * min_len)(*moving_averages[i][:min_len])
+    avaliados = []
+    pulados = []
+    # resíduos de cada candidato na testemunha, reaproveitados nas métricas do ranking
+    residuos = {}
+    testemunha_array = np.asarray(testemunha, dtype=float)
+
+    def prazo_esgotado():
+        return deadline_ms is not None and (time.perf_counter() - inicio) * 1000 >= deadline_ms
+
+    def erro_testemunha(projecao, metodo, period):
+        min_len = min(len(testemunha), len(projecao))
+        residuo = testemunha_array[:min_len] - np.asarray(projecao[:min_len], dtype=float)
+        residuos[(metodo, period)] = residuo
+        if usar_cuda:
+            proj_ctypes = (ctypes.c_float * min_len)(*projecao[:min_len])
             testemunha_ctypes = (ctypes.c_float * min_len)(*testemunha[:min_len])
-            mse_ma = utilitarios_lib.compara_testemunha(testemunha_ctypes, avg_ctypes, min_len)
+            return utilitarios_lib.compara_testemunha(testemunha_ctypes, proj_ctypes, min_len)
+        # mesmo cálculo de python_mse, sem converter a testemunha a cada candidato
+        return float(np.mean(residuo ** 2))
+
+    def varrer(metodo, calcular, ordem):
+        """
+        Avalia um método em todos os períodos. Sem prazo, calcular recebe todos os
+        períodos de uma vez; com prazo, um período por vez na ordem dada, até esgotar.
+        """
+        projecoes = [[] for _ in periods]
+        alvo = [p for p in periods if candidatos is None or (metodo, p) in candidatos]
+        if not alvo:
+            return projecoes
+        if deadline_ms is None:
+            for period, projecao in zip(alvo, calcular(alvo)):
+                projecoes[periods.index(period)] = projecao
         else:
-            mse_hw = python_mse(testemunha, holt_winters_projections[i])
-            mse_ma = python_mse(testemunha, moving_averages[i])
-
-        errors.append((mse_hw, period, 'HW'))
-        errors.append((mse_ma, period, 'MA'))
+            for period in ordem:
+                if period not in alvo:
+                    continue
+                if prazo_esgotado():
+                    pulados.append(metodo)
+                    break
+                projecoes[periods.index(period)] = calcular([period])[0]
+        for period, projecao in zip(periods, projecoes):
+            if len(projecao):
+                errors.append((erro_testemunha(projecao, metodo, period), period, metodo))
+                avaliados.append(f"{metodo}_{period}")
+        return projecoes
+
+    # Candidatos do mais barato ao mais caro: com prazo, o ingênuo (valor anterior)
+    # garante um resultado; depois médias móveis e Holt-Winters na ordem de
+    # plausibilidade do período
+    if deadline_ms is not None or (candidatos is not None and ('NAIVE', 1) in candidatos):
+        errors.append((erro_testemunha(list(base[:1]) + list(base[:-1]), 'NAIVE', 1), 1, 'NAIVE'))
+        avaliados.append('NAIVE_1')
+    ordem = sazonalidade.ordenar_periodos(base, periods) if deadline_ms is not None else periods
+
+    moving_averages = varrer('MA', lambda ps: cuda_medias_moveis(base, ps, backend), periods)
+    holt_winters_projections = varrer('HW', lambda ps: cuda_holt_winters(base, ps, backend), ordem)
+
+    def pedido(metodo):
+        return candidatos is not None and any(m == metodo for m, _ in candidatos)
+
+    if hw_mle is None:
+        hw_mle = holt_winters_mle.habilitado_por_padrao() or pedido('HW_MLE')
+    if hw_mle:
+        id_base = None if serie_id is None else f"{serie_id}:base"
+        hw_mle_projections = varrer(
+            'HW_MLE', lambda ps: holt_winters_mle.holt_winters_mle(base, ps, id_base, grupo), ordem)
+
+    if hw_grade is None:
+        hw_grade = grade_hw.habilitado_por_padrao() or pedido('HW_GRADE')
+    if hw_grade:
+        hw_grade_params = dict(parametros_grade or {})
+
+        def ajustar_e_suavizar(ps):
+            projecoes = []
+            for period in ps:
+                if period not in hw_grade_params:
+                    # Ajuste só na base (corte interno); a testemunha fica para o torneio
+                    hw_grade_params[period] = grade_hw.ajustar_grade(base, period)
+                params = hw_grade_params[period]
+                projecoes.append([] if params is None else grade_hw.suavizar(
+                    base, period, params["alpha"], params["beta"], params["gamma"]))
+            return projecoes
+
+        hw_grade_projections = varrer('HW_GRADE', ajustar_e_suavizar, ordem)
+
+    if not errors:
+        raise ValueError("Nenhum candidato avaliado: verifique candidatos e períodos")
 
     # Select best method
-    _, best_period, best_method = min(errors)
+    best_error, best_period, best_method = min(errors)
 
     # Generate final projection with best method
-    if best_method == 'HW':
-        final_projection = cuda_holt_winters(data, [best_period])
+    if best_method == 'NAIVE':
+        final_projection = [list(data[:1]) + list(data[:-1])]
+    elif best_method == 'HW':
+        final_projection = cuda_holt_winters(data, [best_period], backend)
+    elif best_method == 'HW_MLE':
+        final_projection = holt_winters_mle.holt_winters_mle(data, [best_period], serie_id, grupo)
+    elif best_method == 'HW_GRADE':
+        params = hw_grade_params[best_period]
+        final_projection = [grade_hw.suavizar(data, best_period, params["alpha"], params["beta"], params["gamma"])]
     else:
-        final_projection = cuda_medias_moveis(data, [best_period])
+        final_projection = cuda_medias_moveis(data, [best_period], backend)
 
     # Calculate probability of increase using Bayesian inference
-    if USE_CUDA:
+    if usar_cuda:
         data_ctypes = (ctypes.c_float * len(data))(*data)
         binarios_ctypes = (ctypes.c_int * len(data))()
         utilitarios_lib.binariza(data_ctypes, len(data), n_projecoes, n_projecoes, binarios_ctypes)
@@ -252,12 +401,37 @@ def forecast_temp(data, n_projecoes):
         binarios = python_binarize(data, n_projecoes)
         probabilidade_subir = python_bayes_probability(binarios, n_projecoes)
 
-    return {
+    # Métricas de todos os candidatos em uma única passada sobre o tensor
+    # (1, candidatos, testemunha) dos resíduos da seleção, na ordem do ranking
+    ordenados = sorted(errors)
+    tensor_residuos = np.full((1, len(ordenados), len(testemunha_array)), np.nan)
+    for i, (_, period, metodo) in enumerate(ordenados):
+        residuo = residuos[(metodo, period)]
+        tensor_residuos[0, i, :len(residuo)] = residuo
+    erros_testemunha = metricas.metricas_erro(testemunha_array[None, :], tensor_residuos)
+    ranking = [[metodo, period, erro, metricas.selecionar(erros_testemunha, 0, i)]
+               for i, (erro, period, metodo) in enumerate(ordenados)]
+
+    resultado = {
         "final_projection": final_projection,
         "moving_averages": moving_averages,
         "holt_winters_projections": holt_winters_projections,
-        "probabilidade_subir": probabilidade_subir
+        "probabilidade_subir": probabilidade_subir,
+        "periodos_avaliados": periods,
+        "candidatos_avaliados": avaliados,
+        "orcamento_esgotado": bool(pulados),
+        "metodo_vencedor": best_method,
+        "periodo_vencedor": best_period,
+        "ranking_candidatos": ranking,
+        "metricas_testemunha": ranking[0][3],
+        "backend": backend,
     }
+    if hw_mle:
+        resultado["holt_winters_mle_projections"] = hw_mle_projections
+    if hw_grade:
+        resultado["holt_winters_grade_projections"] = hw_grade_projections
+        resultado["holt_winters_grade_params"] = [hw_grade_params.get(period) for period in periods]
+    return resultado
 
 
 # Exemplo de uso
@@ -0,0 +1,146 @@
+# aquecimento.py
+# Aquecimento (warm-up) na inicialização e estado de prontidão da aplicação
+#
+# A primeira previsão após um deploy paga o carregamento das bibliotecas, o
+# aquecimento dos caminhos do NumPy e o crescimento do alocador. O aquecimento
+# executa forecast_temp em alguns tamanhos de série para cada backend habilitado
+# antes de o endpoint de prontidão liberar tráfego.
+
+import os
+import time
+import threading
+import logging
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import aplicacao
+except ImportError:
+    from . import aplicacao
+
+logger = logging.getLogger(__name__)
+
+# Tamanhos de série usados no aquecimento (WARMUP_SERIES_LENGTHS=16,128,1024)
+TAMANHOS_PADRAO = (16, 128, 1024)
+N_PROJECOES_AQUECIMENTO = 5
+
+_lock = threading.Lock()
+_estado = {
+    "pronto": False,
+    "em_andamento": False,
+    "habilitado": None,
+    "inicio": None,
+    "fim": None,
+    "backends": {},
+}
+
+
+def aquecimento_habilitado():
+    """Lê WARMUP_ENABLED (padrão: true)"""
+    return os.getenv("WARMUP_ENABLED", "true").strip().lower() not in ("false", "0", "no")
+
+
+def tamanhos_aquecimento():
+    """Lê WARMUP_SERIES_LENGTHS ou usa TAMANHOS_PADRAO"""
+    valor = os.getenv("WARMUP_SERIES_LENGTHS")
+    if not valor:
+        return list(TAMANHOS_PADRAO)
+    return [int(x) for x in valor.split(",") if x.strip()]
+
+
+def serie_sintetica(n, semente=0):
+    """Série representativa: tendência + sazonalidade semanal + ruído"""
+    rng = np.random.default_rng(semente)
+    t = np.arange(n, dtype=float)
+    return (100 + 0.05 * t + 10 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 1, n)).tolist()
+
+
+def _validar_resultado(serie, resultado):
+    """Detecta backends que executam mas não produzem projeções utilizáveis"""
+    projecao = np.asarray(resultado["final_projection"][0], dtype=float)
+    if not np.all(np.isfinite(projecao)):
+        return "projeção contém valores não finitos"
+    if np.allclose(projecao, 0) and not np.allclose(serie, 0):
+        return "projeção zerada para série não nula"
+    return None
+
+
+def _aquecer_backend(backend, tamanhos):
+    tempos = {}
+    for n in tamanhos:
+        serie = serie_sintetica(n)
+        inicio = time.perf_counter()
+        resultado = aplicacao.forecast_temp(serie, N_PROJECOES_AQUECIMENTO, backend=backend)
+        tempos[str(n)] = round(time.perf_counter() - inicio, 6)
+        erro = _validar_resultado(serie, resultado)
+        if erro:
+            return {"disponivel": False, "motivo": erro, "tempos": tempos}
+    return {"disponivel": True, "motivo": None, "tempos": tempos}
+
+
+def executar_aquecimento(tamanhos=None, refazer=False):
+    """
+    Executa o aquecimento de forma síncrona e marca a aplicação como pronta.
+
+    Idempotente: com a aplicação já pronta (ou um aquecimento em andamento) só
+    retorna o estado; refazer=True repete o aquecimento sem tirar a aplicação do
+    ar. Um backend que falha no aquecimento é marcado como indisponível; no caso do
+    CUDA, ele também é desativado para que as requisições usem o fallback Python.
+    """
+    with _lock:
+        if _estado["em_andamento"] or (_estado["pronto"] and not refazer):
+            return _copiar_estado()
+        _estado.update(em_andamento=True, inicio=datetime.utcnow(), fim=None)
+
+    habilitado = aquecimento_habilitado()
+    backends = {}
+
+    try:
+        if habilitado:
+            tamanhos = tamanhos or tamanhos_aquecimento()
+            for backend in aplicacao.backends_disponiveis():
+                try:
+                    backends[backend] = _aquecer_backend(backend, tamanhos)
+                except Exception as e:
+                    backends[backend] = {"disponivel": False, "motivo": str(e), "tempos": {}}
+                if not backends[backend]["disponivel"]:
+                    logger.warning(f"Backend {backend} failed warm-up: {backends[backend]['motivo']}")
+                    if backend == 'cuda':
+                        aplicacao.desativar_cuda(backends[backend]["motivo"])
+        else:
+            # Sem aquecimento: reporta apenas o que foi carregado
+            backends = {
+                backend: {"disponivel": True, "motivo": "não verificado (aquecimento desabilitado)", "tempos": {}}
+                for backend in aplicacao.backends_disponiveis()
+            }
+    finally:
+        with _lock:
+            _estado.update(
+                pronto=True,
+                em_andamento=False,
+                habilitado=habilitado,
+                fim=datetime.utcnow(),
+                backends=backends,
+            )
+
+    logger.info(f"Warm-up finished: {_estado['backends']}")
+    return estado_prontidao()
+
+
+def agendar_aquecimento(loop):
+    """Dispara o aquecimento em um executor sem bloquear o event loop"""
+    return loop.run_in_executor(None, executar_aquecimento)
+
+
+def estado_prontidao():
+    """Cópia do estado de prontidão para o endpoint /ready"""
+    with _lock:
+        return _copiar_estado()
+
+
+def _copiar_estado():
+    """Chamar com _lock adquirido"""
+    estado = dict(_estado)
+    estado["backends_disponiveis"] = [b for b, info in estado["backends"].items() if info["disponivel"]]
+    return estado
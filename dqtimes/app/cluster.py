@@ -0,0 +1,167 @@
+# cluster.py
+# Cluster Dask criado sob demanda e configurado por variáveis de ambiente
+#
+# O LocalCluster só é iniciado na primeira requisição que realmente precisa dele.
+# Requisições pequenas não passam pelo Dask: o overhead de montar e agendar o grafo
+# domina o tempo de cálculo, então quem chama (ver usar_cluster) lê e projeta as
+# linhas diretamente no processo.
+
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Abaixo deste número de linhas a requisição roda localmente (DASK_MIN_ROWS)
+MIN_LINHAS_PADRAO = 64
+
+_cliente = None
+_cluster = None
+_lock = threading.Lock()
+
+
+def _env_bool(nome, padrao):
+    valor = os.getenv(nome)
+    if valor is None or not valor.strip():
+        return padrao
+    return valor.strip().lower() in ("true", "1", "yes")
+
+
+def _env_int(nome, padrao=None):
+    valor = os.getenv(nome)
+    return int(valor) if valor and valor.strip() else padrao
+
+
+def configuracao_cluster():
+    """
+    Lê a configuração do cluster do ambiente.
+
+    DASK_WORKERS, DASK_THREADS_PER_WORKER, DASK_PROCESSES (processos ou threads),
+    DASK_MEMORY_LIMIT (por worker, ex.: 2GB), DASK_SPILL_DIR, DASK_DASHBOARD_ADDRESS
+    e, para escala adaptativa, DASK_ADAPTIVE, DASK_ADAPTIVE_MIN, DASK_ADAPTIVE_MAX,
+    DASK_ADAPTIVE_INTERVAL, DASK_ADAPTIVE_WAIT_COUNT e DASK_TARGET_DURATION.
+    """
+    adaptativo = _env_bool("DASK_ADAPTIVE", True)
+    minimo = _env_int("DASK_ADAPTIVE_MIN", 1)
+    maximo = _env_int("DASK_ADAPTIVE_MAX", _env_int("DASK_WORKERS", os.cpu_count() or 1))
+    return {
+        "cluster": {
+            # Com escala adaptativa o cluster nasce no mínimo e cresce com a fila
+            "n_workers": minimo if adaptativo else _env_int("DASK_WORKERS"),
+            "threads_per_worker": _env_int("DASK_THREADS_PER_WORKER"),
+            "processes": _env_bool("DASK_PROCESSES", True),
+            "memory_limit": os.getenv("DASK_MEMORY_LIMIT", "auto"),
+            "local_directory": os.getenv("DASK_SPILL_DIR") or None,
+            "dashboard_address": os.getenv("DASK_DASHBOARD_ADDRESS", ":8787"),
+        },
+        "adaptativo": adaptativo,
+        "adapt": {
+            "minimum": minimo,
+            "maximum": maximo,
+            "interval": os.getenv("DASK_ADAPTIVE_INTERVAL", "1s"),
+            # Intervalos consecutivos ociosos antes de desligar um worker
+            "wait_count": _env_int("DASK_ADAPTIVE_WAIT_COUNT", 30),
+            # Tempo desejado para esvaziar a fila; define quantos workers pedir
+            "target_duration": os.getenv("DASK_TARGET_DURATION", "5s"),
+        },
+        "min_linhas": _env_int("DASK_MIN_ROWS", MIN_LINHAS_PADRAO),
+    }
+
+
+def obter_cliente():
+    """Retorna o Client Dask, criando o cluster na primeira chamada"""
+    global _cliente, _cluster
+    if _cliente is not None:
+        return _cliente
+    with _lock:
+        if _cliente is None:
+            from dask.distributed import Client, LocalCluster
+
+            config = configuracao_cluster()
+            _cluster = LocalCluster(**config["cluster"])
+            if config["adaptativo"]:
+                _cluster.adapt(**config["adapt"])
+            _cliente = Client(_cluster)
+            logger.info(f"Dask cluster started, dashboard at {_cliente.dashboard_link}")
+    return _cliente
+
+
+def cliente_ativo():
+    """Client já criado, ou None (não inicia o cluster)"""
+    return _cliente
+
+
+def encerrar_cluster():
+    global _cliente, _cluster
+    with _lock:
+        if _cliente is not None:
+            _cliente.close()
+            _cluster.close()
+        _cliente = None
+        _cluster = None
+
+
+def usar_cluster(n_linhas):
+    """Decide se o volume justifica o overhead do scheduler distribuído"""
+    return n_linhas >= configuracao_cluster()["min_linhas"]
+
+
+def paralelismo():
+    """
+    Tarefas que o cluster executa ao mesmo tempo: threads somadas dos workers, ou,
+    com escala adaptativa, o que o máximo de workers comportaria (a fila precisa ter
+    tarefas para o cluster crescer). Inicia o cluster; chamar fora do event loop.
+    """
+    workers = obter_cliente().scheduler_info().get("workers", {})
+    threads = [w.get("nthreads", 1) for w in workers.values()] or [1]
+    config = configuracao_cluster()
+    if config["adaptativo"]:
+        return max(sum(threads), config["adapt"]["maximum"] * max(threads))
+    return sum(threads)
+
+
+def dividir_fatias(fatias, n_pedacos):
+    """
+    Reparte fatias (partição, início, fim) em até n_pedacos pedaços com o mesmo
+    número de linhas (±1), cortando dentro das partições. Cada pedaço é uma lista
+    de fatias (mais de uma quando cruza a fronteira de uma partição); a ordem das
+    linhas é preservada
+    """
+    total = sum(fim - inicio for _, inicio, fim in fatias)
+    n_pedacos = max(1, min(n_pedacos, total))
+    restantes = list(fatias)
+    pedacos = []
+    for k in range(n_pedacos):
+        # o resto da divisão vai para os primeiros pedaços
+        faltam = total // n_pedacos + (1 if k < total % n_pedacos else 0)
+        pedaco = []
+        while faltam > 0:
+            particao, inicio, fim = restantes[0]
+            corte = min(fim, inicio + faltam)
+            pedaco.append((particao, inicio, corte))
+            faltam -= corte - inicio
+            if corte == fim:
+                restantes.pop(0)
+            else:
+                restantes[0] = (particao, corte, fim)
+        pedacos.append(pedaco)
+    return pedacos
+
+
+def computar(tarefas):
+    """Executa uma lista de tarefas Dask (delayed) no cluster e retorna os resultados em ordem"""
+    cliente = obter_cliente()
+    return cliente.gather(cliente.compute(tarefas))
+
+
+def estado_cluster():
+    """Resumo do cluster para diagnóstico (consulta o scheduler: chamar fora do event loop)"""
+    if _cliente is None:
+        return {"iniciado": False}
+    workers = _cliente.scheduler_info().get("workers", {})
+    return {
+        "iniciado": True,
+        "dashboard": _cliente.dashboard_link,
+        "workers": len(workers),
+        "threads": sum(w.get("nthreads", 0) for w in workers.values()),
+    }
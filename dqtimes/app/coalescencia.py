@@ -0,0 +1,102 @@
+# coalescencia.py
+# Coalescência (single-flight) de requisições idênticas em andamento
+#
+# Quando vários clientes enviam a mesma série ao mesmo tempo (ex.: recarga de um
+# dashboard), só a primeira requisição calcula; as duplicadas que chegam enquanto
+# ela está em voo aguardam o mesmo future e recebem o mesmo resultado. Não é um
+# cache: a entrada some quando o cálculo termina, então nada fica retido em memória.
+
+import os
+import json
+import copy
+import asyncio
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def coalescencia_habilitada():
+    """COALESCING_ENABLED (padrão: true)"""
+    return os.getenv("COALESCING_ENABLED", "true").strip().lower() not in ("false", "0", "no")
+
+
+def chave_conteudo(*partes):
+    """Hash SHA-256 da representação JSON canônica das partes da requisição"""
+    conteudo = json.dumps(partes, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(conteudo.encode()).hexdigest()
+
+
+async def _chamar(funcao, *args):
+    if asyncio.iscoroutinefunction(funcao):
+        return await funcao(*args)
+    return await asyncio.get_running_loop().run_in_executor(None, funcao, *args)
+
+
+class Coalescedor:
+    """Futures em voo por chave de conteúdo, com contadores do trabalho economizado"""
+
+    def __init__(self):
+        self._em_voo = {}
+        self.estatisticas = {"calculadas": 0, "coalescidas": 0, "falhas": 0}
+
+    async def executar(self, chave, funcao, *args):
+        """
+        Executa funcao(*args) em um executor (ou aguarda, se for uma corrotina), ou
+        aguarda a execução idêntica em voo.
+
+        As duplicadas recebem uma cópia rasa do resultado; exceções da execução
+        líder são propagadas para todas. Se a líder for cancelada (ex.: o cliente
+        desconectou), as duplicadas que a aguardavam refazem o cálculo.
+        """
+        if not coalescencia_habilitada():
+            return await _chamar(funcao, *args)
+
+        futuro = self._em_voo.get(chave)
+        if futuro is not None:
+            self.estatisticas["coalescidas"] += 1
+            try:
+                # shield: o cancelamento de uma duplicada não cancela a líder
+                return copy.copy(await asyncio.shield(futuro))
+            except asyncio.CancelledError:
+                # Cancelada foi a líder, não esta requisição: calcula de novo
+                if not futuro.cancelled():
+                    raise
+                return await self.executar(chave, funcao, *args)
+
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._em_voo[chave] = futuro
+        self.estatisticas["calculadas"] += 1
+        try:
+            resultado = await _chamar(funcao, *args)
+        except Exception as e:
+            self.estatisticas["falhas"] += 1
+            futuro.set_exception(e)
+            # Marca a exceção como recuperada caso nenhuma duplicada a aguarde
+            futuro.exception()
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            # Cancelamento (BaseException) não passa pelo except: sem isto as
+            # duplicadas aguardariam para sempre um future que nunca se resolve
+            if not futuro.done():
+                futuro.cancel()
+            del self._em_voo[chave]
+
+    def resumo(self):
+        calculadas = self.estatisticas["calculadas"]
+        coalescidas = self.estatisticas["coalescidas"]
+        total = calculadas + coalescidas
+        return {
+            **self.estatisticas,
+            "em_voo": len(self._em_voo),
+            "habilitada": coalescencia_habilitada(),
+            # Fração das requisições que não precisaram calcular
+            "economia": coalescidas / total if total else 0.0,
+        }
+
+
+coalescedor = Coalescedor()
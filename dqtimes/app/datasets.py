@@ -0,0 +1,155 @@
+# datasets.py
+# Cache de DataFrames enviados ao /projecao_dataframe/ e índice de páginas por partição
+#
+# A contagem de linhas de cada partição é feita uma única vez por dataset. A partir
+# dela o índice converte um offset global em (partição, linha local), de modo que a
+# página N lê apenas as linhas de que precisa, sem varrer o arquivo nem reenviá-lo.
+
+import os
+import hashlib
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import dask.dataframe as dd
+
+logger = logging.getLogger(__name__)
+
+# Quantidade máxima de datasets mantidos em disco/cache (DATASET_CACHE_MAX)
+MAX_DATASETS_PADRAO = 16
+
+
+class IndiceParticoes:
+    """Mapeia offsets globais de linha para (partição, linha local)"""
+
+    def __init__(self, contagens):
+        self.contagens = np.asarray(contagens, dtype=np.int64)
+        # inicios[p] é o offset global da primeira linha da partição p
+        self.inicios = np.concatenate(([0], np.cumsum(self.contagens)))
+
+    @property
+    def total_linhas(self):
+        return int(self.inicios[-1])
+
+    def localizar(self, offset):
+        """Retorna (partição, linha local) do offset global"""
+        if offset < 0 or offset >= self.total_linhas:
+            raise IndexError(f"Offset {offset} fora do intervalo [0, {self.total_linhas})")
+        # side='right' pula partições vazias que compartilham o mesmo início
+        particao = int(np.searchsorted(self.inicios, offset, side='right') - 1)
+        return particao, int(offset - self.inicios[particao])
+
+    def fatias(self, inicio, fim):
+        """Lista (partição, início local, fim local) que cobrem as linhas [inicio, fim)"""
+        fim = min(fim, self.total_linhas)
+        if inicio >= fim:
+            return []
+        primeira, _ = self.localizar(inicio)
+        ultima, _ = self.localizar(fim - 1)
+        resultado = []
+        for particao in range(primeira, ultima + 1):
+            a = max(inicio, self.inicios[particao]) - self.inicios[particao]
+            b = min(fim, self.inicios[particao + 1]) - self.inicios[particao]
+            if b > a:
+                resultado.append((particao, int(a), int(b)))
+        return resultado
+
+
+class Dataset:
+    """CSV enviado, já particionado e indexado"""
+
+    def __init__(self, dataset_id, caminho, header, index_col):
+        self.dataset_id = dataset_id
+        self.caminho = caminho
+        self.header = header
+        self.index_col = index_col
+        self.criado_em = datetime.utcnow()
+
+        ddf = dd.read_csv(caminho, header=0 if header else None)
+        if index_col:
+            ddf = ddf.drop(ddf.columns[0], axis=1)
+        self.ddf = ddf
+        self.particoes = ddf.to_delayed()
+        # Única passagem completa pelo arquivo: contagem de linhas por partição
+        self.indice = IndiceParticoes(ddf.map_partitions(len).compute())
+
+    def pagina(self, page, page_size):
+        """Fatias (partição, início, fim) da página 1-indexada"""
+        inicio = (page - 1) * page_size
+        return self.indice.fatias(inicio, inicio + page_size)
+
+    def ler_linhas(self, inicio, fim):
+        """
+        Linhas globais [inicio, fim) sem o cluster: o índice aponta as partições que
+        contêm o intervalo e só elas são lidas, no próprio thread (scheduler síncrono).
+        O custo depende do tamanho da partição, não da posição da página no arquivo.
+        """
+        partes = [self.particoes[particao].compute(scheduler="sync").iloc[a:b]
+                  for particao, a, b in self.indice.fatias(inicio, fim)]
+        if not partes:
+            return pd.DataFrame(columns=self.ddf.columns)
+        return partes[0] if len(partes) == 1 else pd.concat(partes)
+
+
+class CacheDatasets:
+    """Cache LRU de datasets, chaveado pelo hash do conteúdo e das opções de leitura"""
+
+    def __init__(self, max_datasets=None):
+        self.max_datasets = max_datasets or int(os.getenv("DATASET_CACHE_MAX", MAX_DATASETS_PADRAO))
+        self._datasets = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def calcular_id(conteudo, header, index_col):
+        digest = hashlib.sha256(conteudo)
+        digest.update(f"|{bool(header)}|{bool(index_col)}".encode())
+        return f"ds-{digest.hexdigest()[:16]}"
+
+    def registrar(self, conteudo, header, index_col):
+        """Registra (ou reaproveita) o dataset e retorna o Dataset indexado"""
+        dataset_id = self.calcular_id(conteudo, header, index_col)
+        existente = self.obter(dataset_id)
+        if existente is not None:
+            return existente
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp_file:
+            tmp_file.write(conteudo)
+            caminho = tmp_file.name
+
+        try:
+            dataset = Dataset(dataset_id, caminho, header, index_col)
+        except Exception:
+            os.unlink(caminho)
+            raise
+
+        with self._lock:
+            # Outro upload do mesmo conteúdo pode ter registrado o dataset enquanto
+            # este era indexado: fica o primeiro e a cópia duplicada é descartada
+            existente = self._datasets.get(dataset_id)
+            if existente is not None:
+                self._datasets.move_to_end(dataset_id)
+                self._remover_arquivo(dataset)
+                return existente
+            self._datasets[dataset_id] = dataset
+            while len(self._datasets) > self.max_datasets:
+                _, removido = self._datasets.popitem(last=False)
+                self._remover_arquivo(removido)
+        return dataset
+
+    def obter(self, dataset_id):
+        with self._lock:
+            dataset = self._datasets.get(dataset_id)
+            if dataset is not None:
+                self._datasets.move_to_end(dataset_id)
+            return dataset
+
+    @staticmethod
+    def _remover_arquivo(dataset):
+        try:
+            os.unlink(dataset.caminho)
+        except OSError as e:
+            logger.warning(f"Could not remove cached dataset {dataset.dataset_id}: {e}")
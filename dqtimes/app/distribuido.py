@@ -0,0 +1,58 @@
+# distribuido.py
+# Funções executadas nos workers Dask
+#
+# Ficam fora de main.py porque os workers importam o módulo da função serializada,
+# e importar main.py em um worker criaria outro LocalCluster.
+
+import logging
+
+import pandas as pd
+
+try:
+    from aplicacao import forecast_temp
+    import microlote
+except ImportError:
+    from .aplicacao import forecast_temp
+    from . import microlote
+
+logger = logging.getLogger(__name__)
+
+
+def projetar_particao(particao, n_projecoes, grupo=None):
+    """
+    Aplica forecast_temp a cada linha de uma partição (uma série por linha).
+
+    A partição é convertida para uma matriz float uma única vez, sem iterrows, e
+    apenas os resultados voltam para o driver. Quando o motor do micro-lote
+    reproduz o forecast_temp do processo (ver microlote.motor_equivalente), as
+    linhas elegíveis são projetadas juntas em uma única chamada a forecast_lote;
+    as demais (NaN, curtas) seguem por forecast_temp. grupo (o dataset_id) deixa o
+    Holt-Winters MLE partir dos parâmetros das linhas vizinhas.
+    """
+    linhas = [linha.tolist() for linha in particao.to_numpy(dtype=float)]
+    resultados = [None] * len(linhas)
+    no_lote = []
+    if microlote.motor_equivalente():
+        no_lote = [i for i, linha in enumerate(linhas) if microlote.elegivel(linha)]
+    if no_lote:
+        try:
+            projetadas = microlote.forecast_lote([linhas[i] for i in no_lote], n_projecoes)
+        except Exception as e:
+            logger.warning(f"Micro-batch engine failed on partition ({e}), forecasting rows one by one")
+        else:
+            for i, resultado in zip(no_lote, projetadas):
+                resultados[i] = resultado
+    for i, linha in enumerate(linhas):
+        if resultados[i] is None:
+            resultados[i] = forecast_temp(linha, n_projecoes, grupo=grupo)
+    return pd.Series(resultados, index=particao.index, dtype=object)
+
+
+def fatiar_particao(particao, inicio, fim):
+    """Linhas [inicio, fim) de uma partição, em posições locais"""
+    return particao.iloc[inicio:fim]
+
+
+def juntar_fatias(*fatias):
+    """Fatias consecutivas (de partições vizinhas) em um único DataFrame"""
+    return fatias[0] if len(fatias) == 1 else pd.concat(fatias)
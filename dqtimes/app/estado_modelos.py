@@ -0,0 +1,332 @@
+# estado_modelos.py
+# Estado ajustado do modelo vencedor por série, persistido para continuar em O(novos pontos)
+#
+# Depois de um forecast_temp com series_id, o modelo vencedor é reaplicado uma vez
+# sobre a série e o estado final fica gravado: nível/tendência/sazonais do
+# Holt-Winters, a janela da média móvel e os últimos movimentos (sobe/desce) usados
+# pela probabilidade bayesiana. Uma requisição que envia só as observações novas
+# continua desse estado sem reprocessar o histórico.
+#
+# O armazenamento é um SQLite com um registro binário compacto por série (struct +
+# float64), versão de esquema no cabeçalho e despejo por quantidade e idade.
+
+import os
+import time
+import struct
+import sqlite3
+import threading
+import logging
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from aplicacao import ALPHA_HW, BETA_HW
+except ImportError:
+    from .aplicacao import ALPHA_HW, BETA_HW
+
+logger = logging.getLogger(__name__)
+
+VERSAO_ESQUEMA = 1
+MAGICO = b"DQES"
+# Movimentos guardados: cobre o maior lookback (n_projecoes) aceito pela API
+MAX_MOVIMENTOS = 365
+# Travas por series_id (listradas) que serializam o ler-atualizar-gravar de uma série
+N_TRAVAS = 64
+# Métodos que podem continuar de um estado (HW_MLE refaz o ajuste; não é suportado)
+METODOS = ("NAIVE", "MA", "HW", "HW_GRADE")
+
+# magic, versão, método, período, observações, alpha, beta, gamma, nível, tendência,
+# último valor, subidas, movimentos, tamanhos (sazonais, janela, movimentos)
+_CABECALHO = struct.Struct("<4sHBHqddddddqqHHH")
+
+
+class EstadoModelo:
+    """Estado de um modelo após processar n observações"""
+
+    def __init__(self, metodo, period, alpha=0.0, beta=0.0, gamma=0.0):
+        if metodo not in METODOS:
+            raise ValueError(f"Método sem continuação incremental: {metodo}")
+        self.metodo = metodo
+        self.period = int(period)
+        self.alpha, self.beta, self.gamma = alpha, beta, gamma
+        self.n = 0
+        self.nivel = 0.0
+        self.tendencia = 0.0
+        self.ultimo = 0.0
+        self.sazonais = np.zeros(self.period if metodo == "HW_GRADE" else 0)
+        self.janela = deque(maxlen=self.period)
+        self.movimentos = []
+        self.subidas = 0
+        self.total_movimentos = 0
+
+    @classmethod
+    def para_vencedor(cls, metodo, period, parametros=None):
+        """Estado vazio com as constantes que o forecast_temp usou para o vencedor"""
+        if metodo == "HW":
+            return cls("HW", period, ALPHA_HW, BETA_HW, 0.0)
+        if metodo == "HW_GRADE":
+            return cls("HW_GRADE", period, parametros["alpha"], parametros["beta"], parametros["gamma"])
+        return cls(metodo, period)
+
+    def atualizar(self, novos):
+        """
+        Processa as observações novas e retorna os valores ajustados delas, com as
+        mesmas equações de python_moving_average, python_holt_winters_simple e
+        grade_hw.recorrencia.
+
+        Movimentos, ingênuo e média móvel são calculados de uma vez sobre o bloco
+        (as médias pelas mesmas reduções de np.mean, com resultado idêntico); só o
+        Holt-Winters, que é sequencial, percorre os valores um a um.
+        """
+        valores = np.asarray(novos, dtype=float)
+        if len(valores) == 0:
+            return []
+
+        anteriores = np.concatenate(([self.ultimo], valores[:-1])) if self.n > 0 else valores[:-1]
+        subiu = valores[len(valores) - len(anteriores):] > anteriores
+        self.movimentos.extend(subiu.astype(int).tolist())
+        self.subidas += int(subiu.sum())
+        self.total_movimentos += len(subiu)
+
+        if self.metodo == "NAIVE":
+            ajustados = ([self.ultimo] if self.n > 0 else [float(valores[0])]) + valores[:-1].tolist()
+        elif self.metodo == "MA":
+            ajustados = self._medias(valores)
+        else:
+            ajustados = self._holt_winters(valores.tolist())
+
+        self.ultimo = float(valores[-1])
+        self.n += len(valores)
+        del self.movimentos[:-MAX_MOVIMENTOS]
+        return ajustados
+
+    def _medias(self, valores):
+        """Média da janela terminada em cada valor novo, como em python_moving_average"""
+        anteriores = len(self.janela)
+        historico = np.concatenate((np.asarray(self.janela, dtype=float), valores))
+        # Enquanto a série tem menos de period pontos, a janela é o histórico inteiro
+        parciais = max(0, min(len(valores), self.period - 1 - anteriores))
+        ajustados = [float(np.mean(historico[:anteriores + j + 1])) for j in range(parciais)]
+        if parciais < len(valores):
+            janelas = sliding_window_view(historico, self.period)
+            ajustados += np.mean(janelas[anteriores + parciais - self.period + 1:], axis=1).tolist()
+        self.janela.extend(valores[-self.period:].tolist())
+        return ajustados
+
+    def _holt_winters(self, valores):
+        ajustados = []
+        n = self.n
+        for valor in valores:
+            if n == 0:
+                self.nivel, self.tendencia = valor, 0.0
+                ajustados.append(valor)
+            else:
+                indice = n % self.period if len(self.sazonais) else 0
+                s = self.sazonais[indice] if len(self.sazonais) else 0.0
+                ultimo_nivel = self.nivel
+                self.nivel = self.alpha * (valor - s) + (1 - self.alpha) * (self.nivel + self.tendencia)
+                self.tendencia = self.beta * (self.nivel - ultimo_nivel) + (1 - self.beta) * self.tendencia
+                if len(self.sazonais):
+                    s = self.gamma * (valor - self.nivel) + (1 - self.gamma) * s
+                    self.sazonais[indice] = s
+                ajustados.append(self.nivel + self.tendencia + s)
+            n += 1
+        return ajustados
+
+    def projetar(self, n_projecoes):
+        """n_projecoes valores à frente a partir do estado atual"""
+        if self.metodo == "NAIVE":
+            return [self.ultimo] * n_projecoes
+        if self.metodo == "MA":
+            return [float(np.mean(self.janela))] * n_projecoes
+        projecoes = []
+        for h in range(1, n_projecoes + 1):
+            s = self.sazonais[(self.n + h - 1) % self.period] if len(self.sazonais) else 0.0
+            projecoes.append(self.nivel + h * self.tendencia + s)
+        return projecoes
+
+    def probabilidade_subir(self, lookback):
+        """Mesma regra de python_bayes_probability sobre os últimos movimentos"""
+        recentes = self.movimentos[-lookback:] if lookback > 0 else self.movimentos
+        if not recentes:
+            return 0.5
+        return (sum(recentes) + 1) / (len(recentes) + 2)
+
+    # ---------- serialização ----------
+
+    def serializar(self):
+        movimentos = np.packbits(np.asarray(self.movimentos, dtype=np.uint8)).tobytes()
+        cabecalho = _CABECALHO.pack(
+            MAGICO, VERSAO_ESQUEMA, METODOS.index(self.metodo), self.period, self.n,
+            self.alpha, self.beta, self.gamma, self.nivel, self.tendencia, self.ultimo,
+            self.subidas, self.total_movimentos,
+            len(self.sazonais), len(self.janela), len(self.movimentos),
+        )
+        return (cabecalho + np.asarray(self.sazonais, dtype="<f8").tobytes()
+                + np.asarray(self.janela, dtype="<f8").tobytes() + movimentos)
+
+    @classmethod
+    def desserializar(cls, dados):
+        """Retorna o estado, ou None se o registro for de outra versão de esquema"""
+        campos = _CABECALHO.unpack_from(dados)
+        (magico, versao, metodo, period, n, alpha, beta, gamma, nivel, tendencia, ultimo,
+         subidas, total, n_sazonais, n_janela, n_movimentos) = campos
+        if magico != MAGICO or versao != VERSAO_ESQUEMA:
+            return None
+        estado = cls(METODOS[metodo], period, alpha, beta, gamma)
+        estado.n, estado.nivel, estado.tendencia, estado.ultimo = n, nivel, tendencia, ultimo
+        estado.subidas, estado.total_movimentos = subidas, total
+        posicao = _CABECALHO.size
+        estado.sazonais = np.frombuffer(dados, "<f8", n_sazonais, posicao).copy()
+        posicao += 8 * n_sazonais
+        estado.janela.extend(np.frombuffer(dados, "<f8", n_janela, posicao).tolist())
+        posicao += 8 * n_janela
+        bits = np.unpackbits(np.frombuffer(dados, np.uint8, offset=posicao))[:n_movimentos]
+        estado.movimentos = bits.astype(int).tolist()
+        return estado
+
+    def resumo(self):
+        return {
+            "metodo": self.metodo,
+            "periodo": self.period,
+            "observacoes": self.n,
+            "parametros": {"alpha": self.alpha, "beta": self.beta, "gamma": self.gamma},
+        }
+
+
+class ArmazemEstados:
+    """
+    Estados serializados por series_id em SQLite.
+
+    Despeja os menos usados acima de max_series e os não usados há mais de
+    ttl_dias; registros de outra versão de esquema são descartados ao abrir.
+    """
+
+    def __init__(self, caminho=None, max_series=None, ttl_dias=None):
+        self.caminho = caminho or os.getenv("MODEL_STATE_PATH", "/tmp/dqtimes_estado.sqlite3")
+        self.max_series = max_series or int(os.getenv("MODEL_STATE_MAX", "100000"))
+        self.ttl_dias = ttl_dias if ttl_dias is not None else float(os.getenv("MODEL_STATE_TTL_DAYS", "30"))
+        self._lock = threading.Lock()
+        self._travas_series = [threading.Lock() for _ in range(N_TRAVAS)]
+        self._conexao = None
+        # Registros na tabela, mantido a cada escrita para o despejo não contar a tabela
+        self._contagem = 0
+
+    def _conectar(self):
+        if self._conexao is None:
+            diretorio = os.path.dirname(self.caminho)
+            if diretorio:
+                os.makedirs(diretorio, exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+            conexao.execute("CREATE TABLE IF NOT EXISTS estados ("
+                            "series_id TEXT PRIMARY KEY, versao INTEGER, dados BLOB, usado_em REAL)")
+            conexao.execute("CREATE INDEX IF NOT EXISTS estados_usado_em ON estados (usado_em)")
+            removidos = conexao.execute("DELETE FROM estados WHERE versao != ?", (VERSAO_ESQUEMA,)).rowcount
+            if removidos:
+                logger.info(f"Dropped {removidos} model states from an older schema version")
+            conexao.commit()
+            self._contagem = conexao.execute("SELECT COUNT(*) FROM estados").fetchone()[0]
+            self._conexao = conexao
+        return self._conexao
+
+    def trava(self, series_id):
+        """Trava da série: quem lê, atualiza e grava o estado deve segurá-la do início ao fim"""
+        return self._travas_series[hash(series_id) % N_TRAVAS]
+
+    def obter(self, series_id):
+        with self._lock:
+            conexao = self._conectar()
+            linha = conexao.execute("SELECT dados FROM estados WHERE series_id = ?", (series_id,)).fetchone()
+            if linha is None:
+                return None
+            conexao.execute("UPDATE estados SET usado_em = ? WHERE series_id = ?", (time.time(), series_id))
+            conexao.commit()
+        return EstadoModelo.desserializar(linha[0])
+
+    def guardar(self, series_id, estado):
+        dados = estado.serializar()
+        with self._lock:
+            conexao = self._conectar()
+            existe = conexao.execute("SELECT 1 FROM estados WHERE series_id = ?", (series_id,)).fetchone()
+            conexao.execute("INSERT OR REPLACE INTO estados VALUES (?, ?, ?, ?)",
+                            (series_id, VERSAO_ESQUEMA, dados, time.time()))
+            self._contagem += existe is None
+            self._despejar(conexao)
+            conexao.commit()
+
+    def remover(self, series_id):
+        with self._lock:
+            conexao = self._conectar()
+            removido = conexao.execute("DELETE FROM estados WHERE series_id = ?", (series_id,)).rowcount
+            self._contagem -= removido
+            conexao.commit()
+        return removido > 0
+
+    def _despejar(self, conexao):
+        # Ambos usam o índice de usado_em; a contagem vem do contador, sem varrer a tabela
+        if self.ttl_dias > 0:
+            self._contagem -= conexao.execute("DELETE FROM estados WHERE usado_em < ?",
+                                              (time.time() - self.ttl_dias * 86400,)).rowcount
+        excesso = self._contagem - self.max_series
+        if excesso > 0:
+            self._contagem -= conexao.execute("DELETE FROM estados WHERE series_id IN "
+                                              "(SELECT series_id FROM estados ORDER BY usado_em LIMIT ?)",
+                                              (excesso,)).rowcount
+
+    def fechar(self):
+        with self._lock:
+            if self._conexao is not None:
+                self._conexao.close()
+                self._conexao = None
+
+
+armazem = ArmazemEstados()
+
+
+def persistencia_habilitada():
+    """MODEL_STATE_ENABLED (padrão: true)"""
+    return os.getenv("MODEL_STATE_ENABLED", "true").strip().lower() not in ("false", "0", "no")
+
+
+def registrar_resultado(series_id, data, resultado):
+    """
+    Grava o estado do vencedor de um forecast_temp sobre data. Retorna o estado, ou
+    None se o método vencedor não tiver continuação incremental.
+    """
+    metodo, period = resultado["metodo_vencedor"], resultado["periodo_vencedor"]
+    # O HW do kernel CUDA é outro modelo (reinicia a cada janela, constantes 0.5):
+    # o estado em Python não o continuaria
+    incremental = metodo in METODOS and not (metodo == "HW" and resultado.get("backend") == "cuda")
+    with armazem.trava(series_id):
+        if not incremental:
+            armazem.remover(series_id)
+            return None
+        parametros = None
+        if metodo == "HW_GRADE":
+            parametros = dict(zip(resultado["periodos_avaliados"], resultado["holt_winters_grade_params"]))[period]
+        estado = EstadoModelo.para_vencedor(metodo, period, parametros)
+        estado.atualizar(data)
+        armazem.guardar(series_id, estado)
+    return estado
+
+
+def continuar(series_id, novos, n_projecoes):
+    """
+    Continua o modelo gravado com as observações novas. Retorna None se não houver
+    estado para a série. Chamadas concorrentes da mesma série são serializadas, para
+    que nenhuma perca as observações da outra.
+    """
+    with armazem.trava(series_id):
+        estado = armazem.obter(series_id)
+        if estado is None:
+            return None
+        ajustados = estado.atualizar(novos)
+        armazem.guardar(series_id, estado)
+    return {
+        "ajustados": ajustados,
+        "projecoes": estado.projetar(n_projecoes),
+        "probabilidade_subir": estado.probabilidade_subir(n_projecoes),
+        "estado": estado.resumo(),
+    }
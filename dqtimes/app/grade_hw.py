@@ -0,0 +1,137 @@
+# grade_hw.py
+# Ajuste das constantes de suavização do Holt-Winters por busca em grade vetorizada
+#
+# python_holt_winters_simple usa alpha=0.2 e beta=0.1 fixos (o kernel CUDA, 0.5 para
+# tudo). Aqui todas as combinações (alpha, beta, gamma) da grade rodam em uma única
+# recorrência NumPy, com a grade no eixo 0: cada passo de tempo atualiza os estados
+# de todas as combinações de uma vez. O erro é o mesmo que o torneio do
+# forecast_temp usa (ajuste sobre o treino comparado índice a índice com a
+# validação), calculado sobre um corte interno da base para que a testemunha do
+# torneio não participe do ajuste; opcionalmente, a grade é refinada em torno da
+# melhor célula.
+#
+# O modelo é o de python_holt_winters_simple (nível inicial = primeiro valor,
+# tendência zero) com sazonalidade aditiva; com gamma=0 os dois coincidem.
+
+import os
+
+import numpy as np
+
+# Pontos por eixo da grade (HW_GRID_POINTS), da grade de refinamento e limites das constantes
+PONTOS_PADRAO = 8
+PONTOS_REFINO = 5
+LIMITES = (0.01, 0.99)
+
+
+def habilitado_por_padrao():
+    """HW_GRID_ENABLED: inclui o candidato ajustado em forecast_temp quando a chamada não decide"""
+    return os.getenv("HW_GRID_ENABLED", "false").strip().lower() in ("true", "1", "yes")
+
+
+def pontos_grade():
+    valor = os.getenv("HW_GRID_POINTS")
+    return int(valor) if valor and valor.strip() else PONTOS_PADRAO
+
+
+def montar_grade(alphas, betas, gammas):
+    """Produto cartesiano achatado: três vetores de mesmo tamanho G"""
+    a, b, g = np.meshgrid(alphas, betas, gammas, indexing="ij")
+    return a.ravel(), b.ravel(), g.ravel()
+
+
+def recorrencia(valores, period, alphas, betas, gammas):
+    """
+    Roda Holt-Winters aditivo para G combinações ao mesmo tempo.
+
+    Retorna (previsto, ajustado), ambos (G, n): previsto[:, i] é a previsão um passo à
+    frente feita antes de ver valores[i]; ajustado[:, i] é nível + tendência +
+    sazonal após a atualização, como em python_holt_winters_simple.
+    """
+    valores = np.asarray(valores, dtype=float)
+    alphas, betas, gammas = (np.asarray(x, dtype=float) for x in (alphas, betas, gammas))
+    n = len(valores)
+    g = len(alphas)
+    previsto = np.empty((g, n))
+    ajustado = np.empty((g, n))
+    if n == 0:
+        return previsto, ajustado
+
+    nivel = np.full(g, valores[0])
+    tendencia = np.zeros(g)
+    sazonal = np.zeros((g, period))
+    previsto[:, 0] = valores[0]
+    ajustado[:, 0] = valores[0]
+    for i in range(1, n):
+        s = sazonal[:, i % period]
+        previsto[:, i] = nivel + tendencia + s
+        ultimo_nivel = nivel
+        nivel = alphas * (valores[i] - s) + (1 - alphas) * (nivel + tendencia)
+        tendencia = betas * (nivel - ultimo_nivel) + (1 - betas) * tendencia
+        s = gammas * (valores[i] - nivel) + (1 - gammas) * s
+        sazonal[:, i % period] = s
+        ajustado[:, i] = nivel + tendencia + s
+    return previsto, ajustado
+
+
+def suavizar(valores, period, alpha, beta, gamma=0.0):
+    """Valores ajustados para uma única combinação (mesmo formato de python_holt_winters_simple)"""
+    if len(valores) < period:
+        return list(valores)
+    _, ajustado = recorrencia(valores, period, [alpha], [beta], [gamma])
+    return ajustado[0].tolist()
+
+
+def _pontuar(treino, validacao, period, grade):
+    """
+    MSE de cada combinação como o torneio do forecast_temp pontua: os valores
+    ajustados sobre o treino, alinhados pelo índice com a validação.
+    """
+    k = min(len(treino), len(validacao))
+    if len(treino) < period:
+        # suavizar devolve a própria série: todas as combinações empatam
+        erro = np.mean((treino[:k] - validacao[:k]) ** 2)
+        return np.full(len(grade[0]), erro)
+    with np.errstate(over="ignore", invalid="ignore"):
+        _, ajustado = recorrencia(treino, period, *grade)
+        erro = ajustado[:, :k] - validacao[:k]
+        # Combinações que divergem viram inf em vez de NaN para não vencerem o argmin
+        return np.nan_to_num(np.mean(erro ** 2, axis=1), nan=np.inf)
+
+
+def ajustar_grade(valores, period, n_pontos=None, refinar=True, fracao_testemunha=0.3):
+    """
+    Escolhe (alpha, beta, gamma) pelo mesmo critério do torneio, sobre um corte
+    interno: os primeiros pontos são suavizados e comparados, índice a índice, com
+    os últimos fracao_testemunha pontos. O forecast_temp passa só a base, de modo
+    que a testemunha do torneio não participa do ajuste.
+
+    refinar repete a busca em uma grade PONTOS_REFINO^3 restrita à vizinhança da
+    melhor célula. Retorna None se não houver validação suficiente.
+    """
+    valores = np.asarray(valores, dtype=float)
+    n = len(valores)
+    segundo_membro = int(n * fracao_testemunha)
+    if segundo_membro < 1 or n - segundo_membro < 2 or not np.isfinite(valores).all():
+        return None
+    treino, validacao = valores[:n - segundo_membro], valores[n - segundo_membro:]
+
+    n_pontos = n_pontos or pontos_grade()
+    eixo = np.linspace(*LIMITES, n_pontos)
+    passo = eixo[1] - eixo[0] if n_pontos > 1 else 0.0
+    grade = montar_grade(eixo, eixo, eixo)
+    erros = _pontuar(treino, validacao, period, grade)
+    melhor = int(np.argmin(erros))
+    alpha, beta, gamma = (float(x[melhor]) for x in grade)
+    mse = float(erros[melhor])
+
+    if refinar and passo > 0:
+        eixos = [np.linspace(max(LIMITES[0], c - passo), min(LIMITES[1], c + passo), PONTOS_REFINO)
+                 for c in (alpha, beta, gamma)]
+        grade = montar_grade(*eixos)
+        erros = _pontuar(treino, validacao, period, grade)
+        melhor = int(np.argmin(erros))
+        if erros[melhor] < mse:
+            alpha, beta, gamma = (float(x[melhor]) for x in grade)
+            mse = float(erros[melhor])
+
+    return {"alpha": alpha, "beta": beta, "gamma": gamma, "mse": mse}
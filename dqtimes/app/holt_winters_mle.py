@@ -0,0 +1,218 @@
+# holt_winters_mle.py
+# Holt-Winters com parâmetros otimizados (statsmodels) e reaproveitamento entre ajustes
+#
+# testemunha.holt_winters roda um ExponentialSmoothing(...).fit() completo, com busca
+# em grade, para cada período de cada linha. Aqui cada ajuste parte de um chute:
+#   1. parâmetros já ajustados para a mesma (série, período), se houver;
+#   2. parâmetros do mesmo período em uma linha vizinha do mesmo grupo (dataset);
+#   3. suavizações do período anterior da mesma chamada.
+# Com parâmetros em cache, a série é primeiro avaliada com eles fixos (uma passada,
+# sem otimização); só há novo ajuste se o erro piorar além de HW_MLE_DRIFT_THRESHOLD.
+
+import os
+import threading
+import warnings
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+except ImportError:
+    ExponentialSmoothing = None
+
+logger = logging.getLogger(__name__)
+
+# Piora relativa do MSE tolerada antes de reajustar (HW_MLE_DRIFT_THRESHOLD)
+LIMIAR_DERIVA_PADRAO = 0.25
+# Entradas (série, período) mantidas em cache (HW_MLE_CACHE_MAX)
+MAX_CACHE_PADRAO = 10_000
+
+
+def disponivel():
+    """statsmodels é dependência opcional deste modo"""
+    return ExponentialSmoothing is not None
+
+
+def habilitado_por_padrao():
+    """HW_MLE_ENABLED: inclui o candidato em forecast_temp quando a chamada não decide"""
+    return os.getenv("HW_MLE_ENABLED", "false").strip().lower() in ("true", "1", "yes")
+
+
+def limiar_deriva():
+    valor = os.getenv("HW_MLE_DRIFT_THRESHOLD")
+    return float(valor) if valor and valor.strip() else LIMIAR_DERIVA_PADRAO
+
+
+def periodo_suportado(n, period):
+    """A inicialização heurística do statsmodels exige dois ciclos completos"""
+    return n >= 2 * period + 1
+
+
+class Parametros:
+    """Parâmetros de um ajuste aditivo (tendência + sazonalidade)"""
+
+    __slots__ = ("alpha", "beta", "gamma", "nivel", "tendencia", "sazonais", "mse")
+
+    def __init__(self, alpha, beta, gamma, nivel, tendencia, sazonais, mse):
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.nivel = nivel
+        self.tendencia = tendencia
+        self.sazonais = np.asarray(sazonais, dtype=float)
+        self.mse = mse
+
+    @classmethod
+    def do_ajuste(cls, fit, n):
+        p = fit.params
+        return cls(p["smoothing_level"], p["smoothing_trend"], p["smoothing_seasonal"],
+                   p["initial_level"], p["initial_trend"], p["initial_seasons"], fit.sse / n)
+
+    def vetor_inicial(self):
+        """Ordem de start_params: [alpha, beta, gamma, nível, tendência, s0..s(m-1)]"""
+        return np.r_[self.alpha, self.beta, self.gamma, self.nivel, self.tendencia, self.sazonais]
+
+
+class CacheParametros:
+    """
+    LRU de Parametros por (série, período) e do último ajuste por (grupo, período),
+    cada um limitado a max_entradas, e contadores de diagnóstico dos ajustes
+    """
+
+    def __init__(self, max_entradas=None):
+        if max_entradas is None:
+            valor = os.getenv("HW_MLE_CACHE_MAX")
+            max_entradas = int(valor) if valor and valor.strip() else MAX_CACHE_PADRAO
+        self.max_entradas = max_entradas
+        self._series = OrderedDict()
+        self._grupos = OrderedDict()
+        self._lock = threading.Lock()
+        # Ajustes completos, com chute, reaproveitados sem ajuste e que falharam
+        self.estatisticas = {"frio": 0, "morno": 0, "reaproveitado": 0, "falhas": 0}
+
+    def obter(self, serie_id, period):
+        with self._lock:
+            chave = (serie_id, period)
+            if chave not in self._series:
+                return None
+            self._series.move_to_end(chave)
+            return self._series[chave]
+
+    def vizinho(self, grupo, period):
+        with self._lock:
+            chave = (grupo, period)
+            if chave not in self._grupos:
+                return None
+            self._grupos.move_to_end(chave)
+            return self._grupos[chave]
+
+    def guardar(self, serie_id, grupo, period, parametros):
+        with self._lock:
+            if serie_id is not None:
+                self._series[(serie_id, period)] = parametros
+                self._series.move_to_end((serie_id, period))
+                while len(self._series) > self.max_entradas:
+                    self._series.popitem(last=False)
+            if grupo is not None:
+                self._grupos[(grupo, period)] = parametros
+                self._grupos.move_to_end((grupo, period))
+                while len(self._grupos) > self.max_entradas:
+                    self._grupos.popitem(last=False)
+
+    def contar(self, chave):
+        with self._lock:
+            self.estatisticas[chave] += 1
+
+    def limpar(self):
+        with self._lock:
+            self._series.clear()
+            self._grupos.clear()
+
+    def __len__(self):
+        return len(self._series)
+
+
+cache = CacheParametros()
+
+# Contadores de diagnóstico, atualizados sob a trava do cache
+estatisticas = cache.estatisticas
+
+
+def _chute_heuristico(valores, period, base):
+    """Estados iniciais do período a partir dos dados, suavizações de outro ajuste"""
+    primeiro = valores[:period].mean()
+    segundo = valores[period:2 * period].mean()
+    return np.r_[base.alpha, base.beta, base.gamma, primeiro, (segundo - primeiro) / period,
+                 valores[:period] - primeiro]
+
+
+def _modelo(valores, period, conhecido=None):
+    if conhecido is None:
+        return ExponentialSmoothing(valores, trend="add", seasonal="add", seasonal_periods=period)
+    return ExponentialSmoothing(valores, trend="add", seasonal="add", seasonal_periods=period,
+                                initialization_method="known", initial_level=conhecido.nivel,
+                                initial_trend=conhecido.tendencia, initial_seasonal=conhecido.sazonais)
+
+
+def ajustar(valores, period, serie_id=None, grupo=None, chute=None):
+    """
+    Ajusta Holt-Winters aditivo a uma série e retorna (valores ajustados, Parametros).
+
+    Retorna (None, None) se a série for curta demais para o período, tiver NaN ou se
+    o ajuste falhar; o chamador trata como candidato indisponível.
+    """
+    if not disponivel():
+        raise RuntimeError("statsmodels não instalado: modo Holt-Winters MLE indisponível")
+    valores = np.asarray(valores, dtype=float)
+    n = len(valores)
+    if not periodo_suportado(n, period) or not np.isfinite(valores).all():
+        return None, None
+
+    with warnings.catch_warnings():
+        # ConvergenceWarning e afins são esperados em séries planas ou curtas
+        warnings.simplefilter("ignore")
+        try:
+            anterior = cache.obter(serie_id, period) if serie_id is not None else None
+            if anterior is not None:
+                fit = _modelo(valores, period, anterior).fit(
+                    smoothing_level=anterior.alpha, smoothing_trend=anterior.beta,
+                    smoothing_seasonal=anterior.gamma, optimized=False)
+                if fit.sse / n <= anterior.mse * (1 + limiar_deriva()):
+                    cache.contar("reaproveitado")
+                    return fit.fittedvalues, anterior
+                inicial = anterior.vetor_inicial()
+            else:
+                base = (cache.vizinho(grupo, period) if grupo is not None else None) or chute
+                inicial = _chute_heuristico(valores, period, base) if base is not None else None
+
+            if inicial is not None:
+                fit = _modelo(valores, period).fit(start_params=inicial, use_brute=False)
+                cache.contar("morno")
+            else:
+                fit = _modelo(valores, period).fit()
+                cache.contar("frio")
+        except (ValueError, np.linalg.LinAlgError) as e:
+            cache.contar("falhas")
+            logger.debug(f"Holt-Winters MLE failed for period {period}: {e}")
+            return None, None
+
+    parametros = Parametros.do_ajuste(fit, n)
+    cache.guardar(serie_id, grupo, period, parametros)
+    return fit.fittedvalues, parametros
+
+
+def holt_winters_mle(valores, periods, serie_id=None, grupo=None):
+    """
+    Valores ajustados para cada período (lista vazia onde não há ajuste), no formato
+    de cuda_holt_winters. Cada período parte das suavizações do anterior.
+    """
+    resultado = []
+    anterior = None
+    for period in periods:
+        ajustados, parametros = ajustar(valores, period, serie_id, grupo, chute=anterior)
+        if parametros is not None:
+            anterior = parametros
+        resultado.append([] if ajustados is None else ajustados.tolist())
+    return resultado
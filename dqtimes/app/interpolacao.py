@@ -0,0 +1,256 @@
+# interpolacao.py
+# Interpolação e preenchimento de lacunas vetorizados em NumPy, sobre lotes
+#
+# Tudo opera em lotes: séries são matrizes (séries, n) e grades são tensores
+# (grades, linhas, colunas), com lacunas marcadas como NaN. Cada método faz
+# operações sobre a matriz inteira, sem laço por série ou por lacuna:
+#
+#   - interpolacao_pares: a mesma conta do interpolation_kernel de
+#     libs/interpolador1d.cu, fallback de cuda_interpolacao1d sem o .so;
+#   - preencher_linear: reta entre os vizinhos conhecidos (np.interp por linha);
+#   - preencher_gaussiano: média dos pontos conhecidos ponderada por um kernel
+#     gaussiano (Nadaraya-Watson), somando os deslocamentos da janela;
+#   - preencher_polinomial: polinômio local pelos k pontos conhecidos de cada lado,
+#     com todos os sistemas resolvidos em um único np.linalg.solve;
+#   - preencher_2d_gaussiano: a vizinhança gaussiana do interpolador2d.cu, com pesos
+#     normalizados sobre as células conhecidas e passadas até fechar as lacunas.
+#
+# Por padrão só as lacunas internas (entre o primeiro e o último valor conhecido)
+# são preenchidas: NaN nas pontas costuma ser uma série mais curta que as outras
+# colunas do CSV, não um dado faltante.
+
+import numpy as np
+
+METODOS = ("linear", "gaussian", "polynomial")
+# Desvio padrão do kernel gaussiano, em passos (o sigma dos kernels CUDA)
+SIGMA_PADRAO = 1.0
+# Pontos conhecidos de cada lado e grau máximo do polinômio local
+VIZINHOS_POLINOMIO = 2
+GRAU_POLINOMIO = 3
+
+_NORMALIZACAO_GAUSS = 1.0 / np.sqrt(2 * np.pi)
+
+
+def _matriz(series):
+    """Cópia float (séries, n) e se a entrada era uma série só"""
+    matriz = np.array(series, dtype=float)
+    unica = matriz.ndim == 1
+    return (matriz[None, :] if unica else matriz), unica
+
+
+def _saida(matriz, unica):
+    return matriz[0] if unica else matriz
+
+
+def interpolacao_pares(indices, valores):
+    """
+    Resultados (multivariada, gaussiana, polinomial) do interpolation_kernel de
+    interpolador1d.cu para cada par consecutivo, avaliados no ponto da esquerda.
+    Aceita (n,) ou (séries, n); a última posição fica 0, como no kernel.
+    """
+    x, unica = _matriz(indices)
+    y, _ = _matriz(valores)
+    multivariada = np.zeros_like(y)
+    gaussiana = np.zeros_like(y)
+    x1, x2, y1, y2 = x[:, :-1], x[:, 1:], y[:, :-1], y[:, 1:]
+    # O kernel avalia em x = x1; a reta e o "polinômio" (também linear) coincidem
+    x_avaliado = x1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        multivariada[:, :-1] = y1 + (x_avaliado - x1) * (y2 - y1) / (x2 - x1)
+    gaussiana[:, :-1] = (y1 * np.exp(-0.5 * (x_avaliado - x1) ** 2) * _NORMALIZACAO_GAUSS
+                         + y2 * np.exp(-0.5 * (x_avaliado - x2) ** 2) * _NORMALIZACAO_GAUSS)
+    polinomial = multivariada.copy()
+    return _saida(multivariada, unica), _saida(gaussiana, unica), _saida(polinomial, unica)
+
+
+def _alvos(matriz, extremos):
+    """Máscara das lacunas a preencher (internas, ou todas se extremos) e dos conhecidos"""
+    conhecidos = ~np.isnan(matriz)
+    lacunas = ~conhecidos & conhecidos.any(axis=1, keepdims=True)
+    if not extremos:
+        n = matriz.shape[1]
+        primeiro = conhecidos.argmax(axis=1)[:, None]
+        ultimo = n - 1 - conhecidos[:, ::-1].argmax(axis=1)[:, None]
+        colunas = np.arange(n)
+        lacunas &= (colunas > primeiro) & (colunas < ultimo)
+    return lacunas, conhecidos
+
+
+def _vizinhos_conhecidos(conhecidos, linhas, colunas):
+    """
+    Coluna do conhecido anterior (-1 se não há) e do seguinte (n se não há) de cada
+    lacuna, por busca binária nas posições conhecidas do lote achatado.
+    """
+    n = conhecidos.shape[1]
+    planos = np.flatnonzero(conhecidos)
+    alvo = linhas * n + colunas
+    seguinte_i = np.searchsorted(planos, alvo)
+    anterior = planos[np.maximum(seguinte_i - 1, 0)] - linhas * n
+    seguinte = planos[np.minimum(seguinte_i, len(planos) - 1)] - linhas * n
+    # O vizinho encontrado pode estar em outra linha (ou não existir)
+    anterior = np.where((seguinte_i > 0) & (anterior >= 0), anterior, -1)
+    seguinte = np.where((seguinte_i < len(planos)) & (seguinte < n), seguinte, n)
+    return anterior, seguinte
+
+
+def preencher_linear(series, extremos=False):
+    """
+    Lacunas (NaN) preenchidas pela reta entre os conhecidos vizinhos, como np.interp
+    linha a linha. Com extremos, as pontas repetem o primeiro/último conhecido.
+    Linhas sem nenhum valor conhecido ficam como estão.
+    """
+    matriz, unica = _matriz(series)
+    if matriz.size == 0:
+        return _saida(matriz, unica)
+    lacunas, conhecidos = _alvos(matriz, extremos)
+    n = matriz.shape[1]
+    linhas, colunas = np.nonzero(lacunas)
+    esquerda, direita = _vizinhos_conhecidos(conhecidos, linhas, colunas)
+    # Nas pontas, o vizinho que falta é o próprio conhecido do outro lado
+    esquerda = np.where(esquerda >= 0, esquerda, direita)
+    direita = np.where(direita < n, direita, esquerda)
+    y_esq, y_dir = matriz[linhas, esquerda], matriz[linhas, direita]
+    peso = (colunas - esquerda) / np.maximum(direita - esquerda, 1)
+    matriz[linhas, colunas] = y_esq + (y_dir - y_esq) * peso
+    return _saida(matriz, unica)
+
+
+def preencher_gaussiano(series, sigma=SIGMA_PADRAO, raio=None, extremos=False):
+    """
+    Lacunas preenchidas pela média dos conhecidos a até raio passos (padrão: 3 sigma),
+    ponderada por exp(-d²/2σ²). Lacunas sem conhecido na janela caem na reta.
+    """
+    matriz, unica = _matriz(series)
+    if matriz.size == 0:
+        return _saida(matriz, unica)
+    raio = int(np.ceil(3 * sigma)) if raio is None else int(raio)
+    lacunas, conhecidos = _alvos(matriz, extremos)
+    n = matriz.shape[1]
+
+    valores = np.where(conhecidos, matriz, 0.0)
+    pesos = conhecidos.astype(float)
+    numerador = np.zeros_like(matriz)
+    denominador = np.zeros_like(matriz)
+    # Uma soma por deslocamento da janela, cada uma sobre o lote inteiro
+    for d in range(-raio, raio + 1):
+        if abs(d) >= n:
+            continue
+        peso = np.exp(-0.5 * (d / sigma) ** 2)
+        destino = slice(max(0, -d), n - max(0, d))
+        origem = slice(max(0, d), n - max(0, -d))
+        numerador[:, destino] += peso * valores[:, origem]
+        denominador[:, destino] += peso * pesos[:, origem]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        suavizado = numerador / denominador
+    sem_vizinhos = lacunas & (denominador == 0)
+    if sem_vizinhos.any():
+        suavizado[sem_vizinhos] = preencher_linear(matriz, extremos)[sem_vizinhos]
+    matriz[lacunas] = suavizado[lacunas]
+    return _saida(matriz, unica)
+
+
+def preencher_polinomial(series, vizinhos=VIZINHOS_POLINOMIO, grau=GRAU_POLINOMIO, extremos=False):
+    """
+    Lacunas preenchidas pelo polinômio de grau até 2*vizinhos - 1 ajustado (mínimos
+    quadrados) aos vizinhos conhecidos de cada lado; perto das pontas a janela
+    desliza para dentro. Linhas com menos de 2*vizinhos conhecidos usam a reta.
+    """
+    matriz, unica = _matriz(series)
+    if matriz.size == 0:
+        return _saida(matriz, unica)
+    lacunas, conhecidos = _alvos(matriz, extremos)
+    janela = 2 * vizinhos
+    grau = min(grau, janela - 1)
+    contagem = conhecidos.sum(axis=1)
+    poucas = contagem < janela
+    if poucas.any():
+        matriz[poucas] = preencher_linear(matriz[poucas], extremos)
+
+    linhas, colunas = np.nonzero(lacunas & ~poucas[:, None])
+    if len(linhas):
+        n = matriz.shape[1]
+        # Posições conhecidas do lote achatado; cada linha ocupa um trecho contíguo
+        planos = np.flatnonzero(conhecidos)
+        inicio_linha = np.searchsorted(planos, linhas * n)
+        # Quantos conhecidos antes de cada lacuna: a janela começa vizinhos antes disso
+        antes = np.searchsorted(planos, linhas * n + colunas) - inicio_linha
+        inicio = inicio_linha + np.clip(antes - vizinhos, 0, contagem[linhas] - janela)
+        posicoes = planos[inicio[:, None] + np.arange(janela)] - (linhas * n)[:, None]
+        y = matriz[linhas[:, None], posicoes]
+        # x relativo à lacuna e escalado pela janela: o valor na lacuna é o termo constante
+        escala = np.maximum(np.abs(posicoes - colunas[:, None]).max(axis=1, keepdims=True), 1)
+        x = (posicoes - colunas[:, None]) / escala
+        vandermonde = x[:, :, None] ** np.arange(grau + 1)
+        normal = np.einsum("gji,gjk->gik", vandermonde, vandermonde)
+        lado = np.einsum("gji,gj->gi", vandermonde, y)
+        coeficientes = np.linalg.solve(normal, lado[:, :, None])[:, :, 0]
+        matriz[linhas, colunas] = coeficientes[:, 0]
+    return _saida(matriz, unica)
+
+
+def preencher(series, metodo="linear", **opcoes):
+    """Preenche as lacunas do lote com o método dado (linear, gaussian ou polynomial)"""
+    if metodo == "linear":
+        return preencher_linear(series, **opcoes)
+    if metodo == "gaussian":
+        return preencher_gaussiano(series, **opcoes)
+    if metodo == "polynomial":
+        return preencher_polinomial(series, **opcoes)
+    raise ValueError(f"Método de interpolação desconhecido: {metodo} (use {', '.join(METODOS)})")
+
+
+def preencher_2d_gaussiano(grades, sigma=SIGMA_PADRAO, raio=1, lacuna=np.nan, max_passadas=None):
+    """
+    Lacunas de grades (linhas, colunas) ou lotes (grades, linhas, colunas) preenchidas
+    pela média gaussiana das células conhecidas na vizinhança (2*raio+1)². lacuna é o
+    marcador (NaN, ou -1 como no interpolador2d.cu). Lacunas sem vizinho conhecido
+    esperam a passada seguinte, até fechar tudo ou max_passadas (padrão: maior lado).
+    """
+    tensor = np.array(grades, dtype=float)
+    unica = tensor.ndim == 2
+    if unica:
+        tensor = tensor[None]
+    if tensor.size == 0:
+        return tensor[0] if unica else tensor
+    vazias = np.isnan(tensor) if np.isnan(lacuna) else tensor == lacuna
+    tensor[vazias] = np.nan
+    _, linhas, colunas = tensor.shape
+    max_passadas = max(linhas, colunas) if max_passadas is None else max_passadas
+
+    deslocamentos = [(dy, dx, np.exp(-0.5 * (dy * dy + dx * dx) / sigma ** 2))
+                     for dy in range(-raio, raio + 1) for dx in range(-raio, raio + 1)
+                     if (dy or dx) and abs(dy) < linhas and abs(dx) < colunas]
+    for _ in range(max_passadas):
+        vazias = np.isnan(tensor)
+        if not vazias.any():
+            break
+        valores = np.where(vazias, 0.0, tensor)
+        pesos = (~vazias).astype(float)
+        numerador = np.zeros_like(tensor)
+        denominador = np.zeros_like(tensor)
+        for dy, dx, peso in deslocamentos:
+            destino = (slice(None), slice(max(0, -dy), linhas - max(0, dy)),
+                       slice(max(0, -dx), colunas - max(0, dx)))
+            origem = (slice(None), slice(max(0, dy), linhas - max(0, -dy)),
+                      slice(max(0, dx), colunas - max(0, -dx)))
+            numerador[destino] += peso * valores[origem]
+            denominador[destino] += peso * pesos[origem]
+        preenchiveis = vazias & (denominador > 0)
+        if not preenchiveis.any():
+            break
+        tensor[preenchiveis] = numerador[preenchiveis] / denominador[preenchiveis]
+    return tensor[0] if unica else tensor
+
+
+def preencher_dataframe(df, metodo="linear", **opcoes):
+    """
+    Cópia do DataFrame com as lacunas das colunas numéricas preenchidas de uma vez
+    (cada coluna é uma série do lote). Colunas não numéricas ficam como estão.
+    """
+    saida = df.copy()
+    numericas = saida.select_dtypes(include="number").columns
+    if len(numericas) and len(saida):
+        matriz = saida[numericas].to_numpy(dtype=float).T
+        saida[numericas] = preencher(matriz, metodo, **opcoes).T
+    return saida
@@ -0,0 +1,115 @@
+# intervalos.py
+# Intervalos de previsão por bootstrap dos resíduos do modelo vencedor
+#
+# Os erros um passo à frente do vencedor nos pontos da testemunha (origem móvel:
+# cada ponto previsto só com o que veio antes dele) são reamostrados com reposição: os B caminhos sobre o horizonte saem de uma única indexação
+# (B, h) da tabela de resíduos somada às projeções, e os dois limites de todos os
+# passos saem de uma única chamada a np.quantile. Cada passo recebe um sorteio
+# independente, como o ajuste ponto a ponto que a API devolve como projeção.
+#
+# B se ajusta ao prazo da requisição: o custo por elemento do caminho é medido a
+# cada execução (média móvel exponencial) e, com deadline_ms, B é o que cabe no
+# tempo restante, entre BOOTSTRAP_MIN_PATHS e BOOTSTRAP_PATHS.
+
+import os
+import time
+import threading
+
+import numpy as np
+
+# Caminhos sem prazo (BOOTSTRAP_PATHS) e mínimo com prazo (BOOTSTRAP_MIN_PATHS)
+CAMINHOS_PADRAO = 1000
+CAMINHOS_MINIMO_PADRAO = 100
+# Estimativa inicial do custo por elemento (sorteio, soma e quantil), em nanossegundos
+CUSTO_INICIAL_NS = 40.0
+# Peso da execução mais recente na estimativa do custo
+PESO_CUSTO = 0.2
+# Resíduos mínimos para reamostrar; abaixo disso o intervalo colapsa na projeção
+MIN_RESIDUOS = 2
+# Métodos cujo ajuste em t já é a previsão de t (os demais são defasados um passo)
+METODOS_PREVISAO = ("NAIVE", "HW_MLE")
+
+
+def _env(nome, padrao):
+    valor = os.getenv(nome)
+    return int(valor) if valor and valor.strip() else padrao
+
+
+def configuracao():
+    return {
+        "caminhos": _env("BOOTSTRAP_PATHS", CAMINHOS_PADRAO),
+        "caminhos_minimo": _env("BOOTSTRAP_MIN_PATHS", CAMINHOS_MINIMO_PADRAO),
+    }
+
+
+def residuos_um_passo(data, ajustado, metodo, n_fora):
+    """
+    Erros finitos da previsão um passo à frente nos últimos n_fora pontos. O ajuste
+    de MA e HW em t já incorpora data[t] (a média inclui a observação corrente), então
+    a previsão de data[t] é o ajuste em t-1; NAIVE e HW_MLE já devolvem em t a
+    previsão feita antes de ver data[t].
+    """
+    n = min(len(data), len(ajustado))
+    data = np.asarray(data[:n], dtype=float)
+    ajustado = np.asarray(ajustado[:n], dtype=float)
+    if metodo not in METODOS_PREVISAO:
+        ajustado = np.r_[np.nan, ajustado[:-1]]
+    inicio = max(n - n_fora, 1)
+    residuos = data[inicio:] - ajustado[inicio:]
+    return residuos[np.isfinite(residuos)]
+
+
+class MotorIntervalos:
+    """Bootstrap vetorizado com B adaptado ao prazo e contadores de uso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.custo_ns = CUSTO_INICIAL_NS
+        self.estatisticas = {"chamadas": 0, "caminhos_total": 0, "limitadas_por_prazo": 0}
+
+    def numero_caminhos(self, horizonte, restante_ms=None):
+        """B para o horizonte: o padrão sem prazo, ou o que cabe em restante_ms"""
+        config = configuracao()
+        if restante_ms is None:
+            return config["caminhos"]
+        cabem = int(max(restante_ms, 0.0) * 1e6 / (self.custo_ns * max(horizonte, 1)))
+        return max(config["caminhos_minimo"], min(config["caminhos"], cabem))
+
+    def intervalos(self, projecoes, residuos, nivel=0.95, restante_ms=None, rng=None):
+        """
+        Limites (inferior, superior) de cada projeção ao nível dado. Retorna
+        (inferior, superior, B); sem resíduos suficientes os limites são a própria
+        projeção e B é 0.
+        """
+        projecoes = np.asarray(projecoes, dtype=float)
+        residuos = np.asarray(residuos, dtype=float)
+        horizonte = len(projecoes)
+        if horizonte == 0 or len(residuos) < MIN_RESIDUOS:
+            return projecoes.copy(), projecoes.copy(), 0
+
+        b = self.numero_caminhos(horizonte, restante_ms)
+        rng = rng if rng is not None else np.random.default_rng()
+        inicio = time.perf_counter()
+        caminhos = projecoes + residuos[rng.integers(0, len(residuos), size=(b, horizonte))]
+        inferior, superior = np.quantile(caminhos, [(1 - nivel) / 2, (1 + nivel) / 2], axis=0)
+        custo = (time.perf_counter() - inicio) * 1e9 / caminhos.size
+
+        with self._lock:
+            self.custo_ns += PESO_CUSTO * (custo - self.custo_ns)
+            self.estatisticas["chamadas"] += 1
+            self.estatisticas["caminhos_total"] += b
+            if b < configuracao()["caminhos"]:
+                self.estatisticas["limitadas_por_prazo"] += 1
+        return inferior, superior, b
+
+    def resumo(self):
+        chamadas = self.estatisticas["chamadas"]
+        return {
+            **self.estatisticas,
+            "caminhos_medio": self.estatisticas["caminhos_total"] / chamadas if chamadas else 0.0,
+            "custo_ns_por_elemento": self.custo_ns,
+            **configuracao(),
+        }
+
+
+motor = MotorIntervalos()
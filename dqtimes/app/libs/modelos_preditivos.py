@@ -5,29 +5,98 @@ Created on Tue Mar 19 08:20:42 2024
 @author: Fabiano Dicheti
 """
 
+from copy import copy as cp
+from collections import deque
+
+try:
+    from py_utils import binariza, binariza_lote, inferencia_bayes_bin_general, tax_acrescimo
+except ImportError:
+    from .py_utils import binariza, binariza_lote, inferencia_bayes_bin_general, tax_acrescimo
+
+
+# janela de naive_bayes a partir de 7 valores: binariza com defasagem 5 e padrões de 6 bits
+N_BINARIZACAO = 6
+
+
+def _prever_naive(ultimo, subir, taxa):
+    if subir > 0.5:
+        return ultimo + (ultimo * taxa[0])
+    return ultimo + (ultimo * taxa[1])
+
+
 def naive_bayes(lista, n_de_prevs):
-    from copy import copy as cp
+    '''
+    a cada passo binariza a série (sobe/desce com defasagem n-1) e estima a chance de
+    subir pelos padrões de n bits que começam com os últimos n-1 bits
 
+    com 7 valores ou mais a binarização fica fixa e os padrões vão para uma tabela de
+    contagens de 2^n posições: cada previsão acrescenta um bit e uma janela em O(1).
+    Só os últimos bits (que comparam com o primeiro valor da série, ver binariza) mudam
+    entre passos e são recontados à parte
+    '''
     lista1 = cp(lista)
     prevs = []
-    contador = 1
     taxa = tax_acrescimo(lista)
-    while contador <= n_de_prevs:
+
+    # séries curtas: a janela de binarização ainda muda a cada passo
+    while len(prevs) < n_de_prevs and len(lista1) < N_BINARIZACAO + 1:
         n_binarizacao = min(max(len(lista1) - 1, 2), 6)
         a = binariza(lista1, n_binarizacao - 1, n_binarizacao - 1)
         b = inferencia_bayes_bin_general(a, n_binarizacao)
-        alta = b[0]
-
-        ultimo = lista1[-1]
-
-        if alta > 0.5:
-            prev = ultimo + (ultimo * taxa[0])
-        else:
-            prev = ultimo + (ultimo * taxa[1])
-
+        prev = _prever_naive(lista1[-1], b[0], taxa)
         prevs.append(prev)
         lista1.append(prev)
-        contador += 1
+    if len(prevs) == n_de_prevs:
+        return prevs
+
+    n = N_BINARIZACAO
+    k = n - 1
+    mascara = (1 << n) - 1
+    primeiro = lista1[0]
+    # bits estáveis: lista[i+k] > lista[i] (o início da binarização); contagens das
+    # janelas de n bits entre eles
+    estaveis = binariza_lote([lista1], k, k)[0][:len(lista1) - k]
+    n_bits = len(estaveis)
+    codigos = np.zeros(max(n_bits - n + 1, 0), dtype=np.int64)
+    for j in range(n):
+        codigos = (codigos << 1) | estaveis[j:j + len(codigos)]
+    contagens = np.bincount(codigos, minlength=1 << n).tolist()
+    recentes = 0
+    for bit in estaveis[-n:]:
+        recentes = (recentes << 1) | int(bit)
+    valores = deque(lista1[-k:], maxlen=k)
+    ultimo = lista1[-1]
+
+    while len(prevs) < n_de_prevs:
+        # últimos k-1 bits comparam o primeiro valor com lista[L-k..L-2]
+        cauda = [1 if primeiro - valores[j] > 0 else 0 for j in range(k - 1)]
+        estaveis = min(n_bits, k)
+        trecho = [(recentes >> (estaveis - 1 - j)) & 1 for j in range(estaveis)] + cauda
+        extras = [0] * (1 << n)
+        for inicio in range(len(trecho) - n + 1):
+            janela = 0
+            for bit in trecho[inicio:inicio + n]:
+                janela = (janela << 1) | bit
+            extras[janela] += 1
+
+        final = 0
+        for bit in trecho[-(n - 1):]:
+            final = (final << 1) | bit
+        subir = 0.5
+        # inferencia_bayes_bin_general só consulta os padrões finais 0..2(n-1)-1
+        if final < 2 * (n - 1):
+            acres = contagens[(final << 1) | 1] + extras[(final << 1) | 1]
+            decre = contagens[final << 1] + extras[final << 1]
+            subir = acres / (acres + decre) if acres > 0 else 0.001
+
+        prev = _prever_naive(ultimo, subir, taxa)
+        prevs.append(prev)
+        recentes = ((recentes << 1) | (1 if prev - valores[0] > 0 else 0)) & mascara
+        n_bits += 1
+        if n_bits >= n:
+            contagens[recentes] += 1
+        valores.append(prev)
+        ultimo = prev
 
     return prevs
 
@@ -169,6 +238,93 @@ def previsao1(lista,ano1):
 
 
 
+def _janela_inicial(lista, k):
+    '''
+    Últimos k valores da série; séries mais curtas que k são repetidas (como a
+    antiga duplicação lista+lista) e a janela termina no último valor observado
+    '''
+    L = len(lista)
+    if L == 0:
+        raise ValueError("lista vazia: não há valores para a média móvel")
+    if L >= k:
+        return [lista[i] for i in range(L - k, L)]
+    return [lista[(j - k) % L] for j in range(k)]
+
+
+def _somar_compensado(soma, compensacao, valor):
+    '''soma de Neumaier: devolve (soma, compensação) com o erro de arredondamento guardado'''
+    total = soma + valor
+    if abs(soma) >= abs(valor):
+        compensacao += (soma - total) + valor
+    else:
+        compensacao += (valor - total) + soma
+    return total, compensacao
+
+
+def media_movel(lista, n_de_prevs, k):
+    '''
+    Média móvel de k períodos
+
+    cada previsão é a média dos k valores anteriores e entra na janela antes da próxima
+    previsão. A janela é um buffer circular (deque de tamanho k) com soma corrente: a
+    cada passo a previsão entra e o valor mais antigo sai, em O(1), sem copiar nem
+    fatiar a série. A soma é compensada (Neumaier), então não acumula deriva ao longo
+    do horizonte
+
+    lista = array com os dados históricos/série temporal
+
+    n_de_prevs = quantas previsões devem ser feitas
+
+    k = tamanho da janela
+    '''
+    janela = deque(_janela_inicial(lista, k), maxlen=k)
+    soma, compensacao = 0.0, 0.0
+    for valor in janela:
+        soma, compensacao = _somar_compensado(soma, compensacao, valor)
+    previsoes = []
+    for _ in range(n_de_prevs):
+        x = (soma + compensacao) / k
+        previsoes.append(x)
+        # entra x e sai o mais antigo: diferença somada com _somar_compensado em linha
+        delta = x - janela[0]
+        total = soma + delta
+        if abs(soma) >= abs(delta):
+            compensacao += (soma - total) + delta
+        else:
+            compensacao += (delta - total) + soma
+        soma = total
+        janela.append(x)
+    return previsoes
+
+
+def media_movel_lote(matriz, n_de_prevs, k):
+    '''
+    media_movel para várias séries de mesmo tamanho; retorna (séries x n_de_prevs)
+
+    com a = 1 + 1/k a soma da janela segue S_{t+1} = a * S_t - c_t, em que c_t é o
+    valor que sai. Dentro de um bloco de até k passos todos os c_t já são conhecidos
+    (valores da série ou previsões de blocos anteriores), então o bloco inteiro sai de
+    um cumsum no eixo 1: S_{t0+i} = a^i * (S_t0 - soma_{j<i} a^(-1-j) * c_{t0+j}).
+    O laço em Python tem ceil(n_de_prevs / k) iterações em vez de uma por previsão
+    '''
+    matriz = _matriz_lote(matriz)
+    L = matriz.shape[1]
+    colunas = list(range(L - k, L)) if L >= k else [(j - k) % L for j in range(k)]
+    # coluna = janela inicial seguida das previsões; c_t é coluna[:, t]
+    coluna = np.empty((matriz.shape[0], k + max(n_de_prevs, 0)))
+    coluna[:, :k] = matriz[:, colunas]
+    a = 1 + 1 / k
+    for t0 in range(0, n_de_prevs, k):
+        m = min(k, n_de_prevs - t0)
+        # soma refeita a partir da janela a cada bloco: o erro não se acumula entre blocos
+        soma = coluna[:, t0:t0 + k].sum(axis=1)
+        potencias = a ** np.arange(m + 1)
+        acumulado = np.cumsum(coluna[:, t0:t0 + m] / potencias[1:], axis=1)
+        somas = potencias * (soma[:, None] - np.hstack([np.zeros((len(soma), 1)), acumulado]))
+        coluna[:, k + t0:k + t0 + m] = somas[:, :m] / k
+    return coluna[:, k:]
+
+
 def media_movel3(lista, n_de_prevs):
     '''
     Média móvel de 3 períodos
@@ -177,24 +333,7 @@ def media_movel3(lista, n_de_prevs):
     
     n_de_prevs = quantas previsões devem ser feitas
     '''
-    from copy import copy as cp
-    a3 = 3
-    i3 = 1
-    
-    lista3 = cp(lista)
-
-    while len(lista3) < 3:
-      lista3 = lista3+lista3
-    
-    previsoes_media_movel3 = []
-    final = lista3[(len(lista3)-a3):]
-    while i3 <= n_de_prevs:
-        x = (final[0]+final[1]+final[2])/a3
-        previsoes_media_movel3.append(x)
-        lista3.append(x)
-        final = lista3[(len(lista3)-a3):]
-        i3 +=1
-    return(previsoes_media_movel3)
+    return media_movel(lista, n_de_prevs, 3)
 
 
 
@@ -207,25 +346,7 @@ def media_movel4(lista, n_de_prevs):
 
     n_de_prevs = quantas previsões devem ser feitas
     '''
-    
-    from copy import copy as cp
-    i = 1
-    a = 4
-    lista4 = cp(lista)
-    L = len(lista4)
-
-    while len(lista4) < 4:
-      lista4 = lista4+lista4
-    
-    previsoes_media_movel4 = []
-    final4 = lista4[(len(lista4)-a):]
-    while i <= n_de_prevs:
-        x = (final4[0]+final4[1]+final4[2]+final4[3])/a
-        previsoes_media_movel4.append(x)
-        lista4.append(x)
-        final4 = lista4[(len(lista4)-a):]
-        i +=1
-    return(previsoes_media_movel4)    
+    return media_movel(lista, n_de_prevs, 4)
     
 
 def media_movel12(lista, n_de_prevs):
@@ -237,24 +358,7 @@ def media_movel12(lista, n_de_prevs):
 
     n_de_prevs = quantas previsões devem ser feitas
     '''
-    from copy import copy as cp
-    a = 12
-    i = 1
-    lista12 = cp(lista)
-    previsoes_media_movel12 = []
-    
-    while len(lista12) < 12:
-      lista12 = lista12+lista12
-    
-    final12 = lista12[(len(lista12)-a):]
-    while i <= n_de_prevs:
-        x = sum(final12[:])
-        w = (x)/a
-        previsoes_media_movel12.append(w)
-        lista12.append(w)
-        final12 = lista12[(len(lista12)-a):]
-        i +=1
-    return(previsoes_media_movel12)
+    return media_movel(lista, n_de_prevs, 12)
 
 
 def media_movel30(lista, n_de_prevs):
@@ -267,24 +371,7 @@ def media_movel30(lista, n_de_prevs):
 
     n_de_prevs = quantas previsões devem ser feitas
     '''
-    from copy import copy as cp
-    a = 30
-    i = 1
-    lista30 = cp(lista)
-    while len(lista30)<30:
-      lista30 = lista30+lista30
-
-    previsoes_media_movel30 = []
-
-    final30 = lista30[(len(lista30)-a):]
-    while i <= n_de_prevs:
-        x = sum(final30[:])
-        w = (x)/a
-        previsoes_media_movel30.append(w)
-        lista30.append(w)
-        final30 = lista30[(len(lista30)-a):]
-        i +=1
-    return(previsoes_media_movel30)
+    return media_movel(lista, n_de_prevs, 30)
 
 
 
@@ -328,6 +415,75 @@ def media_suave3(lista, n_de_prevs):
 
 
 
+def _repetir_ate(lista, minimo):
+    '''lista+lista até atingir minimo elementos'''
+    if len(lista) == 0:
+        raise ValueError("lista vazia: não há valores para a previsão")
+    repetida = list(lista)
+    while len(repetida) < minimo:
+        repetida = repetida + repetida
+    return repetida
+
+
+def _sazonalidade_media(janela, n_de_prevs, divisor):
+    '''
+    Componente sazonal de sazonal_aditivo/sazonal_multiplicativo: a cada passo o
+    valor mais antigo da janela, menos a média da janela, dividido por divisor. O
+    mais antigo sai e o componente entra duas vezes (a janela cresce 1 por passo).
+    Soma acumulada + deque: O(1) por passo
+    '''
+    janela = deque(janela)
+    soma = sum(janela)
+    sazonalidade = []
+    for _ in range(n_de_prevs):
+        media = soma / len(janela)
+        cast1 = (janela[0] - media) / divisor
+        sazonalidade.append(cast1)
+        janela.append(cast1)
+        janela.append(cast1)
+        soma = soma - janela.popleft() + 2 * cast1
+    return sazonalidade
+
+
+def _sazonalidade_media_lote(matriz, n_de_prevs, divisor):
+    '''_sazonalidade_media para todas as linhas de uma matriz (séries x períodos)'''
+    n_series, L = matriz.shape
+    # fila = série seguida dos componentes (dois por passo); inicio aponta o mais antigo
+    fila = np.empty((n_series, L + 2 * n_de_prevs))
+    fila[:, :L] = matriz
+    soma = matriz.sum(axis=1)
+    sazonalidade = np.empty((n_series, n_de_prevs))
+    for t in range(n_de_prevs):
+        media = soma / (L + t)
+        cast1 = (fila[:, t] - media) / divisor
+        sazonalidade[:, t] = cast1
+        fila[:, L + 2 * t] = cast1
+        fila[:, L + 2 * t + 1] = cast1
+        soma = soma - fila[:, t] + 2 * cast1
+    return sazonalidade
+
+
+def _media_suave3_lote(matriz, n_de_prevs):
+    '''media_suave3 para todas as linhas de uma matriz (séries x períodos)'''
+    # 3 últimos valores da série repetida (como em media_suave3)
+    janela = [matriz[:, (j - 3) % matriz.shape[1]] for j in range(3)]
+    previsoes = np.empty((matriz.shape[0], n_de_prevs))
+    for t in range(n_de_prevs):
+        z = (janela[0] * 2) / 22 + (janela[1] * 4) / 22 + (janela[2] * 16) / 22
+        previsoes[:, t] = z
+        janela = [janela[1], janela[2], z]
+    return previsoes
+
+
+def _matriz_lote(matriz):
+    matriz = np.asarray(matriz, dtype=float)
+    if matriz.ndim != 2:
+        raise ValueError("matriz deve ser 2D (séries x períodos)")
+    if matriz.shape[1] == 0:
+        raise ValueError("lista vazia: não há valores para a previsão")
+    return matriz
+
+
 def sazonal_aditivo(lista, n_de_prevs):
     '''
     
@@ -339,39 +495,18 @@ def sazonal_aditivo(lista, n_de_prevs):
     
     n_de_prevs = quantas previsões devem ser feitas
     '''
-    
-    from copy import copy as cp
-    listasa = cp(lista)
-    lista2 = cp(lista)
-
-    while len(lista2)<10:
-      lista2 = lista2+lista2
-      
-    contador = 0
-    sazonalidade = []
-    pre_prev = media_suave3(lista2,n_de_prevs)
-    prevs = []
-    
-    while contador <= (n_de_prevs-1):
-        soma = 0
-        media = []
-        for i in listasa:
-            soma += i 
-            media = soma/len(listasa)
-                     
-        cast1 = (listasa[0]-(media))/5
-        listasa.append(cast1)
-        sazonalidade.append(cast1)
-        listasa.append(cast1)
-        listasa.pop(0)
-        contador += 1
-  
-    for l in range(len(sazonalidade)):
-        difere = pre_prev[l]+sazonalidade[l]
-        prevs.append(difere)
+    if len(lista) == 0:
+        raise ValueError("lista vazia: não há valores para a previsão")
+    # media_suave3 só usa os 3 últimos valores da série repetida
+    pre_prev = media_suave3(_janela_inicial(lista, 3), n_de_prevs)
+    sazonalidade = _sazonalidade_media(lista, n_de_prevs, 5)
+    return [pre_prev[l] + sazonalidade[l] for l in range(n_de_prevs)]
 
 
-    return(prevs)
+def sazonal_aditivo_lote(matriz, n_de_prevs):
+    '''sazonal_aditivo para várias séries de mesmo tamanho; retorna (séries x n_de_prevs)'''
+    matriz = _matriz_lote(matriz)
+    return _media_suave3_lote(matriz, n_de_prevs) + _sazonalidade_media_lote(matriz, n_de_prevs, 5)
 
 
 def sazonal_multiplicativo(lista, n_de_prevs):
@@ -384,39 +519,21 @@ def sazonal_multiplicativo(lista, n_de_prevs):
     
     n_de_prevs = quantas previsões devem ser feitas
     '''
-        
-    from copy import copy as cp
-    listasm = cp(lista)
-    lista2m = cp(lista)
-
-    while len(listasm)<10:
-      listasm = lista2m+lista2m
+    # séries com menos de 10 valores são repetidas até 10 (antes, abaixo de 5 o laço não terminava)
+    repetida = _repetir_ate(lista, 10)
+    pre_prev = media_suave3(_janela_inicial(lista, 3), n_de_prevs)
+    sazonalidade = _sazonalidade_media(repetida, n_de_prevs, 10)
+    return [pre_prev[l] * (1 + sazonalidade[l]) for l in range(n_de_prevs)]
 
-    contador = 0
-    sazonalidade = []
-    pre_prev = media_suave3(lista2m,n_de_prevs)
-    prevs = []
-    
-    while contador <= (n_de_prevs-1):
-        soma = 0
-        media = []
-        for i in listasm:
-            soma += i 
-            media = soma/len(listasm)
-                     
-        cast1 = (listasm[0]-(media))/10
-        listasm.append(cast1)
-        sazonalidade.append(cast1)
-        listasm.append(cast1)
-        listasm.pop(0)
-        contador += 1
-  
-    for l in range(len(sazonalidade)):
-        difere = pre_prev[l]*(1+sazonalidade[l])
-        prevs.append(difere)
 
+def sazonal_multiplicativo_lote(matriz, n_de_prevs):
+    '''sazonal_multiplicativo para várias séries de mesmo tamanho; retorna (séries x n_de_prevs)'''
+    matriz = _matriz_lote(matriz)
+    repetida = matriz
+    while repetida.shape[1] < 10:
+        repetida = np.hstack([repetida, repetida])
+    return _media_suave3_lote(matriz, n_de_prevs) * (1 + _sazonalidade_media_lote(repetida, n_de_prevs, 10))
 
-    return(prevs)
 
 
 def media_mov_dupla3(lista, n_de_prevs):
@@ -520,98 +637,140 @@ def holt_winter7(lista, n_de_prevs):
     usa a sazonalidade e uma medida de tendência, produzindo uma previsão aditivada.
     
     '''
-    
-    
-    from copy import copy as cp
-
-    listahw7 = cp(lista)
-    coluna = cp(lista)
-    contador = 0
+    L = len(lista)
+    if L == 0:
+        raise ValueError("lista vazia: não há valores para a previsão")
+    tendencia = (lista[L - 1] - lista[0]) / L
+    somafix = sum(lista)
+    mediafix = somafix / L
+
+    # janela de tamanho fixo: cada previsão entra e o valor mais antigo sai
+    janela = deque(lista)
+    soma = somafix
     prevs = []
-    diferenca = (listahw7[(len(listahw7)-1)]-listahw7[0])
-    tendencia = diferenca /(len(listahw7))
-    
-    somafix = 0
-    for k in listahw7:
-            somafix += k 
-            mediafix = somafix/len(listahw7)
-    
-    while contador <= (n_de_prevs-1):
-        soma = 0
-        media = []
-        for i in listahw7:
-            soma += i 
-            media = soma/len(listahw7)
-               
-       
-        cast1 = media+tendencia+(listahw7[0]-media)
-        listahw7.append(cast1)
+    for _ in range(n_de_prevs):
+        media = soma / L
+        cast1 = media + tendencia + (janela[0] - media)
         prevs.append(cast1)
-        coluna.append(cast1)
-        listahw7.pop(0)
-        contador += 1
-    
-    sazon = []
-    for z in coluna:
-        sazon.append(z-mediafix)
-            
-    indice_sazonalidade = sazon[0:len(prevs)]
-    
-    beta = 0.1
-    prev_discontada = []
-    for x in range(len(prevs)):
-        difere = prevs[x]-(beta*indice_sazonalidade[x])
-        prev_discontada.append(difere)
-    
+        janela.append(cast1)
+        soma = soma - janela.popleft() + cast1
 
-    alpha = 0.1 
+    beta = 0.1
+    alpha = 0.1
     prev_suav = []
-    for h in range(len(prev_discontada)):
-        mult = (prev_discontada[h]+(prev_discontada[h] - (2*((mediafix*tendencia)*alpha))))/2
+    for x in range(n_de_prevs):
+        # índice sazonal: série seguida das previsões, menos a média fixa
+        z = lista[x] if x < L else prevs[x - L]
+        difere = prevs[x] - (beta * (z - mediafix))
+        mult = (difere + (difere - (2 * ((mediafix * tendencia) * alpha)))) / 2
         prev_suav.append(mult)
+    return prev_suav
+
 
-    return(prev_suav)
+def holt_winter7_lote(matriz, n_de_prevs):
+    '''holt_winter7 para várias séries de mesmo tamanho; retorna (séries x n_de_prevs)'''
+    matriz = _matriz_lote(matriz)
+    L = matriz.shape[1]
+    tendencia = (matriz[:, -1] - matriz[:, 0]) / L
+    somafix = matriz.sum(axis=1)
+    mediafix = somafix / L
+
+    # coluna = série seguida das previsões; o mais antigo da janela no passo t é coluna[:, t]
+    coluna = np.empty((matriz.shape[0], L + n_de_prevs))
+    coluna[:, :L] = matriz
+    soma = somafix.copy()
+    for t in range(n_de_prevs):
+        media = soma / L
+        cast1 = media + tendencia + (coluna[:, t] - media)
+        coluna[:, L + t] = cast1
+        soma = soma - coluna[:, t] + cast1
+
+    prevs = coluna[:, L:]
+    difere = prevs - (0.1 * (coluna[:, :n_de_prevs] - mediafix[:, None]))
+    return (difere + (difere - (2 * ((mediafix * tendencia)[:, None] * 0.1)))) / 2
+
+
+
+# coeficientes de pre_arima: previsão = beta1 * valor + beta2 * erro
+BETA1_ARIMA = 0.75
+BETA2_ARIMA = 0.18
+# em arima_lote, valores mais antigos que isso têm peso subnormal ou zero
+TERMOS_ARIMA = 400
 
 
 def pre_arima (lista):
-    from copy import copy as cp
+    '''
+    recursão do erro de previsão sobre a série inteira
+
+    retorna [última previsão]; ver arima_estado para também obter o erro
+    '''
+    return [arima_estado(lista)[0]]
+
+
+def arima_estado(lista):
+    '''
+    (previsão, erro) depois de percorrer a série uma vez: previsão_{k+1} =
+    beta1 * y_k + beta2 * (y_k - previsão_k), começando com previsão_0 = y_0
+    '''
+    if len(lista) == 0:
+        raise ValueError("lista vazia: não há valores para a previsão")
+    previsao = lista[0]
+    erro = 0
+    for y in lista:
+        erro = y - previsao
+        previsao = (y * BETA1_ARIMA) + (erro * BETA2_ARIMA)
+    return previsao, erro
 
-    yps = cp(lista)
-    beta1 = 0.75
-    beta2 = 0.18
-    coluna = []
-    coluna.append(yps[0])
-    hist_erro = []
-    contador = 0
-    
-    while contador <= 1:  
-        
-        for y in range(len(yps)):
-            
-            erro = (yps[y]-coluna[y])
-            yprev = (yps[y]*beta1)+(erro*beta2)
-            coluna.append(yprev)
-            hist_erro.append(erro)
-            
-            contador += 1 
 
-    return(coluna[(len(coluna)-1):])
-    
 def arima (lista, n_de_prevs):
     '''
     arima
     modelo auto-regressivo de médias móveis integtradas (ARIMA).
+
+    a série é percorrida uma vez; depois cada previsão entra como novo valor e o
+    estado (previsão, erro) avança em O(1)
     '''
-    
-    from copy import copy as cp
-    lista0 = cp(lista)
-    contador = 1
-    while contador <= n_de_prevs:
-        anexo = pre_arima(lista0)
-        lista0.append(anexo[0])
-        contador += 1
-    
-    return(lista0[(len(lista0)-n_de_prevs):])
+    if n_de_prevs <= 0:
+        return []
+    previsao, erro = arima_estado(lista)
+    prevs = []
+    for _ in range(n_de_prevs):
+        prevs.append(previsao)
+        y = previsao
+        erro = y - previsao
+        previsao = (y * BETA1_ARIMA) + (erro * BETA2_ARIMA)
+    return prevs
+
+
+def arima_lote(matriz, n_de_prevs):
+    '''
+    arima para várias séries de mesmo tamanho; retorna (séries x n_de_prevs)
+
+    a recursão é linear, previsão_{k+1} = (beta1 + beta2) * y_k - beta2 * previsão_k,
+    então a previsão ao fim da série é um produto da matriz pelas potências de -beta2
+    (só os últimos TERMOS_ARIMA valores têm peso representável). Depois da série cada
+    previsão entra como valor observado, o erro é zero e a previsão só é multiplicada
+    por beta1 a cada passo. Linhas com NaN/inf seguem pela recursão de arima
+    '''
+    matriz = _matriz_lote(matriz)
+    L = matriz.shape[1]
+    termos = min(L, TERMOS_ARIMA)
+    # potências (-beta2)^0..termos, do valor mais recente para o mais antigo
+    potencias = np.cumprod(np.r_[1.0, np.full(termos, -BETA2_ARIMA)])
+    pesos = (BETA1_ARIMA + BETA2_ARIMA) * potencias[termos - 1::-1]
+    if termos == L:
+        # previsão_0 = y_0
+        pesos[0] += potencias[L]
+    previsao = matriz[:, L - termos:] @ pesos
+
+    prevs = np.empty((matriz.shape[0], max(n_de_prevs, 0)))
+    if n_de_prevs > 0:
+        prevs[:, 0] = previsao
+        prevs[:, 1:] = BETA1_ARIMA
+        np.cumprod(prevs, axis=1, out=prevs)
+        for linha in np.flatnonzero(~np.isfinite(matriz).all(axis=1)):
+            prevs[linha] = arima(matriz[linha].tolist(), n_de_prevs)
+    return prevs
 
 
 def media_mista(lista, n_de_prevs):
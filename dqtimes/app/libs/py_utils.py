@@ -51,36 +51,48 @@ def compara_testemunha(testemunha, previsao):
         list: Uma lista contendo o erro quadrático para cada valor previsto (formatado com 3 casas decimais)
         e o erro quadrático médio (um único valor).
     """
-    # Cálculo do erro quadrático para cada valor
-    erros_quadraticos = [(real - previsto) ** 2 for real, previsto in zip(testemunha, previsao)]
-    erros_quadraticos_formatados = [f"{erro:.3f}" for erro in erros_quadraticos]
+    # Cálculo do erro quadrático para cada valor (vetorizado; zip truncava no menor array)
+    n = min(len(testemunha), len(previsao))
+    residuos = np.asarray(testemunha[:n], dtype=float) - np.asarray(previsao[:n], dtype=float)
+    erros_quadraticos = residuos ** 2
+    erros_quadraticos_formatados = [f"{erro:.3f}" for erro in erros_quadraticos.tolist()]
 
     # Cálculo do erro quadrático médio
-    erro_quadratico_medio = sum(erros_quadraticos) / len(erros_quadraticos)
+    erro_quadratico_medio = float(erros_quadraticos.sum()) / n
     erro_quadratico_medio_formatado = round(erro_quadratico_medio, 3)
 
     return [erros_quadraticos_formatados, erro_quadratico_medio_formatado]
 
 
-def binariza(lista, n_ante, n_poste):
-    from copy import copy as cp
-    
-    # Criação das listas ante e poste
-    ante = cp(lista)
-    poste = cp(lista)
-    
-    # Adiciona o último elemento em ante e o primeiro elemento em poste, se necessário
-    if n_ante > 0:
-        ante.extend([ante[-1]] * (n_ante - 1))
-        ante = ante[:-n_ante]
+def binariza_lote(matriz, n_ante, n_poste):
+    """
+    binariza para várias séries de mesmo tamanho: matriz (séries x períodos) de 0/1.
+
+    Com n_ante > 0 a base é a série sem o último valor; com n_poste > 0 o valor
+    comparado é o de n_poste posições à frente, e as posições que passam do fim usam
+    o primeiro valor da série (como o preenchimento da versão em listas).
+    """
+    matriz = np.asarray(matriz, dtype=float)
+    if matriz.ndim != 2:
+        raise ValueError("matriz deve ser 2D (séries x períodos)")
+    L = matriz.shape[1]
+    if L == 0 and (n_ante > 0 or n_poste > 0):
+        # sem valores não há último (ante) nem primeiro (poste) para o preenchimento
+        raise IndexError("lista vazia")
+    ante = matriz[:, :L - 1] if n_ante > 0 else matriz
     if n_poste > 0:
-        poste.extend([poste[0]] * (n_poste - 1))
-        poste = poste[n_poste:]
-    
-    # Cálculo da diferença e binarização
-    binarios = [1 if poste[i] - ante[i] > 0 else 0 for i in range(len(ante))]
-    
-    return binarios
+        preenchimento = np.repeat(matriz[:, :1], n_poste - 1, axis=1)
+        poste = np.hstack([matriz, preenchimento])[:, n_poste:]
+    else:
+        poste = matriz
+    if poste.shape[1] < ante.shape[1]:
+        raise IndexError("n_ante e n_poste deixam menos valores posteriores que anteriores")
+    return (poste[:, :ante.shape[1]] - ante > 0).astype(np.int64)
+
+
+def binariza(lista, n_ante, n_poste):
+    """1 onde o valor posterior supera o anterior (ver binariza_lote)"""
+    return binariza_lote([lista], n_ante, n_poste)[0].tolist()
 
 # Exemplo de uso
 #lista_exemplo = [1, 2, 3, 4, 5]
@@ -89,66 +101,136 @@ def binariza(lista, n_ante, n_poste):
        
 ##################################################################
 
-def inferencia_bayes_bin_general(binarios, n):
-    from copy import copy as cp
+# n-gramas até este tamanho são contados em uma tabela completa (np.bincount de 2^n posições)
+MAX_N_TABELA = 20
+# códigos inteiros de n bits cabem em int64
+MAX_N_CODIGO = 62
 
-    if n < 2:
-        raise ValueError("O valor de 'n' deve ser maior ou igual a 2.")
 
-    pref = cp(binarios)
-    final = pref[-(n-1):]
-    quebrar = cp(binarios)
-    subsequencias = []
+def _contagens_ngramas(codigos, validos, n, alvos):
+    '''Quantas janelas válidas de n bits têm cada código em alvos'''
+    codigos = codigos[validos]
+    if n <= MAX_N_TABELA:
+        tabela = np.bincount(codigos, minlength=1 << n)
+        return [int(tabela[c]) for c in alvos]
+    return [int(np.count_nonzero(codigos == c)) for c in alvos]
+
 
-    while len(quebrar) >= n:
-        par = quebrar[:n]
-        subsequencias.append(par)
-        quebrar.pop(0)
+def _subir(acres, decre):
+    if acres > 0:
+        return acres / (acres + decre)
+    return 0.001
 
-    subir = 0.5
-    combinacoes = [(i, j) for i in range(2) for j in range(n - 1)]
+
+def inferencia_bayes_bin_varios(binarios, ns):
+    """
+    inferencia_bayes_bin_general para vários n de uma vez: [subir] na ordem de ns.
+
+    A série binária vira códigos inteiros por máscara deslizante (o código de n bits
+    de cada posição sai do de n-1 bits com um shift), e os n-gramas são contados em
+    uma única passada vetorizada. Como na versão original, só os padrões finais
+    0..2(n-1)-1 são consultados (os demais ficam com 0.5) e elementos fora de {0, 1}
+    não casam com nenhum padrão.
+    """
+    ns = list(ns)
+    if any(n < 2 for n in ns):
+        raise ValueError("O valor de 'n' deve ser maior ou igual a 2.")
+    b = np.asarray(binarios)
+    L = len(b)
+    uns = (b == 1) if L else np.zeros(0, dtype=bool)
+    validos_bit = uns | (b == 0) if L else np.zeros(0, dtype=bool)
+    bits = uns.astype(np.int64)
 
     resultados = {}
+    # códigos de m bits para m = 1, 2, ...: codigos[i] cobre binarios[i:i+m]
+    codigos = bits.copy()
+    validos = validos_bit.copy()
+    anteriores = None
+    n_max = min(max(ns), MAX_N_CODIGO)
+    for m in range(1, n_max + 1):
+        if m > 1:
+            anteriores = (codigos, validos)
+            codigos = (codigos[:-1] << 1) | bits[m - 1:]
+            validos = validos[:-1] & validos_bit[m - 1:]
+        if m not in ns:
+            continue
+        # padrão final: os últimos m-1 bits
+        codigos_final, validos_final = anteriores
+        if L < m - 1 or not validos_final[-1]:
+            resultados[m] = 0.5
+            continue
+        final = int(codigos_final[-1])
+        if final >= 2 * (m - 1):
+            resultados[m] = 0.5
+            continue
+        acres, decre = _contagens_ngramas(codigos, validos, m, ((final << 1) | 1, final << 1))
+        resultados[m] = _subir(acres, decre)
+
+    # n grande demais para códigos int64: janelas comparadas diretamente
+    for n in ns:
+        if n not in resultados:
+            resultados[n] = _inferencia_janelas(uns, validos_bit, n)
+    return [resultados[n] for n in ns]
+
+
+def _inferencia_janelas(uns, validos_bit, n):
+    L = len(uns)
+    if L < n - 1 or not validos_bit[L - (n - 1):].all():
+        return 0.5
+    final = int("".join("1" if x else "0" for x in uns[L - (n - 1):]), 2)
+    if final >= 2 * (n - 1):
+        return 0.5
+    if L < n:
+        return _subir(0, 0)
+    janelas = np.lib.stride_tricks.sliding_window_view(uns, n)
+    validas = np.lib.stride_tricks.sliding_window_view(validos_bit, n).all(axis=1)
+    contagens = []
+    for codigo in ((final << 1) | 1, final << 1):
+        alvo = np.array([c == "1" for c in bin(codigo)[2:].zfill(n)])
+        contagens.append(int(np.count_nonzero((janelas == alvo).all(axis=1) & validas)))
+    return _subir(*contagens)
 
-    for i, comb in enumerate(combinacoes):
-        valor_final = [int(x) for x in bin(i)[2:].zfill(n - 1)]
-        if valor_final == final:
-            acres = subsequencias.count(valor_final + [1])
-            decre = subsequencias.count(valor_final + [0])
-            if acres > 0:
-                subir = acres / (acres + decre)
-            else:
-                subir = 0.001
 
-    resultado = [subir]
-    return resultado
+def inferencia_bayes_bin_general(binarios, n):
+    """
+    Probabilidade de subir dado o padrão dos últimos n-1 bits: fração das janelas de
+    n bits que começam com esse padrão e terminam em 1 (0.001 se nenhuma terminar em
+    1; 0.5 se o padrão não for consultável). Ver inferencia_bayes_bin_varios.
+    """
+    return inferencia_bayes_bin_varios(binarios, [n])
 
-from copy import copy as cp
-from statistics import mean
 
+def tax_acrescimo_lote(matriz):
+    """
+    tax_acrescimo para várias séries de mesmo tamanho: array (séries x 2) com os
+    acréscimos e decréscimos médios relativos à média de cada série (0.001 quando a
+    série não tem movimentos daquele sentido).
 
-def tax_acrescimo(lista):
-    coluna = lista[:-1]
-    poste = lista[1:]
-    
-    acrescimo = [poste[x] - coluna[x] for x in range(len(coluna)) if poste[x] - coluna[x] > 0]
-    decrescimo = [poste[x] - coluna[x] for x in range(len(coluna)) if poste[x] - coluna[x] <= 0]
-    
-    media_lista = mean(lista)
-    
-    if acrescimo:
-        acrescimo_medio = mean(acrescimo)
-        acrescimo_percentual = acrescimo_medio / media_lista
-    else:
-        acrescimo_percentual = 0.001
+    Levanta ZeroDivisionError se alguma série com movimentos tiver média zero, como
+    a versão em listas.
+    """
+    matriz = np.asarray(matriz, dtype=float)
+    if matriz.ndim != 2:
+        raise ValueError("matriz deve ser 2D (séries x períodos)")
+    diferencas = np.diff(matriz, axis=1)
+    media_lista = matriz.mean(axis=1)
+    if diferencas.shape[1] > 0 and (media_lista == 0).any():
+        raise ZeroDivisionError("média da série é zero: taxas relativas indefinidas")
+    taxas = np.empty((matriz.shape[0], 2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # NaN não entra em nenhum dos dois sentidos
+        for coluna, mascara in enumerate((diferencas > 0, diferencas <= 0)):
+            quantidade = mascara.sum(axis=1)
+            media = np.where(mascara, diferencas, 0.0).sum(axis=1) / np.maximum(quantidade, 1)
+            taxas[:, coluna] = np.where(quantidade > 0, media / media_lista, 0.001)
+    return taxas
 
-    if decrescimo:
-        decrescimo_medio = mean(decrescimo)
-        decrescimo_percentual = decrescimo_medio / media_lista
-    else:
-        decrescimo_percentual = 0.001
-    
-    return [acrescimo_percentual, decrescimo_percentual]
+
+def tax_acrescimo(lista):
+    """[acréscimo médio, decréscimo médio] relativos à média da série (ver tax_acrescimo_lote)"""
+    if len(lista) == 0:
+        raise ValueError("lista vazia")
+    return tax_acrescimo_lote([lista])[0].tolist()
 
 # Exemplo de uso
 lista_exemplo = [1, 2, 3, 4, 5]
@@ -2,24 +2,51 @@ import os
 import io
 import asyncio
 import json
-import dask.dataframe as dd
-import tempfile
-from dask.distributed import Client, LocalCluster
+from dask import delayed
 from app import forecast_temp
+from app import cluster
+from app.aquecimento import agendar_aquecimento, estado_prontidao
+from app.datasets import CacheDatasets
+from app.distribuido import projetar_particao, fatiar_particao, juntar_fatias
+from app import pipeline_lote
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Query
+from fastapi.responses import JSONResponse
+from typing import Optional
+import pandas as pd
 import math
 import time
 
-# Iniciar um cluster local e um cliente Dask
-cluster = LocalCluster()
-client = Client(cluster)
-
+# O cluster Dask é criado sob demanda (ver app/cluster.py), não na importação
 app = FastAPI()
 
+# Datasets enviados ao /projecao_dataframe/, reaproveitados entre páginas via dataset_id
+datasets = CacheDatasets()
+
 
 @app.on_event("startup")
 async def startup_event():
-    print(f"Dask Dashboard is available at {client.dashboard_link}")
+    agendar_aquecimento(asyncio.get_running_loop())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    cluster.encerrar_cluster()
+
+
+@app.get("/ready")
+async def ready():
+    estado = estado_prontidao()
+    # scheduler_info() é uma chamada de rede ao scheduler; não bloqueia o event loop
+    dask_estado = await asyncio.get_running_loop().run_in_executor(None, cluster.estado_cluster)
+    return JSONResponse(
+        status_code=200 if estado["pronto"] else 503,
+        content={
+            "status": "ready" if estado["pronto"] else "warming_up",
+            "backends_available": estado["backends_disponiveis"],
+            "backends": estado["backends"],
+            "dask": dask_estado,
+        },
+    )
 
 
 @app.post("/projecao_lista/")
@@ -39,63 +66,113 @@ async def upload_file(
         "projecoes": resultado
     }
 
+def projetar_no_cluster(dataset, fatias, n):
+    """
+    Projeta as linhas da página no cluster, divididas em um pedaço por thread de
+    worker: uma página dentro de uma única partição também é repartida, e cada
+    partição envolvida é lida uma única vez (a mesma chave no grafo)
+    """
+    tarefas = []
+    for pedaco in cluster.dividir_fatias(fatias, cluster.paralelismo()):
+        linhas = [delayed(fatiar_particao)(dataset.particoes[particao], inicio, fim)
+                  for particao, inicio, fim in pedaco]
+        tarefas.append(delayed(projetar_particao)(delayed(juntar_fatias)(*linhas), n, dataset.dataset_id))
+    return cluster.computar(tarefas)
+
+
 @app.post("/projecao_dataframe/")
 async def upload_file(
-    csv_dataframe: UploadFile = File(...),
+    csv_dataframe: Optional[UploadFile] = File(None),
     quantidade_projecoes: int = Form(...),
-    header: bool = Form(...),
-    index_col: bool = Form(...),
+    header: Optional[bool] = Form(None),
+    index_col: Optional[bool] = Form(None),
+    dataset_id: Optional[str] = Form(None),  # Reaproveita um CSV já enviado
     page: int = Query(1, ge=1),  # Número da página, deve ser >= 1
     page_size: int = Query(10, ge=1),  # Tamanho da página, deve ser >= 1
 ):
     n = quantidade_projecoes
 
-    # Salvar o conteúdo do arquivo em um arquivo temporário
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp_file:
-        tmp_file.write(await csv_dataframe.read())
-        tmp_file_path = tmp_file.name
-
-    ddf = dd.read_csv(tmp_file_path, header=0 if header else None)
-
-    if index_col:
-        ddf = ddf.drop(ddf.columns[0], axis=1)
-
-    # Calcular o número total de linhas e o número total de páginas
-    total_rows = len(ddf)
+    # O CSV é enviado uma vez; as páginas seguintes usam o dataset_id retornado
+    if dataset_id is not None:
+        dataset = datasets.obter(dataset_id)
+        if dataset is None:
+            raise HTTPException(status_code=404, detail="Dataset not found, upload the CSV again")
+    elif csv_dataframe is not None:
+        if header is None or index_col is None:
+            raise HTTPException(status_code=422, detail="header and index_col are required when uploading a CSV")
+        conteudo = await csv_dataframe.read()
+        dataset = await asyncio.get_running_loop().run_in_executor(
+            None, datasets.registrar, conteudo, header, index_col
+        )
+    else:
+        raise HTTPException(status_code=422, detail="Send csv_dataframe or dataset_id")
+
+    # Total de linhas vem das contagens por partição já calculadas
+    total_rows = dataset.indice.total_linhas
     total_pages = math.ceil(total_rows / page_size)
 
     # Verificar se o número da página é válido
     if page > total_pages:
         raise HTTPException(status_code=404, detail="Page number out of range")
 
-    # Calcular o índice inicial e final para a paginação
-    start_index = (page - 1) * page_size
-    end_index = start_index + page_size
-
-    # Aplicar a paginação ao DataFrame
-    ddf_paginated = ddf.loc[start_index:end_index]
-
     start_time = time.time()
-    lista_df = []
-
-    for part in ddf_paginated.to_delayed():
-        # Converter a partição para um pandas DataFrame e iterar sobre as linhas
-        for index, row in part.compute().iterrows():
-            lista_df.append(row.tolist())
 
-    # Aplica a função de projeção à lista de listas
-    
-    resultado = []
-    for lista in lista_df:
-        projection = forecast_temp(lista, n)
-        resultado.append(projection)
+    loop = asyncio.get_running_loop()
+    fatias = dataset.pagina(page, page_size)
+    n_linhas = sum(fim - inicio for _, inicio, fim in fatias)
+    if cluster.usar_cluster(n_linhas):
+        partes = await loop.run_in_executor(None, projetar_no_cluster, dataset, fatias, n)
+    else:
+        # Página pequena: só a partição que a contém é lida, e a projeção roda aqui, sem o cluster
+        inicio = (page - 1) * page_size
+        partes = [await loop.run_in_executor(
+            None, lambda: projetar_particao(dataset.ler_linhas(inicio, inicio + n_linhas), n, dataset.dataset_id))]
+    resultado = pd.concat(partes).tolist() if partes else []
 
     end_time = time.time()
     execution_time = end_time - start_time 
 
     return {
         "execution_time": execution_time,
+        "dataset_id": dataset.dataset_id,
+        "total_rows": total_rows,
         "total_pages": total_pages,
         "current_page": page,
         "projecoes": resultado
     }
+
+
+@app.post("/projecao_lote/", status_code=202)
+async def projecao_lote(
+    csv_dataframe: UploadFile = File(...),
+    quantidade_projecoes: int = Form(..., ge=1),
+    header: bool = Form(True),
+    index_col: bool = Form(False),
+    formato: str = Form("parquet"),
+    blocksize: str = Form(pipeline_lote.BLOCKSIZE_PADRAO),
+):
+    """Agenda a projeção out-of-core do CSV; o resultado é gravado em blocos no servidor"""
+    if formato not in pipeline_lote.FORMATOS:
+        raise HTTPException(status_code=422, detail=f"formato must be one of {pipeline_lote.FORMATOS}")
+
+    caminho = await asyncio.get_running_loop().run_in_executor(
+        None, pipeline_lote.salvar_upload, csv_dataframe.file
+    )
+    job_id = pipeline_lote.submeter_job(
+        caminho,
+        quantidade_projecoes,
+        remover_entrada=True,
+        blocksize=blocksize,
+        header=header,
+        index_col=index_col,
+        formato=formato,
+    )
+    return pipeline_lote.estado_job(job_id)
+
+
+@app.get("/projecao_lote/{job_id}")
+async def projecao_lote_status(job_id: str):
+    job = pipeline_lote.estado_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,194 @@
+# memoria_series.py
+# Memória do modelo vencedor por série para pular o torneio em previsões repetidas
+#
+# Séries previstas periodicamente quase sempre escolhem o mesmo método e período.
+# Com um series_id, o torneio completo do forecast_temp roda na primeira chamada e
+# guarda o vencedor, os desafiantes (próximos colocados) e o erro de referência.
+# As chamadas seguintes avaliam só o vencedor e os desafiantes; o torneio completo
+# volta a cada SERIES_RETOURNAMENT_EVERY chamadas ou quando o erro do vencedor
+# piora além de SERIES_DEGRADATION_THRESHOLD.
+
+import os
+import math
+import threading
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime
+
+try:
+    from aplicacao import forecast_temp
+except ImportError:
+    from .aplicacao import forecast_temp
+
+logger = logging.getLogger(__name__)
+
+# Desafiantes avaliados junto com o vencedor (SERIES_CHALLENGERS)
+DESAFIANTES_PADRAO = 2
+# Chamadas entre torneios completos (SERIES_RETOURNAMENT_EVERY)
+RETORNEIO_PADRAO = 24
+# Piora relativa do erro do vencedor que antecipa o torneio (SERIES_DEGRADATION_THRESHOLD)
+LIMIAR_DEGRADACAO_PADRAO = 0.5
+# Séries mantidas na memória (SERIES_MEMORY_MAX)
+MAX_SERIES_PADRAO = 100_000
+# Erros recentes guardados por série
+JANELA_ERROS = 10
+
+
+def _env(nome, padrao, tipo=int):
+    valor = os.getenv(nome)
+    return tipo(valor) if valor and valor.strip() else padrao
+
+
+def configuracao():
+    return {
+        "desafiantes": _env("SERIES_CHALLENGERS", DESAFIANTES_PADRAO),
+        "retorneio": _env("SERIES_RETOURNAMENT_EVERY", RETORNEIO_PADRAO),
+        "limiar_degradacao": _env("SERIES_DEGRADATION_THRESHOLD", LIMIAR_DEGRADACAO_PADRAO, float),
+        "max_series": _env("SERIES_MEMORY_MAX", MAX_SERIES_PADRAO),
+    }
+
+
+class MemoriaSerie:
+    """Vencedor, desafiantes e histórico de erro de uma série"""
+
+    def __init__(self, vencedor, desafiantes, erro_referencia, parametros_grade=None):
+        self.vencedor = vencedor
+        self.desafiantes = desafiantes
+        self.erro_referencia = erro_referencia
+        self.parametros_grade = parametros_grade or {}
+        self.erros_recentes = deque([erro_referencia], maxlen=JANELA_ERROS)
+        self.chamadas_desde_torneio = 0
+        self.atualizado_em = datetime.utcnow()
+
+    def resumo(self):
+        return {
+            "vencedor": list(self.vencedor),
+            "desafiantes": [list(c) for c in self.desafiantes],
+            "erro_referencia": self.erro_referencia,
+            "erros_recentes": list(self.erros_recentes),
+            "chamadas_desde_torneio": self.chamadas_desde_torneio,
+            "atualizado_em": self.atualizado_em.isoformat(),
+        }
+
+
+class MemoriaSeries:
+    """LRU de MemoriaSerie por series_id"""
+
+    def __init__(self, max_series=None):
+        self.max_series = max_series or configuracao()["max_series"]
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+        self.estatisticas = {"torneios": 0, "memoria": 0, "degradacoes": 0}
+
+    def obter(self, series_id):
+        with self._lock:
+            memoria = self._series.get(series_id)
+            if memoria is not None:
+                self._series.move_to_end(series_id)
+            return memoria
+
+    def guardar(self, series_id, memoria):
+        with self._lock:
+            self._series[series_id] = memoria
+            self._series.move_to_end(series_id)
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+
+    def esquecer(self, series_id):
+        with self._lock:
+            return self._series.pop(series_id, None) is not None
+
+    def contar(self, chave):
+        with self._lock:
+            self.estatisticas[chave] += 1
+
+    def aproveitar(self, registro, vencedor, candidatos, erros, erro_vencedor):
+        """Registra, sob a trava, uma chamada resolvida só com os candidatos lembrados"""
+        with self._lock:
+            self.estatisticas["memoria"] += 1
+            registro.chamadas_desde_torneio += 1
+            if erro_vencedor is not None:
+                registro.erros_recentes.append(erro_vencedor)
+            registro.atualizado_em = datetime.utcnow()
+            # Um desafiante que vence assume o posto; o erro de referência acompanha
+            if vencedor != tuple(registro.vencedor):
+                registro.desafiantes = [c for c in candidatos if tuple(c) != vencedor]
+                registro.vencedor = vencedor
+                registro.erro_referencia = erros[vencedor]
+
+    def resumo(self, series_id):
+        with self._lock:
+            registro = self._series.get(series_id)
+            if registro is None:
+                return None
+            self._series.move_to_end(series_id)
+            return registro.resumo()
+
+    def __len__(self):
+        return len(self._series)
+
+
+memoria = MemoriaSeries()
+
+
+def _parametros_grade(resultado, candidatos):
+    """Parâmetros HW_GRADE dos candidatos lembrados, para não refazer a busca"""
+    params = dict(zip(resultado["periodos_avaliados"], resultado.get("holt_winters_grade_params", [])))
+    return {p: params[p] for m, p in candidatos if m == "HW_GRADE" and params.get(p) is not None}
+
+
+def _memorizar(series_id, resultado, n_desafiantes):
+    ranking = [(metodo, period) for metodo, period, *_ in resultado["ranking_candidatos"]]
+    lembrados = ranking[:1 + n_desafiantes]
+    nova = MemoriaSerie(lembrados[0], lembrados[1:], resultado["ranking_candidatos"][0][2],
+                        _parametros_grade(resultado, lembrados))
+    memoria.guardar(series_id, nova)
+    return nova
+
+
+def prever(data, n_projecoes, series_id, **opcoes):
+    """
+    forecast_temp com memória por série. Retorna o resultado do forecast_temp com
+    "torneio_completo" indicando se a disputa completa foi executada.
+    """
+    config = configuracao()
+    anterior = memoria.obter(series_id)
+    agendado = anterior is None or anterior.chamadas_desde_torneio + 1 >= config["retorneio"]
+
+    if not agendado:
+        candidatos = [anterior.vencedor] + anterior.desafiantes
+        try:
+            resultado = forecast_temp(data, n_projecoes, serie_id=series_id, candidatos=candidatos,
+                                      parametros_grade=anterior.parametros_grade, **opcoes)
+        except ValueError as e:
+            # Série encurtou e os períodos lembrados não cabem mais: torneio completo
+            logger.info(f"Series {series_id}: remembered candidates failed ({e}), running full tournament")
+            resultado = None
+
+        if resultado is not None:
+            erros = {(m, p): erro for m, p, erro, _ in resultado["ranking_candidatos"]}
+            erro_vencedor = erros.get(tuple(anterior.vencedor))
+            # Sem erro do vencedor (prazo esgotado antes dele) não há como medir degradação;
+            # erro não finito (NaN/inf) não se compara e conta como degradado
+            referencia = anterior.erro_referencia
+            degradou = (erro_vencedor is not None and
+                        (not math.isfinite(referencia) or not math.isfinite(erro_vencedor) or
+                         erro_vencedor > referencia * (1 + config["limiar_degradacao"])))
+            if not degradou:
+                vencedor = (resultado["metodo_vencedor"], resultado["periodo_vencedor"])
+                memoria.aproveitar(anterior, vencedor, candidatos, erros, erro_vencedor)
+                resultado["torneio_completo"] = False
+                return resultado
+            memoria.contar("degradacoes")
+            logger.info(f"Series {series_id}: winner error degraded to {erro_vencedor}, running full tournament")
+
+    memoria.contar("torneios")
+    resultado = forecast_temp(data, n_projecoes, serie_id=series_id, **opcoes)
+    _memorizar(series_id, resultado, config["desafiantes"])
+    resultado["torneio_completo"] = True
+    return resultado
+
+
+def estado_serie(series_id):
+    """Resumo da memória de uma série, ou None"""
+    return memoria.resumo(series_id)
@@ -0,0 +1,72 @@
+# metricas.py
+# Métricas de erro de previsão em uma única passada sobre o tensor de resíduos
+#
+# A seleção de modelo do forecast_temp já calcula, para cada candidato, o resíduo
+# contra a testemunha. Em vez de descartá-lo depois do MSE, o tensor
+# (séries, candidatos, horizonte) de resíduos é reduzido aqui de uma vez: o resíduo,
+# seu quadrado e seu valor absoluto são formados uma única vez e todas as métricas
+# saem de somas mascaradas sobre o eixo do horizonte. Posições NaN (séries ou
+# candidatos de horizontes diferentes completados com NaN) ficam fora das somas.
+
+import numpy as np
+
+METRICAS = ("mse", "rmse", "mae", "mape", "smape", "r_squared")
+
+
+def metricas_erro(real, residuos, previsto=None):
+    """
+    Métricas de cada (série, candidato) sobre o eixo do horizonte.
+
+    real: (séries, horizonte) ou (séries, 1, horizonte); residuos = real - previsto,
+    (séries, candidatos, horizonte). previsto é derivado dos resíduos se omitido.
+    Retorna um dict de arrays (séries, candidatos). MAPE e sMAPE (em %) ignoram os
+    pontos com denominador zero; sem nenhum ponto válido ficam NaN. R² segue a
+    convenção usual para testemunha constante: 1 se o ajuste é perfeito, 0 caso
+    contrário.
+    """
+    residuos = np.asarray(residuos, dtype=float)
+    real = np.asarray(real, dtype=float)
+    if real.ndim == residuos.ndim - 1:
+        real = real[..., None, :]
+    if previsto is None:
+        previsto = real - residuos
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        validos = ~np.isnan(residuos)
+        n = validos.sum(axis=-1)
+        absoluto = np.where(validos, np.abs(residuos), 0.0)
+        sse = np.sum(absoluto * absoluto, axis=-1)
+        mse = sse / n
+        mae = absoluto.sum(axis=-1) / n
+
+        abs_real = np.abs(real)
+        com_real = validos & (abs_real > 0)
+        mape = 100 * np.where(com_real, absoluto / abs_real, 0.0).sum(axis=-1) / com_real.sum(axis=-1)
+        soma_abs = abs_real + np.abs(previsto)
+        com_soma = validos & (soma_abs > 0)
+        smape = 100 * np.where(com_soma, 2 * absoluto / soma_abs, 0.0).sum(axis=-1) / com_soma.sum(axis=-1)
+
+        # variação da testemunha nas mesmas posições válidas
+        real_validos = np.where(validos, real, 0.0)
+        media_real = real_validos.sum(axis=-1, keepdims=True) / n[..., None]
+        sst = np.sum(np.where(validos, (real - media_real) ** 2, 0.0), axis=-1)
+        r_squared = np.where(sst > 0, 1 - sse / sst, np.where(sse == 0, 1.0, 0.0))
+        r_squared = np.where(n > 0, r_squared, np.nan)
+
+    return {
+        "mse": mse,
+        "rmse": np.sqrt(mse),
+        "mae": mae,
+        "mape": mape,
+        "smape": smape,
+        "r_squared": r_squared,
+    }
+
+
+def selecionar(metricas, serie, candidato):
+    """Métricas de um (série, candidato) como floats; valores indefinidos viram None"""
+    selecionadas = {}
+    for nome in METRICAS:
+        valor = float(metricas[nome][serie, candidato])
+        selecionadas[nome] = valor if np.isfinite(valor) else None
+    return selecionadas
@@ -0,0 +1,313 @@
+# microlote.py
+# Micro-lotes: previsões simples concorrentes fundidas em uma única passada vetorizada
+#
+# Com MICROBATCH_ENABLED, cada /forecast/single sem series_id nem prazo entra em uma
+# fila; a fila é despachada quando a janela (MICROBATCH_WINDOW_MS, a partir da
+# primeira requisição) fecha ou quando atinge MICROBATCH_MAX_SIZE séries. O lote
+# vira uma matriz (séries x tempo) completada com zeros e forecast_lote faz o
+# torneio MA/HW do forecast_temp (backend python) para todas as linhas de uma vez:
+# médias móveis por janela deslizante, uma única recorrência de Holt para a
+# matriz inteira e o MSE da testemunha agrupado por tamanho. Todos os cálculos são
+# causais, então o preenchimento à direita não afeta os valores de cada série.
+#
+# Séries que o motor não cobre (NaN/inf, curtas demais para ter testemunha, ou
+# processo com CUDA/HW_MLE/HW_GRID ligados por padrão) são resolvidas com o
+# forecast_temp normal dentro do mesmo despacho.
+
+import os
+import time
+import asyncio
+import logging
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    import aplicacao
+    import holt_winters_mle
+    import grade_hw
+    import sazonalidade
+    import metricas
+except ImportError:
+    from . import aplicacao
+    from . import holt_winters_mle
+    from . import grade_hw
+    from . import sazonalidade
+    from . import metricas
+
+logger = logging.getLogger(__name__)
+
+# Janela de coleta (MICROBATCH_WINDOW_MS) e tamanho máximo do lote (MICROBATCH_MAX_SIZE)
+JANELA_MS_PADRAO = 2.0
+MAX_LOTE_PADRAO = 64
+
+
+def microlote_habilitado():
+    """MICROBATCH_ENABLED (padrão: false)"""
+    return os.getenv("MICROBATCH_ENABLED", "false").strip().lower() in ("true", "1", "yes")
+
+
+def configuracao():
+    janela = os.getenv("MICROBATCH_WINDOW_MS")
+    maximo = os.getenv("MICROBATCH_MAX_SIZE")
+    return {
+        "janela_ms": float(janela) if janela and janela.strip() else JANELA_MS_PADRAO,
+        "max_lote": int(maximo) if maximo and maximo.strip() else MAX_LOTE_PADRAO,
+    }
+
+
+# ================== MOTOR VETORIZADO ==================
+
+def motor_equivalente():
+    """O motor reproduz o forecast_temp padrão do processo (python, sem candidatos extras)"""
+    return (not aplicacao.USE_CUDA and not holt_winters_mle.habilitado_por_padrao()
+            and not grade_hw.habilitado_por_padrao())
+
+
+def elegivel(data):
+    """Série que forecast_lote sabe prever (finita e com testemunha não vazia)"""
+    return int(len(data) * 0.3) >= 1 and bool(np.isfinite(np.asarray(data, dtype=float)).all())
+
+
+def _medias_moveis(matriz, period):
+    """python_moving_average para todas as linhas: prefixo crescente e depois janela fixa"""
+    n_linhas, largura = matriz.shape
+    medias = np.empty((n_linhas, largura))
+    for i in range(min(period - 1, largura)):
+        medias[:, i] = matriz[:, :i + 1].mean(axis=1)
+    if largura >= period:
+        medias[:, period - 1:] = sliding_window_view(matriz, period, axis=1).mean(axis=-1)
+    return medias
+
+
+def _holt(matriz):
+    """python_holt_winters_simple (sem a regra da série curta) para todas as linhas"""
+    ajustado = np.empty_like(matriz)
+    nivel = matriz[:, 0].copy()
+    tendencia = np.zeros(len(matriz))
+    ajustado[:, 0] = nivel
+    for i in range(1, matriz.shape[1]):
+        ultimo_nivel = nivel
+        nivel = aplicacao.ALPHA_HW * matriz[:, i] + (1 - aplicacao.ALPHA_HW) * (nivel + tendencia)
+        tendencia = aplicacao.BETA_HW * (nivel - ultimo_nivel) + (1 - aplicacao.BETA_HW) * tendencia
+        ajustado[:, i] = nivel + tendencia
+    return ajustado
+
+
+def forecast_lote(series, n_projecoes, periods=None, top_k=None, detectar=None):
+    """
+    forecast_temp (backend python, só MA e HW) para várias séries de uma vez.
+
+    n_projecoes é um inteiro ou um por série; periods, None ou uma lista (ou None)
+    por série; detectar, None ou um valor por série (ver forecast_temp). As séries
+    precisam ser elegíveis (ver elegivel). Retorna um dict por série com as mesmas
+    chaves do forecast_temp.
+    """
+    n_linhas = len(series)
+    if isinstance(n_projecoes, int):
+        n_projecoes = [n_projecoes] * n_linhas
+    periods = periods or [None] * n_linhas
+    if not isinstance(detectar, (list, tuple)):
+        detectar = [detectar] * n_linhas
+
+    comprimentos = [len(s) for s in series]
+    testemunhas = [int(n * 0.3) for n in comprimentos]
+    bases = [n - t for n, t in zip(comprimentos, testemunhas)]
+    matriz = np.zeros((n_linhas, max(comprimentos)))
+    for linha, serie in enumerate(series):
+        matriz[linha, :comprimentos[linha]] = serie
+
+    periodos = [sazonalidade.periodos_avaliados(matriz[linha, :bases[linha]], periods[linha], top_k,
+                                                detectar[linha])
+                for linha in range(n_linhas)]
+    uniao = sorted(set().union(*periodos))
+
+    # Candidatos no eixo 1: MA de cada período da união, depois HW de cada período
+    holt = _holt(matriz)
+    largura_testemunha = max(testemunhas)
+    candidatos = np.empty((n_linhas, 2 * len(uniao), largura_testemunha))
+    medias = {}
+    for k, period in enumerate(uniao):
+        medias[period] = _medias_moveis(matriz, period)
+        candidatos[:, k] = medias[period][:, :largura_testemunha]
+        # Base mais curta que o período: python_holt_winters_simple devolve a própria base
+        curta = np.array([b < period for b in bases])
+        candidatos[:, len(uniao) + k] = np.where(curta[:, None], matriz, holt)[:, :largura_testemunha]
+
+    testemunha = np.zeros((n_linhas, largura_testemunha))
+    for linha in range(n_linhas):
+        testemunha[linha, :testemunhas[linha]] = matriz[linha, bases[linha]:comprimentos[linha]]
+
+    # MSE e métricas de todos os candidatos agrupados por tamanho da testemunha: cada
+    # linha reduz exatamente os mesmos elementos, na mesma ordem, que python_mse e o
+    # metricas_erro do forecast_temp. Completar com NaN mudaria a ordem da soma em
+    # pares do NumPy e o resultado no último ulp.
+    mse = np.empty((n_linhas, 2 * len(uniao)))
+    erros_testemunha = {nome: np.empty((n_linhas, 2 * len(uniao))) for nome in metricas.METRICAS}
+    for tamanho in set(testemunhas):
+        linhas = [i for i, t in enumerate(testemunhas) if t == tamanho]
+        diferenca = testemunha[linhas, None, :tamanho] - candidatos[linhas, :, :tamanho]
+        mse[linhas] = np.mean(diferenca ** 2, axis=-1)
+        for nome, valores in metricas.metricas_erro(testemunha[linhas, :tamanho], diferenca).items():
+            erros_testemunha[nome][linhas] = valores
+
+    movimentos = np.zeros((n_linhas, len(matriz[0])), dtype=np.int64)
+    np.cumsum(aplicacao.python_binarize_lote(matriz), axis=1, out=movimentos[:, 1:])
+
+    def coluna(metodo, period):
+        return uniao.index(period) + (len(uniao) if metodo == 'HW' else 0)
+
+    resultados = []
+    for linha in range(n_linhas):
+        n, b, ps = comprimentos[linha], bases[linha], periodos[linha]
+        errors = [(float(mse[linha, coluna(m, p)]), p, m) for m in ('MA', 'HW') for p in ps]
+        best_error, best_period, best_method = min(errors)
+        if best_method == 'HW':
+            final = matriz[linha, :n] if n < best_period else holt[linha, :n]
+        else:
+            final = medias[best_period][linha, :n]
+
+        # python_bayes_probability sobre os n-1 movimentos
+        total = n - 1
+        lookback = total if n_projecoes[linha] <= 0 else min(n_projecoes[linha], total)
+        subidas = int(movimentos[linha, total] - movimentos[linha, total - lookback])
+        probabilidade = 0.5 if lookback == 0 else (subidas + 1) / (lookback + 2)
+
+        ranking = [[metodo, period, erro, metricas.selecionar(erros_testemunha, linha, coluna(metodo, period))]
+                   for erro, period, metodo in sorted(errors)]
+        resultados.append({
+            "final_projection": [final.tolist()],
+            "moving_averages": [medias[p][linha, :b].tolist() for p in ps],
+            "holt_winters_projections": [
+                (matriz if b < p else holt)[linha, :b].tolist() for p in ps],
+            "probabilidade_subir": probabilidade,
+            "periodos_avaliados": ps,
+            "candidatos_avaliados": [f"MA_{p}" for p in ps] + [f"HW_{p}" for p in ps],
+            "orcamento_esgotado": False,
+            "metodo_vencedor": best_method,
+            "periodo_vencedor": best_period,
+            "ranking_candidatos": ranking,
+            "metricas_testemunha": ranking[0][3],
+            "backend": "python",
+        })
+    return resultados
+
+
+def executar_lote(pedidos):
+    """
+    Resolve uma lista de (data, n_projecoes, periods, detectar): as elegíveis em
+    uma única chamada a forecast_lote, as demais com forecast_temp. Retorna, por
+    pedido, o resultado ou a exceção levantada.
+    """
+    saida = [None] * len(pedidos)
+    no_lote = []
+    if motor_equivalente():
+        no_lote = [i for i, (data, *_) in enumerate(pedidos) if elegivel(data)]
+    if no_lote:
+        try:
+            resultados = forecast_lote([pedidos[i][0] for i in no_lote],
+                                       [pedidos[i][1] for i in no_lote],
+                                       [pedidos[i][2] for i in no_lote],
+                                       detectar=[pedidos[i][3] for i in no_lote])
+        except Exception as e:
+            logger.warning(f"Micro-batch engine failed ({e}), forecasting requests one by one")
+            no_lote = []
+        else:
+            for i, resultado in zip(no_lote, resultados):
+                saida[i] = resultado
+    vetorizadas = set(no_lote)
+    for i, (data, n_projecoes, periods, detectar) in enumerate(pedidos):
+        if i in vetorizadas:
+            continue
+        try:
+            saida[i] = aplicacao.forecast_temp(data, n_projecoes, periods=periods, detectar=detectar)
+        except Exception as e:
+            saida[i] = e
+    return saida, len(vetorizadas)
+
+
+# ================== AGENDADOR ==================
+
+class AgendadorMicrolote:
+    """Fila de previsões despachada por janela de tempo ou por tamanho"""
+
+    def __init__(self):
+        self._fila = []
+        self._temporizador = None
+        self._despachos = set()
+        self.estatisticas = {
+            "lotes": 0,
+            "requisicoes": 0,
+            "vetorizadas": 0,
+            "espera_total_ms": 0.0,
+            "espera_max_ms": 0.0,
+            "execucao_total_ms": 0.0,
+        }
+
+    async def submeter(self, data, n_projecoes, periods=None, detectar=None):
+        """Entra no próximo lote e aguarda o resultado (mesmo formato do forecast_temp)"""
+        config = configuracao()
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._fila.append((data, n_projecoes, periods, detectar, futuro, time.perf_counter()))
+        if len(self._fila) >= config["max_lote"]:
+            self._despachar()
+        elif self._temporizador is None:
+            self._temporizador = loop.call_later(config["janela_ms"] / 1000, self._despachar)
+        return await futuro
+
+    def _despachar(self):
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        lote, self._fila = self._fila, []
+        if not lote:
+            return
+        agora = time.perf_counter()
+        esperas = [(agora - chegada) * 1000 for *_, chegada in lote]
+        self.estatisticas["lotes"] += 1
+        self.estatisticas["requisicoes"] += len(lote)
+        self.estatisticas["espera_total_ms"] += sum(esperas)
+        self.estatisticas["espera_max_ms"] = max(self.estatisticas["espera_max_ms"], max(esperas))
+        # Referência forte até o fim: o loop só guarda referências fracas das tasks
+        tarefa = asyncio.ensure_future(self._executar(lote))
+        self._despachos.add(tarefa)
+        tarefa.add_done_callback(self._despachos.discard)
+
+    async def _executar(self, lote):
+        inicio = time.perf_counter()
+        pedidos = [pedido[:4] for pedido in lote]
+        try:
+            saida, vetorizadas = await asyncio.get_running_loop().run_in_executor(
+                None, executar_lote, pedidos)
+        except Exception as e:
+            saida, vetorizadas = [e] * len(lote), 0
+        self.estatisticas["vetorizadas"] += vetorizadas
+        self.estatisticas["execucao_total_ms"] += (time.perf_counter() - inicio) * 1000
+        for (*_, futuro, _), resultado in zip(lote, saida):
+            # A requisição pode ter sido cancelada enquanto esperava
+            if futuro.done():
+                continue
+            if isinstance(resultado, Exception):
+                futuro.set_exception(resultado)
+            else:
+                futuro.set_result(resultado)
+
+    def resumo(self):
+        config = configuracao()
+        lotes = self.estatisticas["lotes"]
+        requisicoes = self.estatisticas["requisicoes"]
+        return {
+            **self.estatisticas,
+            "habilitado": microlote_habilitado(),
+            **config,
+            "na_fila": len(self._fila),
+            "tamanho_medio": requisicoes / lotes if lotes else 0.0,
+            # Fração da capacidade do lote ocupada em média
+            "preenchimento_medio": requisicoes / (lotes * config["max_lote"]) if lotes else 0.0,
+            # Atraso médio acrescentado pela espera na fila
+            "espera_media_ms": self.estatisticas["espera_total_ms"] / requisicoes if requisicoes else 0.0,
+        }
+
+
+agendador = AgendadorMicrolote()
@@ -0,0 +1,236 @@
+# pipeline_lote.py
+# Projeção out-of-core de CSVs maiores que a memória (uma série por linha)
+#
+# O CSV é lido em blocos pelo Dask; cada bloco é projetado e gravado no próprio
+# worker (Parquet ou .npy), de modo que a memória fica limitada ao tamanho do
+# bloco. Ao final é gravado um manifest.json com os arquivos e offsets de linha.
+#
+# Uso via CLI:
+#   python -m app.pipeline_lote entrada.csv saida/ --n-projecoes 5 --blocksize 64MB
+
+import os
+import json
+import time
+import shutil
+import secrets
+import argparse
+import tempfile
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import dask.dataframe as dd
+from dask import delayed
+
+try:
+    from aplicacao import forecast_temp
+    import cluster
+except ImportError:
+    from .aplicacao import forecast_temp
+    from . import cluster
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ("parquet", "npy")
+VERSAO_MANIFESTO = 1
+BLOCKSIZE_PADRAO = "64MB"
+
+
+def colunas_resultado(n_projecoes):
+    return [f"proj_{i}" for i in range(n_projecoes)] + ["probabilidade_subir"]
+
+
+def projetar_bloco(particao, n_projecoes, grupo=None, falhas=None, indice=None):
+    """
+    Projeta cada linha do bloco e devolve apenas o resultado compacto.
+
+    As projeções seguem /forecast/single: os n_projecoes primeiros valores de
+    final_projection, seguidos de probabilidade_subir. Linhas que forecast_temp
+    rejeita (ValueError) ficam NaN, são registradas no log e, se falhas for uma
+    lista, têm a posição no bloco acrescentada a ela; outros erros derrubam o
+    bloco. grupo identifica o arquivo para o Holt-Winters MLE reaproveitar
+    parâmetros entre linhas vizinhas.
+    """
+    matriz = particao.to_numpy(dtype=float)
+    saida = np.full((len(matriz), n_projecoes + 1), np.nan)
+    for i, linha in enumerate(matriz):
+        serie = linha[~np.isnan(linha)].tolist()
+        try:
+            resultado = forecast_temp(serie, n_projecoes, grupo=grupo)
+        except ValueError as e:
+            # Linha inválida não derruba o lote; fica como NaN e é contada no manifesto
+            logger.warning(f"Bulk forecast failed for block {indice}, row {i}: {e}")
+            if falhas is not None:
+                falhas.append(i)
+            continue
+        projecao = resultado["final_projection"][0][:n_projecoes]
+        saida[i, :len(projecao)] = projecao
+        saida[i, -1] = resultado["probabilidade_subir"]
+    return pd.DataFrame(saida, columns=colunas_resultado(n_projecoes))
+
+
+def processar_bloco(particao, n_projecoes, destino, indice, formato):
+    """Projeta e grava um bloco no worker; retorna só os metadados do arquivo"""
+    falhas = []
+    resultado = projetar_bloco(particao, n_projecoes, grupo=destino, falhas=falhas, indice=indice)
+    arquivo = f"part-{indice:05d}.{formato}"
+    caminho = os.path.join(destino, arquivo)
+    if formato == "parquet":
+        resultado.to_parquet(caminho, index=False)
+    else:
+        np.save(caminho, resultado.to_numpy())
+    return {
+        "bloco": indice,
+        "arquivo": arquivo,
+        "linhas": len(resultado),
+        "falhas": len(falhas),
+        "linhas_com_falha": falhas,
+    }
+
+
+def executar_pipeline(caminho_csv, destino, n_projecoes, blocksize=BLOCKSIZE_PADRAO,
+                      header=True, index_col=False, formato="parquet"):
+    """
+    Executa o pipeline completo e retorna o manifesto.
+
+    Os blocos são processados no cluster Dask do processo (criado sob demanda).
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato} (use {', '.join(FORMATOS)})")
+    if n_projecoes < 1:
+        raise ValueError("n_projecoes deve ser maior ou igual a 1")
+
+    inicio = time.time()
+    os.makedirs(destino, exist_ok=True)
+
+    ddf = dd.read_csv(caminho_csv, header=0 if header else None, blocksize=blocksize)
+    if index_col:
+        ddf = ddf.drop(ddf.columns[0], axis=1)
+
+    tarefas = [
+        delayed(processar_bloco)(parte, n_projecoes, destino, indice, formato)
+        for indice, parte in enumerate(ddf.to_delayed())
+    ]
+    cliente = cluster.obter_cliente()
+    blocos = sorted(cliente.gather(cliente.compute(tarefas)), key=lambda b: b["bloco"])
+
+    offset = 0
+    for bloco in blocos:
+        bloco["offset"] = offset
+        # Posições das linhas que falharam no arquivo de entrada inteiro
+        bloco["linhas_com_falha"] = [offset + i for i in bloco["linhas_com_falha"]]
+        offset += bloco["linhas"]
+
+    manifesto = {
+        "versao": VERSAO_MANIFESTO,
+        "origem": os.path.abspath(caminho_csv),
+        "formato": formato,
+        "n_projecoes": n_projecoes,
+        "colunas": colunas_resultado(n_projecoes),
+        "total_linhas": offset,
+        "total_falhas": sum(b["falhas"] for b in blocos),
+        "blocos": blocos,
+        "criado_em": datetime.utcnow().isoformat(),
+        "tempo_execucao": time.time() - inicio,
+    }
+
+    # Gravação atômica: o manifesto só aparece quando todos os blocos existem
+    caminho_manifesto = os.path.join(destino, "manifest.json")
+    with open(caminho_manifesto + ".tmp", "w") as f:
+        json.dump(manifesto, f, indent=2)
+    os.replace(caminho_manifesto + ".tmp", caminho_manifesto)
+
+    return manifesto
+
+
+# ================== JOBS (API) ==================
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("BULK_MAX_JOBS", 1)))
+
+
+def diretorio_saida(job_id):
+    base = os.getenv("BULK_OUTPUT_DIR", os.path.join(tempfile.gettempdir(), "dqtimes_lote"))
+    return os.path.join(base, job_id)
+
+
+def _executar_job(job_id, caminho_csv, remover_entrada, **opcoes):
+    with _jobs_lock:
+        _jobs[job_id]["status"] = "running"
+    try:
+        manifesto = executar_pipeline(caminho_csv, _jobs[job_id]["destino"], **opcoes)
+        with _jobs_lock:
+            _jobs[job_id].update(status="completed", manifesto=manifesto, fim=datetime.utcnow().isoformat())
+    except Exception as e:
+        logger.error(f"Bulk job {job_id} failed: {e}")
+        with _jobs_lock:
+            _jobs[job_id].update(status="failed", erro=str(e), fim=datetime.utcnow().isoformat())
+    finally:
+        if remover_entrada:
+            os.unlink(caminho_csv)
+
+
+def submeter_job(caminho_csv, n_projecoes, remover_entrada=False, **opcoes):
+    """Agenda o pipeline em segundo plano e retorna o job_id"""
+    job_id = f"lote-{secrets.token_hex(8)}"
+    with _jobs_lock:
+        _jobs[job_id] = {
+            "job_id": job_id,
+            "status": "queued",
+            "destino": diretorio_saida(job_id),
+            "n_projecoes": n_projecoes,
+            "inicio": datetime.utcnow().isoformat(),
+        }
+    _executor.submit(_executar_job, job_id, caminho_csv, remover_entrada, n_projecoes=n_projecoes, **opcoes)
+    return job_id
+
+
+def estado_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+
+def salvar_upload(arquivo):
+    """Copia um upload para disco em blocos, sem carregá-lo inteiro na memória"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp_file:
+        shutil.copyfileobj(arquivo, tmp_file, length=1024 * 1024)
+        return tmp_file.name
+
+
+# ================== CLI ==================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Projeção out-of-core de CSVs (uma série por linha)")
+    parser.add_argument("entrada", help="CSV de entrada")
+    parser.add_argument("destino", help="Diretório de saída (blocos + manifest.json)")
+    parser.add_argument("--n-projecoes", type=int, required=True)
+    parser.add_argument("--blocksize", default=BLOCKSIZE_PADRAO, help="Tamanho do bloco de leitura (ex.: 64MB)")
+    parser.add_argument("--formato", choices=FORMATOS, default="parquet")
+    parser.add_argument("--sem-header", action="store_true", help="CSV sem linha de cabeçalho")
+    parser.add_argument("--index-col", action="store_true", help="Descarta a primeira coluna (índice)")
+    args = parser.parse_args(argv)
+
+    try:
+        manifesto = executar_pipeline(
+            args.entrada,
+            args.destino,
+            args.n_projecoes,
+            blocksize=args.blocksize,
+            header=not args.sem_header,
+            index_col=args.index_col,
+            formato=args.formato,
+        )
+    finally:
+        cluster.encerrar_cluster()
+
+    print(f"{manifesto['total_linhas']} séries projetadas em {len(manifesto['blocos'])} blocos "
+          f"({manifesto['tempo_execucao']:.2f}s) -> {os.path.join(args.destino, 'manifest.json')}")
+
+
+if __name__ == "__main__":
+    main()
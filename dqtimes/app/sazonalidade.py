@@ -0,0 +1,106 @@
+# sazonalidade.py
+# Detecção do período sazonal para podar a varredura de candidatos do forecast_temp
+#
+# forecast_temp ajusta MA e HW para cada período candidato. Em vez de todos, a
+# autocorrelação da base (calculada por FFT, O(n log n)) ordena os períodos que
+# cabem na série e só os top-k seguem para a varredura. Isso permite incluir
+# períodos longos (24 e 168 para séries horárias) sem pagar por todos eles.
+#
+# A detecção é opcional (por chamada ou SEASONALITY_DETECTION): sem ela a
+# varredura é a original, e a resposta padrão não muda.
+
+import os
+
+import numpy as np
+
+# Varredura original do forecast_temp (usada com a detecção desligada)
+PERIODOS_FIXOS = [3, 4, 5, 6, 7, 14, 30]
+# Candidatos com a detecção ligada: os fixos mais ciclos diário e semanal de séries horárias
+PERIODOS_CANDIDATOS = [3, 4, 5, 6, 7, 14, 24, 30, 168]
+TOP_K_PADRAO = 3
+
+
+def deteccao_habilitada():
+    """SEASONALITY_DETECTION (padrão: false)"""
+    return os.getenv("SEASONALITY_DETECTION", "false").strip().lower() in ("true", "1", "yes")
+
+
+def top_k_padrao():
+    valor = os.getenv("SEASONALITY_TOP_K")
+    return int(valor) if valor and valor.strip() else TOP_K_PADRAO
+
+
+def autocorrelacao(valores):
+    """Autocorrelação normalizada (lag 0..n-1) via FFT, após remover a tendência linear"""
+    x = np.asarray(valores, dtype=float)
+    n = len(x)
+    if n < 2:
+        return np.ones(n)
+    t = np.arange(n)
+    energia = float(np.sum((x - x.mean()) ** 2))
+    x = x - np.polyval(np.polyfit(t, x, 1), t)
+    espectro = np.fft.rfft(x, 2 * n)
+    acf = np.fft.irfft(espectro * np.conj(espectro))[:n]
+    if energia == 0 or acf[0] <= 1e-12 * energia:
+        # Série linear ou constante: nenhuma sazonalidade detectável
+        return np.zeros(n)
+    return acf / acf[0]
+
+
+def ranquear_periodos(valores, candidatos=None):
+    """
+    Candidatos que cabem na série (dois ciclos completos), do mais ao menos
+    plausível, com a pontuação de cada um.
+    """
+    candidatos = PERIODOS_CANDIDATOS if candidatos is None else candidatos
+    n = len(valores)
+    validos = [p for p in candidatos if 2 * p <= n]
+    if not validos:
+        return []
+    acf = autocorrelacao(valores)
+    # Séries suaves têm autocorrelação alta em todo lag curto; um ciclo real aparece
+    # como retorno da ACF após um vale, então a pontuação é a subida desde o mínimo
+    # nos lags anteriores ao período
+    pontuacoes = [(p, float(acf[p] - acf[1:p].min())) for p in validos]
+    # sort estável: empates (ex.: série sem sazonalidade) mantêm os períodos curtos primeiro
+    return sorted(pontuacoes, key=lambda item: -item[1])
+
+
+def selecionar_periodos(valores, top_k=None, candidatos=None):
+    """
+    Os top-k períodos para a varredura, em ordem crescente.
+
+    Séries curtas demais para dois ciclos do menor candidato ficam com o menor
+    candidato; séries com NaN/inf não são podadas (varredura original).
+    """
+    candidatos = PERIODOS_CANDIDATOS if candidatos is None else candidatos
+    if not np.isfinite(np.asarray(valores, dtype=float)).all():
+        return list(PERIODOS_FIXOS)
+    top_k = top_k or top_k_padrao()
+    ranking = ranquear_periodos(valores, candidatos)
+    if not ranking:
+        return [min(candidatos)]
+    return sorted(p for p, _ in ranking[:top_k])
+
+
+def periodos_avaliados(base, periods=None, top_k=None, detectar=None):
+    """
+    Períodos da varredura: periods, se dado; senão os top_k detectados na base, se
+    detectar (None segue SEASONALITY_DETECTION); senão a varredura original.
+    """
+    if periods is not None:
+        return list(periods)
+    if detectar is None:
+        detectar = deteccao_habilitada()
+    return selecionar_periodos(base, top_k) if detectar else list(PERIODOS_FIXOS)
+
+
+def ordenar_periodos(valores, periodos):
+    """
+    Os períodos dados do mais ao menos plausível; os que não cabem na série (ou
+    séries com NaN/inf) ficam no fim, na ordem original.
+    """
+    if not np.isfinite(np.asarray(valores, dtype=float)).all():
+        return list(periodos)
+    ranqueados = [p for p, _ in ranquear_periodos(valores, periodos)]
+    return ranqueados + [p for p in periodos if p not in ranqueados]
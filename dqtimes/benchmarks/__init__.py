@@ -0,0 +1 @@
+# Ferramentas de medição de desempenho do DQTimes (executar a partir de dqtimes/)
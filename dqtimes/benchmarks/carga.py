@@ -0,0 +1,219 @@
+# carga.py
+# Gerador de carga HTTP para a API v2 com percentis de latência
+#
+# Faz login uma vez e dispara /forecast/single, /forecast/batch e /history em malha
+# aberta (chegadas em taxa fixa, independentes das respostas), com um mix
+# configurável. A latência é medida a partir do instante agendado da chegada, de
+# modo que a fila acumulada sob saturação aparece nos percentis. Com uma rampa de
+# taxas, reporta o ponto de saturação de cada endpoint.
+#
+# Uso (a partir de dqtimes/):
+#   python -m benchmarks.carga                                   # ASGI em processo
+#   python -m benchmarks.carga --url http://localhost:8000 --rampa 5,10,20,40
+#   python -m benchmarks.carga --mix single=80,batch=5,history=15 --taxa 20 --duracao 30
+
+import sys
+import time
+import asyncio
+import argparse
+
+import numpy as np
+import httpx
+
+from benchmarks.comum import ambiente, resumo_latencias, salvar_resultado
+
+ENDPOINTS = ("single", "batch", "history")
+MIX_PADRAO = "single=70,batch=10,history=20"
+
+
+def interpretar_mix(texto):
+    """'single=70,batch=10' -> {'single': 0.875, 'batch': 0.125}"""
+    pesos = {}
+    for item in texto.split(","):
+        nome, peso = item.split("=")
+        nome = nome.strip()
+        if nome not in ENDPOINTS:
+            raise ValueError(f"Endpoint desconhecido no mix: {nome} (use {', '.join(ENDPOINTS)})")
+        pesos[nome] = float(peso)
+    total = sum(pesos.values())
+    return {nome: peso / total for nome, peso in pesos.items() if peso > 0}
+
+
+def _serie(n, rng):
+    t = np.arange(n)
+    return (100 + 0.1 * t + 10 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 1, n)).round(4).tolist()
+
+
+def montar_requisicoes(n_pontos, n_series_lote, semente=0):
+    """Funções que disparam cada endpoint a partir de um httpx.AsyncClient autenticado"""
+    rng = np.random.default_rng(semente)
+    corpo_single = {"data": _serie(n_pontos, rng), "n_projections": 5, "method": "auto"}
+    colunas = [_serie(n_pontos, rng) for _ in range(n_series_lote)]
+    linhas = [",".join(f"serie_{i}" for i in range(n_series_lote))]
+    linhas += [",".join(str(c[j]) for c in colunas) for j in range(n_pontos)]
+    csv_lote = ("\n".join(linhas) + "\n").encode()
+
+    return {
+        "single": lambda cliente: cliente.post("/forecast/single", json=corpo_single),
+        "batch": lambda cliente: cliente.post(
+            "/forecast/batch",
+            files={"file": ("lote.csv", csv_lote, "text/csv")},
+            data={"n_projections": "5", "parallel_processing": "false"},
+        ),
+        "history": lambda cliente: cliente.get("/history", params={"page": 1, "page_size": 10}),
+    }
+
+
+async def _autenticar(cliente, usuario, senha):
+    resposta = await cliente.post("/auth/login", json={"username": usuario, "password": senha})
+    resposta.raise_for_status()
+    cliente.headers["Authorization"] = f"Bearer {resposta.json()['access_token']}"
+
+
+async def executar_estagio(cliente, requisicoes, mix, taxa, duracao, max_concorrencia, semente=0):
+    """
+    Dispara taxa*duracao chegadas em malha aberta e coleta latências por endpoint.
+
+    max_concorrencia limita requisições em voo; chegadas excedentes esperam e o
+    tempo de espera entra na latência.
+    """
+    rng = np.random.default_rng(semente)
+    nomes = list(mix)
+    escolhas = rng.choice(len(nomes), size=max(1, int(taxa * duracao)), p=[mix[n] for n in nomes])
+    semaforo = asyncio.Semaphore(max_concorrencia)
+    amostras = {nome: {"latencias": [], "erros": 0, "status": {}} for nome in nomes}
+
+    async def disparar(nome, agendado):
+        async with semaforo:
+            try:
+                resposta = await requisicoes[nome](cliente)
+                codigo = resposta.status_code
+            except httpx.HTTPError as e:
+                codigo = type(e).__name__
+        latencia = time.perf_counter() - agendado
+        amostra = amostras[nome]
+        amostra["status"][str(codigo)] = amostra["status"].get(str(codigo), 0) + 1
+        if codigo == 200:
+            amostra["latencias"].append(latencia)
+        else:
+            amostra["erros"] += 1
+
+    inicio = time.perf_counter()
+    tarefas = []
+    for i, escolha in enumerate(escolhas):
+        agendado = inicio + i / taxa
+        espera = agendado - time.perf_counter()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        tarefas.append(asyncio.create_task(disparar(nomes[escolha], agendado)))
+    await asyncio.gather(*tarefas)
+    decorrido = time.perf_counter() - inicio
+
+    # Taxa ofertada real de cada endpoint (o sorteio do mix não é exato em estágios curtos)
+    janela = len(escolhas) / taxa
+    resultado = {}
+    for indice, (nome, amostra) in enumerate(amostras.items()):
+        total = len(amostra["latencias"]) + amostra["erros"]
+        resultado[nome] = {
+            "ofertado_rps": int(np.sum(escolhas == indice)) / janela,
+            "requisicoes": total,
+            "throughput_rps": len(amostra["latencias"]) / decorrido,
+            "taxa_erro": amostra["erros"] / total if total else 0.0,
+            "status": amostra["status"],
+            "latencia_ms": resumo_latencias(amostra["latencias"]),
+        }
+    return {"taxa_rps": taxa, "duracao_s": decorrido, "endpoints": resultado}
+
+
+def ponto_saturacao(estagios, slo_ms, tolerancia=0.9, max_erro=0.01):
+    """
+    Primeira taxa em que cada endpoint satura: throughput abaixo de tolerancia x
+    ofertado, taxa de erro acima de max_erro ou p99 acima do SLO.
+    """
+    saturacao = {}
+    for estagio in estagios:
+        for nome, dados in estagio["endpoints"].items():
+            if nome in saturacao:
+                continue
+            p99 = dados["latencia_ms"]["p99"]
+            if (dados["throughput_rps"] < tolerancia * dados["ofertado_rps"]
+                    or dados["taxa_erro"] > max_erro
+                    or (p99 is not None and p99 > slo_ms)):
+                saturacao[nome] = estagio["taxa_rps"]
+    return {nome: saturacao.get(nome) for nome in estagios[0]["endpoints"]} if estagios else {}
+
+
+async def executar(opcoes):
+    mix = interpretar_mix(opcoes.mix)
+    taxas = [float(x) for x in opcoes.rampa.split(",")] if opcoes.rampa else [opcoes.taxa]
+    requisicoes = montar_requisicoes(opcoes.pontos, opcoes.series_lote)
+
+    if opcoes.url:
+        transporte = None
+        base_url = opcoes.url
+    else:
+        from app import api_v2, aquecimento
+        # ASGITransport não dispara os eventos de startup; aquece explicitamente
+        aquecimento.executar_aquecimento()
+        transporte = httpx.ASGITransport(app=api_v2.app)
+        base_url = "http://dqtimes"
+
+    limites = httpx.Limits(max_connections=opcoes.max_concorrencia)
+    async with httpx.AsyncClient(transport=transporte, base_url=base_url, timeout=opcoes.timeout,
+                                 limits=limites) as cliente:
+        await _autenticar(cliente, opcoes.usuario, opcoes.senha)
+        estagios = []
+        for taxa in taxas:
+            estagio = await executar_estagio(cliente, requisicoes, mix, taxa, opcoes.duracao,
+                                             opcoes.max_concorrencia)
+            estagios.append(estagio)
+            imprimir_estagio(estagio)
+
+    return {
+        "alvo": opcoes.url or "asgi",
+        "mix": mix,
+        "slo_ms": opcoes.slo_ms,
+        "estagios": estagios,
+        "saturacao_rps": ponto_saturacao(estagios, opcoes.slo_ms),
+    }
+
+
+def imprimir_estagio(estagio):
+    print(f"\nTaxa ofertada: {estagio['taxa_rps']:.1f} req/s ({estagio['duracao_s']:.1f}s)")
+    print(f"  {'endpoint':<10} {'ofert.':>8} {'obtido':>8} {'erro':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for nome, dados in estagio["endpoints"].items():
+        lat = dados["latencia_ms"]
+        formatar = lambda v: f"{v:8.1f}ms" if v is not None else f"{'-':>10}"
+        print(f"  {nome:<10} {dados['ofertado_rps']:8.2f} {dados['throughput_rps']:8.2f} "
+              f"{dados['taxa_erro']:6.1%} {formatar(lat['p50'])}{formatar(lat['p95'])}{formatar(lat['p99'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gerador de carga da API DQTimes v2")
+    parser.add_argument("--url", help="URL base (padrão: app ASGI em processo)")
+    parser.add_argument("--mix", default=MIX_PADRAO, help="Pesos por endpoint (single, batch, history)")
+    parser.add_argument("--taxa", type=float, default=10.0, help="Requisições por segundo")
+    parser.add_argument("--rampa", help="Lista de taxas (req/s) para encontrar a saturação")
+    parser.add_argument("--duracao", type=float, default=10.0, help="Duração de cada estágio (s)")
+    parser.add_argument("--max-concorrencia", type=int, default=64)
+    parser.add_argument("--slo-ms", type=float, default=1000.0, help="p99 acima disso conta como saturação")
+    parser.add_argument("--pontos", type=int, default=100, help="Tamanho das séries enviadas")
+    parser.add_argument("--series-lote", type=int, default=5, help="Séries por CSV do /forecast/batch")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--usuario", default="admin")
+    parser.add_argument("--senha", default="Admin@123")
+    parser.add_argument("--saida", help="Arquivo JSON de saída")
+    opcoes = parser.parse_args(argv)
+
+    resultado = asyncio.run(executar(opcoes))
+    print("\nPonto de saturação (req/s totais ofertadas):")
+    for nome, taxa in resultado["saturacao_rps"].items():
+        print(f"  {nome:<10} {taxa if taxa is not None else 'não atingido'}")
+
+    caminho = salvar_resultado({"meta": ambiente(), **resultado}, "carga", opcoes.saida)
+    print(f"Resultados gravados em {caminho}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+# comum.py
+# Utilitários compartilhados pelas ferramentas de benchmark
+
+import os
+import sys
+import json
+import platform
+import subprocess
+from datetime import datetime
+
+import numpy as np
+
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+
+
+def commit_atual():
+    """Hash curto do commit atual (ou 'desconhecido' fora de um repositório git)"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(__file__),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def ambiente():
+    """Metadados da máquina e do código para identificar uma execução"""
+    return {
+        "commit": commit_atual(),
+        "data": datetime.utcnow().isoformat(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def resumo_latencias(latencias_s):
+    """Média e percentis (em ms) de uma lista de latências em segundos"""
+    ms = np.asarray(latencias_s, dtype=float) * 1000
+    if ms.size == 0:
+        return {"media": None, "p50": None, "p95": None, "p99": None, "max": None}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "media": float(ms.mean()),
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+        "max": float(ms.max()),
+    }
+
+
+def salvar_resultado(resultado, prefixo, caminho=None):
+    """Grava o resultado em JSON; por padrão em benchmarks/resultados/<prefixo>-<commit>-<data>.json"""
+    if caminho is None:
+        os.makedirs(DIRETORIO_RESULTADOS, exist_ok=True)
+        carimbo = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        nome = f"{prefixo}-{resultado['meta']['commit']}-{carimbo}.json"
+        caminho = os.path.join(DIRETORIO_RESULTADOS, nome)
+    with open(caminho, "w") as f:
+        json.dump(resultado, f, indent=2)
+    return caminho
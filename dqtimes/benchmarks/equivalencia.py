@@ -0,0 +1,434 @@
+# equivalencia.py
+# Testes diferenciais entre as implementações de referência e os caminhos rápidos
+#
+# Cada par registra uma função de referência (aplicacao.py, py_utils.py,
+# modelos_preditivos.py) e uma implementação otimizada com a mesma assinatura.
+# Ambas rodam lado a lado sobre séries geradas (tamanhos de borda, séries
+# constantes, magnitudes enormes, lacunas NaN); o relatório traz o erro absoluto e
+# relativo máximo de cada par contra as tolerâncias e o speedup medido na mesma
+# execução. Um engine só pode ser habilitado se passar aqui.
+#
+# Uso (a partir de dqtimes/):
+#   python -m benchmarks.equivalencia
+#   python -m benchmarks.equivalencia --pares forecast_temp --n-bench 100000 --rtol 1e-6
+
+import io
+import re
+import sys
+import time
+import argparse
+import contextlib
+
+import numpy as np
+
+from benchmarks.comum import ambiente, salvar_resultado
+from benchmarks import referencias
+
+from app import aplicacao, aquecimento, grade_hw, estado_modelos, microlote, interpolacao
+
+# Os módulos de app/libs imprimem exemplos ao serem importados
+with contextlib.redirect_stdout(io.StringIO()):
+    from app.libs import modelos_preditivos, py_utils
+
+N_PROJECOES = 5
+TAMANHOS_BORDA = (1, 2, 3, 4, 5, 7, 10, 11, 29, 30, 31, 100, 1000)
+
+
+class Par:
+    """Par referência x implementação rápida com tolerâncias próprias"""
+
+    def __init__(self, nome, referencia, rapida, preparar=None, atol=1e-9, rtol=1e-7,
+                 min_n=1, aceita_nan=True):
+        self.nome = nome
+        self.referencia = referencia
+        self.rapida = rapida
+        self.preparar = preparar or (lambda serie: (list(serie), N_PROJECOES))
+        self.atol = atol
+        self.rtol = rtol
+        self.min_n = min_n
+        self.aceita_nan = aceita_nan
+
+
+PARES = []
+
+
+def registrar_par(nome, referencia, rapida, **opcoes):
+    """Registra um par para os testes diferenciais (ver Par)"""
+    par = Par(nome, referencia, rapida, **opcoes)
+    PARES.append(par)
+    return par
+
+
+def _continuar_em_partes(metodo, period, parametros=None):
+    """Ajustados do estado incremental: metade da série, ida e volta pelo formato binário, resto"""
+    def ajustados(serie):
+        estado = estado_modelos.EstadoModelo.para_vencedor(metodo, period, parametros)
+        meio = len(serie) // 2
+        inicio = estado.atualizar(serie[:meio])
+        estado = estado_modelos.EstadoModelo.desserializar(estado.serializar())
+        return inicio + estado.atualizar(serie[meio:]), estado.probabilidade_subir(N_PROJECOES)
+    return ajustados
+
+
+def registrar_pares_padrao():
+    """Pares conhecidos do repositório; cada engine otimizado adiciona o seu aqui"""
+    probabilidade = lambda serie: aplicacao.python_bayes_probability(
+        aplicacao.python_binarize(serie, N_PROJECOES), N_PROJECOES)
+    grade = {"alpha": 0.5, "beta": 0.2, "gamma": 0.3}
+    for metodo, period, referencia, parametros in (
+        ("MA", 7, lambda serie: aplicacao.python_moving_average(serie, 7), None),
+        ("HW", 7, lambda serie: aplicacao.python_holt_winters_simple(serie, 7), None),
+        ("HW_GRADE", 7, lambda serie: grade_hw.suavizar(serie, 7, **grade), grade),
+    ):
+        registrar_par(
+            f"estado_modelos.continuar[{metodo}_{period}]",
+            lambda serie, ref=referencia: (ref(serie), probabilidade(serie)),
+            _continuar_em_partes(metodo, period, parametros),
+            preparar=lambda serie: (list(serie),),
+            # python_holt_winters_simple e grade_hw.suavizar devolvem a série crua quando ela é mais curta que o período
+            min_n=period,
+        )
+    for period in (3, 7, 30):
+        # Recorrência da grade em um único ponto (gamma=0) = python_holt_winters_simple
+        registrar_par(
+            f"grade_hw.suavizar[p={period}]",
+            lambda serie, p=period: aplicacao.python_holt_winters_simple(serie, p),
+            lambda serie, p=period: grade_hw.suavizar(serie, p, 0.2, 0.1, 0.0),
+            preparar=lambda serie: (list(serie),),
+        )
+    for k in (3, 4, 12, 30):
+        registrar_par(
+            f"modelos_preditivos.media_movel{k}",
+            lambda serie, n, k=k: referencias.media_movel_original(serie, n, k),
+            getattr(modelos_preditivos, f"media_movel{k}"),
+            # Soma corrente compensada no lugar de somar a janela a cada passo
+            rtol=1e-12,
+        )
+        registrar_par(
+            f"modelos_preditivos.media_movel_lote[k={k}]",
+            lambda serie, n, k=k: [referencias.media_movel_original(list(serie) + [d], n, k) for d in (0.0, 1.0)],
+            lambda serie, n, k=k: modelos_preditivos.media_movel_lote(
+                [list(serie) + [d] for d in (0.0, 1.0)], n, k).tolist(),
+            # Blocos de k passos por cumsum ponderado; a soma é refeita a cada bloco
+            rtol=1e-12,
+        )
+    for nome in ("sazonal_aditivo", "sazonal_multiplicativo", "holt_winter7"):
+        registrar_par(
+            f"modelos_preditivos.{nome}",
+            getattr(referencias, f"{nome}_original"),
+            getattr(modelos_preditivos, nome),
+            # Soma acumulada em vez de somar a janela inteira a cada passo
+            rtol=1e-9,
+            # O sazonal_multiplicativo original não termina com menos de 5 valores
+            min_n=5 if nome == "sazonal_multiplicativo" else 1,
+        )
+        registrar_par(
+            f"modelos_preditivos.{nome}_lote",
+            lambda serie, n, f=getattr(referencias, f"{nome}_original"): [
+                f(list(serie) + [d], n) for d in (0.0, 1.0)],
+            lambda serie, n, f=getattr(modelos_preditivos, f"{nome}_lote"): f(
+                [list(serie) + [d] for d in (0.0, 1.0)], n).tolist(),
+            rtol=1e-9,
+            min_n=4 if nome == "sazonal_multiplicativo" else 1,
+        )
+    registrar_par("modelos_preditivos.arima", referencias.arima_original, modelos_preditivos.arima)
+    registrar_par(
+        "modelos_preditivos.arima_lote",
+        lambda serie, n: [referencias.arima_original(list(serie) + [d], n) for d in (0.0, 1.0)],
+        lambda serie, n: modelos_preditivos.arima_lote([list(serie) + [d] for d in (0.0, 1.0)], n).tolist(),
+        # Produto pelas potências de -beta2 no lugar da recursão: difere no último ulp
+        rtol=1e-12,
+    )
+    # Floats do Python, como chegam pela API: com np.float64 a média zero vira inf/nan
+    # na referência em vez de ZeroDivisionError
+    registrar_par("modelos_preditivos.naive_bayes", referencias.naive_bayes_original,
+                  modelos_preditivos.naive_bayes, preparar=lambda serie: (serie.tolist(), N_PROJECOES))
+    binarizar = lambda serie: [1 if d > 0 else 0 for d in np.diff(serie)]
+    for n in (2, 6, 12):
+        registrar_par(
+            f"py_utils.inferencia_bayes_bin_general[n={n}]",
+            referencias.inferencia_bayes_bin_general_original,
+            py_utils.inferencia_bayes_bin_general,
+            preparar=lambda serie, n=n: (binarizar(serie), n),
+        )
+    registrar_par(
+        "py_utils.inferencia_bayes_bin_varios",
+        lambda binarios, ns: [referencias.inferencia_bayes_bin_general_original(binarios, n)[0] for n in ns],
+        py_utils.inferencia_bayes_bin_varios,
+        preparar=lambda serie: (binarizar(serie), range(2, 9)),
+    )
+    for n_ante, n_poste in ((1, 1), (2, 2), (5, 5), (4, 1)):
+        registrar_par(
+            f"py_utils.binariza[{n_ante},{n_poste}]",
+            referencias.binariza_original,
+            py_utils.binariza,
+            preparar=lambda serie, a=n_ante, p=n_poste: (list(serie), a, p),
+        )
+    registrar_par(
+        "py_utils.tax_acrescimo",
+        referencias.tax_acrescimo_original,
+        py_utils.tax_acrescimo,
+        preparar=lambda serie: (serie.tolist(),),
+        # np.mean no lugar da média exata de statistics.mean
+        rtol=1e-12,
+    )
+    registrar_par(
+        "py_utils.tax_acrescimo_lote",
+        lambda serie: [referencias.tax_acrescimo_original(serie + [d]) for d in (0.0, 1.0)],
+        lambda serie: py_utils.tax_acrescimo_lote([serie + [d] for d in (0.0, 1.0)]).tolist(),
+        preparar=lambda serie: (serie.tolist(),),
+        rtol=1e-12,
+    )
+
+    def _erros_numericos(funcao):
+        # os erros saem como texto; um ulp de diferença no quadrado já muda o texto
+        # quando a magnitude é enorme, então a comparação é feita sobre os números
+        return lambda t, p: [[float(e) for e in funcao(t, p)[0]], funcao(t, p)[1]]
+
+    registrar_par(
+        "py_utils.compara_testemunha",
+        _erros_numericos(referencias.compara_testemunha_original),
+        _erros_numericos(py_utils.compara_testemunha),
+        # previsão mais curta que a testemunha: o zip original trunca no menor
+        preparar=lambda serie: (list(serie), list(serie[::-1])[:max(1, len(serie) - 1)]),
+        # o original eleva escalares com pow; o quadrado vetorizado é o produto exato
+        rtol=1e-12,
+    )
+    registrar_par(
+        "aplicacao.python_binarize",
+        lambda serie, n: [1 if serie[i] > serie[i - 1] else 0 for i in range(1, len(serie))],
+        aplicacao.python_binarize,
+    )
+    # A série entra em um lote com outras de tamanhos diferentes (preenchimento da matriz)
+    vizinhas = [list(50 + np.sin(np.arange(n))) for n in (4, 57, 1200)]
+    registrar_par(
+        "microlote.forecast_lote",
+        lambda serie, n: aplicacao.forecast_temp(serie, n, backend="python"),
+        lambda serie, n: microlote.forecast_lote([serie] + vizinhas, n)[0],
+        # O motor só recebe séries elegíveis (finitas e com testemunha)
+        min_n=4, aceita_nan=False,
+        # Mesmas reduções, na mesma ordem, que o forecast_temp: saída idêntica bit a bit
+        atol=0.0, rtol=0.0,
+    )
+
+    def _interp_interno(serie):
+        # np.interp linha a linha, só entre o primeiro e o último valor conhecido
+        serie = np.asarray(serie, dtype=float)
+        conhecidos = np.flatnonzero(~np.isnan(serie))
+        if len(conhecidos) == 0:
+            return serie.tolist()
+        saida = serie.copy()
+        trecho = np.arange(conhecidos[0], conhecidos[-1] + 1)
+        saida[trecho] = np.interp(trecho, conhecidos, serie[conhecidos])
+        return saida.tolist()
+
+    registrar_par(
+        "interpolacao.preencher_linear",
+        lambda serie: [_interp_interno(serie), _interp_interno(serie[::-1])],
+        lambda serie: interpolacao.preencher_linear([serie, serie[::-1]]).tolist(),
+        preparar=lambda serie: (np.asarray(serie, dtype=float),),
+        rtol=1e-12,
+    )
+    if "cuda" in aplicacao.backends_disponiveis():
+        registrar_par(
+            "forecast_temp[cuda]",
+            lambda serie, n: aplicacao.forecast_temp(serie, n, backend="python"),
+            lambda serie, n: aplicacao.forecast_temp(serie, n, backend="cuda"),
+            # O backend CUDA trabalha em float32
+            atol=1e-4, rtol=1e-4, min_n=4, aceita_nan=False,
+        )
+        registrar_par(
+            "cuda_interpolacao1d[cuda]",
+            lambda serie: aplicacao.cuda_interpolacao1d(np.arange(len(serie)), serie, backend="cuda"),
+            lambda serie: aplicacao.cuda_interpolacao1d(np.arange(len(serie)), serie, backend="python"),
+            preparar=lambda serie: (list(serie),),
+            atol=1e-4, rtol=1e-4, aceita_nan=False,
+        )
+
+
+# ================== CASOS ==================
+
+def gerar_casos(semente=0):
+    """Lista de (nome, série) cobrindo os casos de borda"""
+    rng = np.random.default_rng(semente)
+    casos = []
+    for n in TAMANHOS_BORDA:
+        t = np.arange(n, dtype=float)
+        casos.append((f"sazonal_n{n}", 50 + 0.3 * t + 5 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 1, n)))
+    casos += [
+        ("constante_n50", np.full(50, 42.0)),
+        ("zeros_n50", np.zeros(50)),
+        ("degrau_n60", np.r_[np.full(30, 1.0), np.full(30, 100.0)]),
+        ("alternada_n40", np.tile([1.0, -1.0], 20)),
+        ("negativa_n80", -1000 + rng.normal(0, 5, 80).cumsum()),
+        ("enorme_n100", 1e12 * (1 + 0.01 * rng.normal(0, 1, 100).cumsum())),
+        ("minuscula_n100", 1e-9 * (1 + rng.random(100))),
+        ("passeio_n5000", 100 + rng.normal(0, 1, 5000).cumsum()),
+    ]
+    for n, fracao in ((60, 0.05), (200, 0.2)):
+        serie = 100 + rng.normal(0, 1, n).cumsum()
+        serie[rng.choice(n, int(n * fracao), replace=False)] = np.nan
+        casos.append((f"lacunas_nan_n{n}", serie))
+    return casos
+
+
+# ================== COMPARAÇÃO ==================
+
+def achatar(valor):
+    """Converte a saída (dicts, listas, tuplas, escalares) em (estrutura, vetor float)"""
+    estrutura = []
+    numeros = []
+
+    def visitar(v, caminho):
+        if isinstance(v, dict):
+            for chave in sorted(v):
+                visitar(v[chave], f"{caminho}.{chave}")
+        elif isinstance(v, (list, tuple)) or (isinstance(v, np.ndarray) and v.ndim > 0):
+            estrutura.append((caminho, len(v)))
+            for i, item in enumerate(v):
+                visitar(item, f"{caminho}[{i}]")
+        elif isinstance(v, str):
+            estrutura.append((caminho, v))
+        elif v is None:
+            # métricas indefinidas saem como None no JSON
+            numeros.append(np.nan)
+        else:
+            numeros.append(float(v))
+
+    visitar(valor, "")
+    return estrutura, np.asarray(numeros, dtype=float)
+
+
+def comparar_saidas(ref, rap, atol, rtol):
+    """Erros máximos e se a saída rápida está dentro das tolerâncias"""
+    estrutura_ref, a = achatar(ref)
+    estrutura_rap, b = achatar(rap)
+    if estrutura_ref != estrutura_rap or a.shape != b.shape:
+        return {"ok": False, "motivo": "estrutura diferente", "erro_abs": None, "erro_rel": None}
+
+    nan_a, nan_b = np.isnan(a), np.isnan(b)
+    if not np.array_equal(nan_a, nan_b):
+        return {"ok": False, "motivo": "NaN em posições diferentes", "erro_abs": None, "erro_rel": None}
+
+    validos = ~nan_a
+    a, b = a[validos], b[validos]
+    if a.size == 0:
+        return {"ok": True, "motivo": None, "erro_abs": 0.0, "erro_rel": 0.0}
+
+    with np.errstate(invalid="ignore", over="ignore"):
+        diferenca = np.abs(a - b)
+        diferenca[(a == b)] = 0.0  # inf == inf
+        relativo = diferenca / np.maximum(np.abs(a), np.finfo(float).tiny)
+    ok = bool(np.all(diferenca <= atol + rtol * np.abs(a)))
+    return {
+        "ok": ok,
+        "motivo": None if ok else "fora da tolerância",
+        "erro_abs": float(diferenca.max()),
+        "erro_rel": float(relativo.max()),
+    }
+
+
+def _executar(funcao, args):
+    try:
+        return funcao(*args), None
+    except Exception as e:
+        return None, type(e).__name__
+
+
+def verificar_par(par, casos, atol=None, rtol=None):
+    """Roda referência e rápida em todos os casos aplicáveis"""
+    atol = par.atol if atol is None else atol
+    rtol = par.rtol if rtol is None else rtol
+    resultados = []
+    for nome, serie in casos:
+        if len(serie) < par.min_n or (not par.aceita_nan and np.isnan(serie).any()):
+            continue
+        ref, erro_ref = _executar(par.referencia, par.preparar(serie.copy()))
+        rap, erro_rap = _executar(par.rapida, par.preparar(serie.copy()))
+        if erro_ref or erro_rap:
+            # Falhar do mesmo jeito é equivalente; falhar só de um lado não é
+            ok = erro_ref == erro_rap
+            resultados.append({"caso": nome, "ok": ok, "erro_abs": None, "erro_rel": None,
+                               "motivo": f"exceções: referência={erro_ref}, rápida={erro_rap}"})
+            continue
+        comparacao = comparar_saidas(ref, rap, atol, rtol)
+        comparacao["caso"] = nome
+        resultados.append(comparacao)
+
+    erros_abs = [r["erro_abs"] for r in resultados if r["erro_abs"] is not None]
+    erros_rel = [r["erro_rel"] for r in resultados if r["erro_rel"] is not None]
+    return {
+        "par": par.nome,
+        "atol": atol,
+        "rtol": rtol,
+        "ok": all(r["ok"] for r in resultados),
+        "erro_abs_max": max(erros_abs) if erros_abs else None,
+        "erro_rel_max": max(erros_rel) if erros_rel else None,
+        "falhas": [r for r in resultados if not r["ok"]],
+        "casos": len(resultados),
+    }
+
+
+def medir_speedup(par, n, repeticoes, semente=0):
+    """Mediana do tempo de cada lado em uma série de n pontos"""
+    rng = np.random.default_rng(semente)
+    serie = 100 + rng.normal(0, 1, n).cumsum()
+
+    def mediana(funcao):
+        tempos = []
+        for _ in range(repeticoes):
+            args = par.preparar(serie.copy())
+            inicio = time.perf_counter()
+            funcao(*args)
+            tempos.append(time.perf_counter() - inicio)
+        return float(np.median(tempos))
+
+    t_ref = mediana(par.referencia)
+    t_rap = mediana(par.rapida)
+    return {"n": n, "referencia_ms": t_ref * 1000, "rapida_ms": t_rap * 1000,
+            "speedup": t_ref / t_rap if t_rap > 0 else None}
+
+
+# ================== CLI ==================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Testes diferenciais referência x caminhos rápidos")
+    parser.add_argument("--pares", help="Regex para filtrar os pares pelo nome")
+    parser.add_argument("--atol", type=float, help="Sobrescreve a tolerância absoluta de todos os pares")
+    parser.add_argument("--rtol", type=float, help="Sobrescreve a tolerância relativa de todos os pares")
+    parser.add_argument("--n-bench", type=int, default=10_000, help="Tamanho da série do speedup")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", help="Arquivo JSON de saída")
+    opcoes = parser.parse_args(argv)
+
+    # O aquecimento descarta backends que carregam mas não funcionam
+    aquecimento.executar_aquecimento()
+    registrar_pares_padrao()
+    pares = [p for p in PARES if not opcoes.pares or re.search(opcoes.pares, p.nome)]
+    if not pares:
+        print("Nenhum par registrado para os filtros/backends atuais")
+        return 0
+
+    casos = gerar_casos(opcoes.semente)
+    relatorio = []
+    print(f"{'par':<36} {'casos':>5} {'erro abs':>10} {'erro rel':>10} {'speedup':>8}  status")
+    for par in pares:
+        resultado = verificar_par(par, casos, opcoes.atol, opcoes.rtol)
+        resultado["speedup"] = medir_speedup(par, opcoes.n_bench, opcoes.repeticoes, opcoes.semente)
+        relatorio.append(resultado)
+
+        formatar = lambda v: f"{v:10.2e}" if v is not None else f"{'-':>10}"
+        speedup = resultado["speedup"]["speedup"]
+        print(f"{par.nome:<36} {resultado['casos']:>5} {formatar(resultado['erro_abs_max'])} "
+              f"{formatar(resultado['erro_rel_max'])} {speedup:7.1f}x  {'OK' if resultado['ok'] else 'FALHOU'}")
+        for falha in resultado["falhas"]:
+            print(f"    {falha['caso']}: {falha['motivo']} (abs={falha['erro_abs']}, rel={falha['erro_rel']})")
+
+    caminho = salvar_resultado({"meta": ambiente(), "pares": relatorio}, "equivalencia", opcoes.saida)
+    print(f"Resultados gravados em {caminho}")
+    return 0 if all(r["ok"] for r in relatorio) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# escala.py
+# Crescimento do custo com o tamanho da série e com o horizonte de previsão
+#
+# As funções de modelos_preditivos reescritas para custo O(1) por passo são medidas
+# lado a lado com a versão original (benchmarks/referencias.py) em uma grade de
+# tamanhos n e horizontes h. Para cada função o relatório traz o expoente ajustado
+# em log-log (tempo ~ n^a e tempo ~ h^b): a original refaz o trabalho sobre a série
+# inteira a cada passo (b ~ 1 com custo proporcional a n), a nova percorre a série
+# uma vez e cada passo custa O(1).
+#
+# Uso (a partir de dqtimes/):
+#   python -m benchmarks.escala
+#   python -m benchmarks.escala --funcoes arima --tamanhos 100,1000,10000 --horizontes 10,100,1000
+
+import re
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from benchmarks.comum import ambiente, salvar_resultado
+from benchmarks import referencias
+from benchmarks.equivalencia import modelos_preditivos
+
+TAMANHOS_PADRAO = (100, 1_000, 10_000)
+HORIZONTES_PADRAO = (10, 100, 1_000)
+
+# nome: (original, nova)
+FUNCOES = {
+    "arima": (referencias.arima_original, modelos_preditivos.arima),
+    "naive_bayes": (referencias.naive_bayes_original, modelos_preditivos.naive_bayes),
+}
+
+
+def cronometrar(funcao, serie, horizonte, tempo_min):
+    """Mediana de execuções repetidas até acumular tempo_min segundos (mínimo 3)"""
+    tempos = []
+    while len(tempos) < 3 or sum(tempos) < tempo_min:
+        inicio = time.perf_counter()
+        funcao(list(serie), horizonte)
+        tempos.append(time.perf_counter() - inicio)
+        if tempos[-1] > 5 * tempo_min:
+            break
+    return float(np.median(tempos))
+
+
+def expoente(xs, ts):
+    """Inclinação de log(t) x log(x)"""
+    return float(np.polyfit(np.log(xs), np.log(ts), 1)[0])
+
+
+def medir_funcao(nome, tamanhos, horizontes, tempo_min):
+    original, nova = FUNCOES[nome]
+    rng = np.random.default_rng(0)
+    medidas = []
+    for n in tamanhos:
+        serie = 100 + rng.normal(0, 1, n).cumsum()
+        for h in horizontes:
+            medidas.append({
+                "n": n,
+                "h": h,
+                "original_ms": cronometrar(original, serie, h, tempo_min) * 1000,
+                "nova_ms": cronometrar(nova, serie, h, tempo_min) * 1000,
+            })
+
+    def ajuste(chave, eixo, fixo_eixo, fixo_valor):
+        pontos = [m for m in medidas if m[fixo_eixo] == fixo_valor]
+        return expoente([m[eixo] for m in pontos], [m[chave] for m in pontos])
+
+    # expoentes no maior valor do outro eixo, onde o termo dominante aparece
+    return {
+        "funcao": nome,
+        "medidas": medidas,
+        "expoente_n": {versao: ajuste(f"{versao}_ms", "n", "h", max(horizontes))
+                       for versao in ("original", "nova")},
+        "expoente_h": {versao: ajuste(f"{versao}_ms", "h", "n", max(tamanhos))
+                       for versao in ("original", "nova")},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Escala das funções reescritas x originais")
+    parser.add_argument("--funcoes", help="Regex para filtrar as funções pelo nome")
+    parser.add_argument("--tamanhos", help="Tamanhos n separados por vírgula")
+    parser.add_argument("--horizontes", help="Horizontes h separados por vírgula")
+    parser.add_argument("--tempo-min", type=float, default=0.05, help="Segundos mínimos por medida")
+    parser.add_argument("--saida", help="Arquivo JSON de saída")
+    opcoes = parser.parse_args(argv)
+
+    tamanhos = [int(x) for x in opcoes.tamanhos.split(",")] if opcoes.tamanhos else TAMANHOS_PADRAO
+    horizontes = [int(x) for x in opcoes.horizontes.split(",")] if opcoes.horizontes else HORIZONTES_PADRAO
+    nomes = [nome for nome in FUNCOES if not opcoes.funcoes or re.search(opcoes.funcoes, nome)]
+
+    relatorio = []
+    for nome in nomes:
+        resultado = medir_funcao(nome, tamanhos, horizontes, opcoes.tempo_min)
+        relatorio.append(resultado)
+        print(f"{nome}")
+        print(f"  {'n':>8} {'h':>6} {'original ms':>12} {'nova ms':>10} {'speedup':>9}")
+        for m in resultado["medidas"]:
+            print(f"  {m['n']:>8} {m['h']:>6} {m['original_ms']:>12.3f} {m['nova_ms']:>10.3f} "
+                  f"{m['original_ms'] / m['nova_ms']:>8.1f}x")
+        print(f"  expoente em n: original {resultado['expoente_n']['original']:.2f}, "
+              f"nova {resultado['expoente_n']['nova']:.2f}")
+        print(f"  expoente em h: original {resultado['expoente_h']['original']:.2f}, "
+              f"nova {resultado['expoente_h']['nova']:.2f}")
+
+    caminho = salvar_resultado({"meta": ambiente(), "funcoes": relatorio}, "escala", opcoes.saida)
+    print(f"Resultados gravados em {caminho}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+# referencias.py
+# Implementações originais mantidas como referência para os testes diferenciais
+#
+# Quando uma função de app/libs é reescrita, a versão anterior vem para cá sem
+# alterações de comportamento, e equivalencia.py compara as duas.
+
+import io
+import contextlib
+
+# Os módulos de app/libs imprimem exemplos ao serem importados
+with contextlib.redirect_stdout(io.StringIO()):
+    from app.libs.modelos_preditivos import media_suave3
+
+
+def media_movel_original(lista, n_de_prevs, a):
+    '''media_movel3/4/12/30 antes do buffer circular: duplica, acrescenta e refatia a cada passo'''
+    from copy import copy as cp
+    i = 1
+    lista_a = cp(lista)
+    while len(lista_a) < a:
+        lista_a = lista_a + lista_a
+
+    previsoes = []
+    final = lista_a[(len(lista_a) - a):]
+    while i <= n_de_prevs:
+        x = sum(final[:])
+        w = (x) / a
+        previsoes.append(w)
+        lista_a.append(w)
+        final = lista_a[(len(lista_a) - a):]
+        i += 1
+    return previsoes
+
+
+def sazonal_aditivo_original(lista, n_de_prevs):
+    '''sazonal_aditivo antes das somas acumuladas: recalcula a média da lista a cada passo'''
+
+    from copy import copy as cp
+    listasa = cp(lista)
+    lista2 = cp(lista)
+
+    while len(lista2)<10:
+      lista2 = lista2+lista2
+
+    contador = 0
+    sazonalidade = []
+    pre_prev = media_suave3(lista2,n_de_prevs)
+    prevs = []
+
+    while contador <= (n_de_prevs-1):
+        soma = 0
+        media = []
+        for i in listasa:
+            soma += i
+            media = soma/len(listasa)
+
+        cast1 = (listasa[0]-(media))/5
+        listasa.append(cast1)
+        sazonalidade.append(cast1)
+        listasa.append(cast1)
+        listasa.pop(0)
+        contador += 1
+
+    for l in range(len(sazonalidade)):
+        difere = pre_prev[l]+sazonalidade[l]
+        prevs.append(difere)
+
+
+    return(prevs)
+
+
+def sazonal_multiplicativo_original(lista, n_de_prevs):
+    '''sazonal_multiplicativo original: não termina com menos de 5 valores'''
+
+    from copy import copy as cp
+    listasm = cp(lista)
+    lista2m = cp(lista)
+
+    while len(listasm)<10:
+      listasm = lista2m+lista2m
+
+    contador = 0
+    sazonalidade = []
+    pre_prev = media_suave3(lista2m,n_de_prevs)
+    prevs = []
+
+    while contador <= (n_de_prevs-1):
+        soma = 0
+        media = []
+        for i in listasm:
+            soma += i
+            media = soma/len(listasm)
+
+        cast1 = (listasm[0]-(media))/10
+        listasm.append(cast1)
+        sazonalidade.append(cast1)
+        listasm.append(cast1)
+        listasm.pop(0)
+        contador += 1
+
+    for l in range(len(sazonalidade)):
+        difere = pre_prev[l]*(1+sazonalidade[l])
+        prevs.append(difere)
+
+
+    return(prevs)
+
+
+def holt_winter7_original(lista, n_de_prevs):
+    '''holt_winter7 antes das somas acumuladas: recalcula a média da lista a cada passo'''
+
+
+    from copy import copy as cp
+
+    listahw7 = cp(lista)
+    coluna = cp(lista)
+    contador = 0
+    prevs = []
+    diferenca = (listahw7[(len(listahw7)-1)]-listahw7[0])
+    tendencia = diferenca /(len(listahw7))
+
+    somafix = 0
+    for k in listahw7:
+            somafix += k
+            mediafix = somafix/len(listahw7)
+
+    while contador <= (n_de_prevs-1):
+        soma = 0
+        media = []
+        for i in listahw7:
+            soma += i
+            media = soma/len(listahw7)
+
+
+        cast1 = media+tendencia+(listahw7[0]-media)
+        listahw7.append(cast1)
+        prevs.append(cast1)
+        coluna.append(cast1)
+        listahw7.pop(0)
+        contador += 1
+
+    sazon = []
+    for z in coluna:
+        sazon.append(z-mediafix)
+
+    indice_sazonalidade = sazon[0:len(prevs)]
+
+    beta = 0.1
+    prev_discontada = []
+    for x in range(len(prevs)):
+        difere = prevs[x]-(beta*indice_sazonalidade[x])
+        prev_discontada.append(difere)
+
+
+    alpha = 0.1
+    prev_suav = []
+    for h in range(len(prev_discontada)):
+        mult = (prev_discontada[h]+(prev_discontada[h] - (2*((mediafix*tendencia)*alpha))))/2
+        prev_suav.append(mult)
+
+    return(prev_suav)
+
+
+def pre_arima_original(lista):
+    from copy import copy as cp
+
+    yps = cp(lista)
+    beta1 = 0.75
+    beta2 = 0.18
+    coluna = []
+    coluna.append(yps[0])
+    hist_erro = []
+    contador = 0
+
+    while contador <= 1:
+
+        for y in range(len(yps)):
+
+            erro = (yps[y]-coluna[y])
+            yprev = (yps[y]*beta1)+(erro*beta2)
+            coluna.append(yprev)
+            hist_erro.append(erro)
+
+            contador += 1
+
+    return(coluna[(len(coluna)-1):])
+
+def arima_original(lista, n_de_prevs):
+    '''arima antes do estado incremental: refaz pre_arima sobre a lista inteira a cada passo'''
+
+    from copy import copy as cp
+    lista0 = cp(lista)
+    contador = 1
+    while contador <= n_de_prevs:
+        anexo = pre_arima_original(lista0)
+        lista0.append(anexo[0])
+        contador += 1
+
+    return(lista0[(len(lista0)-n_de_prevs):])
+
+
+def naive_bayes_original(lista, n_de_prevs):
+    '''naive_bayes antes da tabela de padrões: rebinariza e reconta a série inteira a cada passo'''
+    from copy import copy as cp
+
+    lista1 = cp(lista)
+    prevs = []
+    contador = 1
+    taxa = tax_acrescimo_original(lista)
+    while contador <= n_de_prevs:
+        n_binarizacao = min(max(len(lista1) - 1, 2), 6)
+        a = binariza_original(lista1, n_binarizacao - 1, n_binarizacao - 1)
+        b = inferencia_bayes_bin_general_original(a, n_binarizacao)
+        alta = b[0]
+
+        ultimo = lista1[-1]
+
+        if alta > 0.5:
+            prev = ultimo + (ultimo * taxa[0])
+        else:
+            prev = ultimo + (ultimo * taxa[1])
+
+        prevs.append(prev)
+        lista1.append(prev)
+        contador += 1
+
+    return prevs
+
+
+def inferencia_bayes_bin_general_original(binarios, n):
+    '''inferencia_bayes_bin_general antes dos códigos inteiros: pop(0) e list.count por padrão'''
+    from copy import copy as cp
+
+    if n < 2:
+        raise ValueError("O valor de 'n' deve ser maior ou igual a 2.")
+
+    pref = cp(binarios)
+    final = pref[-(n-1):]
+    quebrar = cp(binarios)
+    subsequencias = []
+
+    while len(quebrar) >= n:
+        par = quebrar[:n]
+        subsequencias.append(par)
+        quebrar.pop(0)
+
+    subir = 0.5
+    combinacoes = [(i, j) for i in range(2) for j in range(n - 1)]
+
+    resultados = {}
+
+    for i, comb in enumerate(combinacoes):
+        valor_final = [int(x) for x in bin(i)[2:].zfill(n - 1)]
+        if valor_final == final:
+            acres = subsequencias.count(valor_final + [1])
+            decre = subsequencias.count(valor_final + [0])
+            if acres > 0:
+                subir = acres / (acres + decre)
+            else:
+                subir = 0.001
+
+    resultado = [subir]
+    return resultado
+
+
+def binariza_original(lista, n_ante, n_poste):
+    '''binariza em listas: cópias, extend e fatias'''
+    from copy import copy as cp
+
+    # Criação das listas ante e poste
+    ante = cp(lista)
+    poste = cp(lista)
+
+    # Adiciona o último elemento em ante e o primeiro elemento em poste, se necessário
+    if n_ante > 0:
+        ante.extend([ante[-1]] * (n_ante - 1))
+        ante = ante[:-n_ante]
+    if n_poste > 0:
+        poste.extend([poste[0]] * (n_poste - 1))
+        poste = poste[n_poste:]
+
+    # Cálculo da diferença e binarização
+    binarios = [1 if poste[i] - ante[i] > 0 else 0 for i in range(len(ante))]
+
+    return binarios
+
+
+def tax_acrescimo_original(lista):
+    '''tax_acrescimo com listas filtradas e statistics.mean'''
+    from statistics import mean
+    coluna = lista[:-1]
+    poste = lista[1:]
+
+    acrescimo = [poste[x] - coluna[x] for x in range(len(coluna)) if poste[x] - coluna[x] > 0]
+    decrescimo = [poste[x] - coluna[x] for x in range(len(coluna)) if poste[x] - coluna[x] <= 0]
+
+    media_lista = mean(lista)
+
+    if acrescimo:
+        acrescimo_medio = mean(acrescimo)
+        acrescimo_percentual = acrescimo_medio / media_lista
+    else:
+        acrescimo_percentual = 0.001
+
+    if decrescimo:
+        decrescimo_medio = mean(decrescimo)
+        decrescimo_percentual = decrescimo_medio / media_lista
+    else:
+        decrescimo_percentual = 0.001
+
+    return [acrescimo_percentual, decrescimo_percentual]
+
+
+def compara_testemunha_original(testemunha, previsao):
+    '''compara_testemunha com compreensões de lista sobre zip'''
+    erros_quadraticos = [(real - previsto) ** 2 for real, previsto in zip(testemunha, previsao)]
+    erros_quadraticos_formatados = [f"{erro:.3f}" for erro in erros_quadraticos]
+
+    erro_quadratico_medio = sum(erros_quadraticos) / len(erros_quadraticos)
+    erro_quadratico_medio_formatado = round(erro_quadratico_medio, 3)
+
+    return [erros_quadraticos_formatados, erro_quadratico_medio_formatado]
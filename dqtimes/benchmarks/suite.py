@@ -0,0 +1,364 @@
+# suite.py
+# Suíte de benchmarks do DQTimes
+#
+# Mede forecast_temp (por backend), cada modelo de modelos_preditivos, os helpers de
+# py_utils e os endpoints de lote, sobre os CSVs incluídos no repositório e sobre
+# séries sintéticas de 10 a 10^6 pontos. Reporta throughput, percentis de latência
+# e pico de memória, e grava o resultado em JSON para comparação entre commits.
+#
+# Uso (a partir de dqtimes/):
+#   python -m benchmarks.suite                      # suíte completa
+#   python -m benchmarks.suite --rapido             # tamanhos até 10^3
+#   python -m benchmarks.suite --alvos forecast_temp --tamanhos 1000,100000
+#   python -m benchmarks.suite --comparar antigo.json novo.json --limiar 0.10
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.comum import ambiente, resumo_latencias, salvar_resultado
+
+from app import aplicacao, aquecimento
+
+# Os módulos de libs imprimem exemplos na importação
+with contextlib.redirect_stdout(io.StringIO()):
+    from app.libs import modelos_preditivos, py_utils
+
+DIRETORIO_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+DATASETS = ("cp_h.csv", "base_teste.csv")
+TAMANHOS_PADRAO = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+TAMANHOS_RAPIDO = (10, 100, 1_000)
+N_PROJECOES = 5
+
+
+class Alvo:
+    """Função medida: recebe os argumentos produzidos por preparar(serie)"""
+
+    def __init__(self, nome, grupo, funcao, preparar=None, max_n=None, backend=None, min_n=1):
+        self.nome = nome
+        self.grupo = grupo
+        self.funcao = funcao
+        self.preparar = preparar or (lambda serie: (list(serie), N_PROJECOES))
+        self.max_n = max_n
+        self.min_n = min_n
+        self.backend = backend
+
+    @property
+    def chave(self):
+        return f"{self.nome}[{self.backend}]" if self.backend else self.nome
+
+
+def _binarios(serie):
+    return py_utils.binariza(list(serie), 2, 2)
+
+
+def construir_alvos(backends):
+    """Lista de alvos; max_n limita funções quadráticas que não terminam em 10^6"""
+    alvos = [
+        Alvo("forecast_temp", "aplicacao",
+             lambda serie, n, backend=backend: aplicacao.forecast_temp(serie, n, backend=backend),
+             backend=backend)
+        for backend in backends
+    ]
+
+    modelos = {
+        "naive_bayes": 10_000,
+        "media_movel3": None,
+        "media_movel4": None,
+        "media_movel12": None,
+        "media_movel30": None,
+        "media_suave3": None,
+        "sazonal_aditivo": None,
+        "sazonal_multiplicativo": None,
+        "media_mov_dupla3": None,
+        "media_mov_dupla4": None,
+        "suave_dupla3": None,
+        "suave_dupla4": None,
+        "holt_winter7": None,
+        "arima": None,
+        "media_mista": None,
+    }
+    for nome, max_n in modelos.items():
+        alvos.append(Alvo(nome, "modelos_preditivos", getattr(modelos_preditivos, nome),
+                          max_n=max_n, min_n=2))
+
+    alvos += [
+        Alvo("split_list", "py_utils", py_utils.split_list,
+             preparar=lambda s: (list(s), int(len(s) * 0.3))),
+        Alvo("compara_testemunha", "py_utils", py_utils.compara_testemunha,
+             preparar=lambda s: (list(s), list(s[::-1]))),
+        Alvo("binariza", "py_utils", py_utils.binariza,
+             preparar=lambda s: (list(s), 2, 2)),
+        Alvo("inferencia_bayes_bin_general", "py_utils", py_utils.inferencia_bayes_bin_general,
+             preparar=lambda s: (_binarios(s), 3), max_n=100_000, min_n=4),
+        Alvo("tax_acrescimo", "py_utils", py_utils.tax_acrescimo,
+             preparar=lambda s: (list(s),)),
+    ]
+    return alvos
+
+
+def _medir_pico_memoria(funcao, args):
+    tracemalloc.start()
+    try:
+        funcao(*args)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico / (1024 * 1024)
+
+
+def medir(alvo, series, tempo_min, max_repeticoes, limite_s):
+    """
+    Executa o alvo sobre as séries (em ciclo) e retorna as estatísticas.
+
+    Com uma única série, repete até acumular tempo_min segundos ou max_repeticoes
+    chamadas; com várias (datasets), cada série é executada uma vez.
+    """
+    argumentos = [alvo.preparar(serie) for serie in series]
+    latencias = []
+    pontos = 0
+    total = 0.0
+    i = 0
+    while True:
+        args = argumentos[i % len(argumentos)]
+        inicio = time.perf_counter()
+        alvo.funcao(*args)
+        decorrido = time.perf_counter() - inicio
+        latencias.append(decorrido)
+        pontos += len(series[i % len(series)])
+        total += decorrido
+        i += 1
+        if len(series) > 1 and i >= len(series):
+            break
+        if len(series) == 1 and (i >= max_repeticoes or (total >= tempo_min and i >= 3) or decorrido > limite_s):
+            break
+
+    return {
+        "chamadas": len(latencias),
+        "latencia_ms": resumo_latencias(latencias),
+        "throughput": {
+            "chamadas_s": len(latencias) / total if total else None,
+            "pontos_s": pontos / total if total else None,
+        },
+        "pico_memoria_mb": _medir_pico_memoria(alvo.funcao, argumentos[0]),
+        "excedeu_limite": max(latencias) > limite_s,
+    }
+
+
+def _registro(alvo, workload, n, estatisticas=None, erro=None):
+    registro = {
+        "alvo": alvo.nome,
+        "grupo": alvo.grupo,
+        "backend": alvo.backend,
+        "workload": workload,
+        "n": n,
+    }
+    if erro is not None:
+        registro["erro"] = erro
+    else:
+        registro.update(estatisticas)
+    return registro
+
+
+def executar_sinteticos(alvos, tamanhos, opcoes, log):
+    resultados = []
+    for alvo in alvos:
+        for n in tamanhos:
+            if n < alvo.min_n or (alvo.max_n is not None and n > alvo.max_n):
+                continue
+            serie = aquecimento.serie_sintetica(n)
+            try:
+                estatisticas = medir(alvo, [serie], opcoes.tempo_min, opcoes.max_repeticoes, opcoes.limite_s)
+            except Exception as e:
+                resultados.append(_registro(alvo, "sintetico", n, erro=f"{type(e).__name__}: {e}"))
+                log(f"  {alvo.chave:<40} n={n:<8} ERRO {type(e).__name__}: {e}")
+                break
+            resultados.append(_registro(alvo, "sintetico", n, estatisticas))
+            log(f"  {alvo.chave:<40} n={n:<8} p50={estatisticas['latencia_ms']['p50']:.3f}ms "
+                f"pico={estatisticas['pico_memoria_mb']:.2f}MB")
+            if estatisticas["excedeu_limite"]:
+                log(f"  {alvo.chave:<40} excedeu {opcoes.limite_s}s, tamanhos maiores ignorados")
+                break
+    return resultados
+
+
+def carregar_dataset(nome):
+    """Séries (linhas) de um CSV incluído, sem a coluna de rótulo"""
+    df = pd.read_csv(os.path.join(DIRETORIO_APP, nome))
+    valores = df.iloc[:, 1:].to_numpy(dtype=float)
+    return [linha[~np.isnan(linha)].tolist() for linha in valores]
+
+
+def executar_datasets(alvos, opcoes, log):
+    resultados = []
+    for nome in DATASETS:
+        series = carregar_dataset(nome)
+        for alvo in alvos:
+            try:
+                estatisticas = medir(alvo, series, opcoes.tempo_min, opcoes.max_repeticoes, opcoes.limite_s)
+            except Exception as e:
+                resultados.append(_registro(alvo, nome, len(series[0]), erro=f"{type(e).__name__}: {e}"))
+                log(f"  {alvo.chave:<40} {nome} ERRO {type(e).__name__}: {e}")
+                continue
+            resultados.append(_registro(alvo, nome, len(series[0]), estatisticas))
+            log(f"  {alvo.chave:<40} {nome} {estatisticas['throughput']['chamadas_s']:.1f} séries/s")
+    return resultados
+
+
+def _csv_colunas(n_series, n_pontos):
+    matriz = np.column_stack([aquecimento.serie_sintetica(n_pontos, semente=i) for i in range(n_series)])
+    return pd.DataFrame(matriz, columns=[f"serie_{i}" for i in range(n_series)]).to_csv(index=False).encode()
+
+
+def executar_endpoints(opcoes, log):
+    """Endpoints de lote via TestClient (ASGI em processo, sem rede)"""
+    from fastapi.testclient import TestClient
+    from app import api_v2, main
+
+    resultados = []
+    n_pontos = 200
+
+    cliente_v2 = TestClient(api_v2.app)
+    token = cliente_v2.post("/auth/login", json={"username": "admin", "password": "Admin@123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    cliente_main = TestClient(main.app)
+
+    for n_series in (10, 50):
+        csv_colunas = _csv_colunas(n_series, n_pontos)
+        # main.py espera uma série por linha
+        csv_linhas = pd.read_csv(io.BytesIO(csv_colunas)).T.to_csv(index=False).encode()
+
+        chamadas = {
+            "/forecast/batch": lambda: cliente_v2.post(
+                "/forecast/batch", headers=headers,
+                files={"file": ("lote.csv", csv_colunas, "text/csv")},
+                data={"n_projections": N_PROJECOES, "parallel_processing": "false"},
+            ),
+            "/projecao_dataframe/": lambda: cliente_main.post(
+                f"/projecao_dataframe/?page=1&page_size={n_series}",
+                files={"csv_dataframe": ("lote.csv", csv_linhas, "text/csv")},
+                data={"quantidade_projecoes": N_PROJECOES, "header": "true", "index_col": "false"},
+            ),
+        }
+        for rota, chamada in chamadas.items():
+            alvo = Alvo(rota, "endpoints", lambda chamada=chamada: _verificar(chamada()), preparar=lambda s: ())
+            try:
+                estatisticas = medir(alvo, [[0.0] * (n_series * n_pontos)], opcoes.tempo_min,
+                                     opcoes.max_repeticoes, opcoes.limite_s)
+            except Exception as e:
+                resultados.append(_registro(alvo, f"{n_series}x{n_pontos}", n_series, erro=f"{type(e).__name__}: {e}"))
+                log(f"  {rota:<40} {n_series} séries ERRO {e}")
+                continue
+            resultados.append(_registro(alvo, f"{n_series}x{n_pontos}", n_series, estatisticas))
+            log(f"  {rota:<40} {n_series} séries p50={estatisticas['latencia_ms']['p50']:.1f}ms")
+    return resultados
+
+
+def _verificar(resposta):
+    if resposta.status_code != 200:
+        raise RuntimeError(f"HTTP {resposta.status_code}: {resposta.text[:200]}")
+    return resposta
+
+
+# ================== COMPARAÇÃO ==================
+
+def _chave_registro(registro):
+    return (registro["alvo"], registro.get("backend"), registro["workload"], registro["n"])
+
+
+def comparar(caminho_antigo, caminho_novo, limiar):
+    """Compara p50 entre duas execuções; retorna a lista de regressões acima do limiar"""
+    with open(caminho_antigo) as f:
+        antigo = json.load(f)
+    with open(caminho_novo) as f:
+        novo = json.load(f)
+
+    indice = {_chave_registro(r): r for r in antigo["resultados"] if "erro" not in r}
+    regressoes = []
+    print(f"{antigo['meta']['commit']} -> {novo['meta']['commit']}")
+    for registro in novo["resultados"]:
+        anterior = indice.get(_chave_registro(registro))
+        if anterior is None or "erro" in registro:
+            continue
+        razao = registro["latencia_ms"]["p50"] / anterior["latencia_ms"]["p50"]
+        marcador = ""
+        if razao > 1 + limiar:
+            marcador = "  <-- REGRESSÃO"
+            regressoes.append((_chave_registro(registro), razao))
+        elif razao < 1 - limiar:
+            marcador = "  (melhora)"
+        alvo, backend, workload, n = _chave_registro(registro)
+        nome = f"{alvo}[{backend}]" if backend else alvo
+        print(f"  {nome:<40} {workload:<16} n={n:<8} {razao:6.2f}x{marcador}")
+    return regressoes
+
+
+# ================== CLI ==================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks do DQTimes")
+    parser.add_argument("--tamanhos", help="Tamanhos das séries sintéticas, separados por vírgula")
+    parser.add_argument("--rapido", action="store_true", help=f"Usa tamanhos {TAMANHOS_RAPIDO}")
+    parser.add_argument("--alvos", help="Regex para filtrar os alvos pelo nome")
+    parser.add_argument("--sem-datasets", action="store_true", help="Não mede cp_h.csv/base_teste.csv")
+    parser.add_argument("--sem-endpoints", action="store_true", help="Não mede os endpoints de lote")
+    parser.add_argument("--tempo-min", type=float, default=0.5, help="Tempo mínimo por medição (s)")
+    parser.add_argument("--max-repeticoes", type=int, default=30)
+    parser.add_argument("--limite-s", type=float, default=30.0,
+                        help="Uma chamada acima deste tempo encerra os tamanhos maiores do alvo")
+    parser.add_argument("--saida", help="Arquivo JSON de saída")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTIGO", "NOVO"), help="Compara duas execuções")
+    parser.add_argument("--limiar", type=float, default=0.10, help="Variação de p50 considerada regressão")
+    opcoes = parser.parse_args(argv)
+
+    if opcoes.comparar:
+        regressoes = comparar(*opcoes.comparar, opcoes.limiar)
+        print(f"{len(regressoes)} regressão(ões) acima de {opcoes.limiar:.0%}")
+        return 1 if regressoes else 0
+
+    if opcoes.tamanhos:
+        tamanhos = [int(x) for x in opcoes.tamanhos.split(",")]
+    else:
+        tamanhos = TAMANHOS_RAPIDO if opcoes.rapido else TAMANHOS_PADRAO
+
+    # O aquecimento valida os backends e evita medir a primeira chamada a frio
+    estado = aquecimento.executar_aquecimento()
+    backends = estado["backends_disponiveis"]
+
+    alvos = construir_alvos(backends)
+    if opcoes.alvos:
+        alvos = [a for a in alvos if re.search(opcoes.alvos, a.nome)]
+
+    log = lambda mensagem: print(mensagem, flush=True)
+    resultados = []
+
+    log(f"Séries sintéticas {list(tamanhos)} (backends: {', '.join(backends)})")
+    resultados += executar_sinteticos(alvos, tamanhos, opcoes, log)
+
+    if not opcoes.sem_datasets:
+        log("Datasets incluídos")
+        resultados += executar_datasets(alvos, opcoes, log)
+
+    if not opcoes.sem_endpoints and not opcoes.alvos:
+        log("Endpoints de lote")
+        resultados += executar_endpoints(opcoes, log)
+
+    meta = ambiente()
+    meta["backends"] = backends
+    meta["tamanhos"] = list(tamanhos)
+    caminho = salvar_resultado({"meta": meta, "resultados": resultados}, "suite", opcoes.saida)
+    log(f"Resultados gravados em {caminho}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Testes da coalescência de requisições idênticas (app/coalescencia.py)
+Uso: python test_coalescencia.py  (ou python -m pytest test_coalescencia.py)
+"""
+
+import asyncio
+
+from app.coalescencia import Coalescedor
+
+# Tempo máximo para qualquer espera: um teste que trava falha em vez de pendurar
+LIMITE_S = 5
+
+
+def _calculo_lento(liberar, chamadas):
+    """Corrotina que conta as chamadas e só termina quando liberar é setado"""
+    async def calcular(valor):
+        chamadas.append(valor)
+        await liberar.wait()
+        return {"valor": valor}
+    return calcular
+
+
+def test_lider_cancelada_libera_duplicadas():
+    """Cancelar a líder não deixa a duplicada esperando para sempre: ela recalcula"""
+    async def cenario():
+        coalescedor = Coalescedor()
+        liberar = asyncio.Event()
+        chamadas = []
+        calcular = _calculo_lento(liberar, chamadas)
+
+        lider = asyncio.create_task(coalescedor.executar("k", calcular, 1))
+        await asyncio.sleep(0)
+        duplicada = asyncio.create_task(coalescedor.executar("k", calcular, 1))
+        await asyncio.sleep(0)
+        assert coalescedor.estatisticas["coalescidas"] == 1
+
+        lider.cancel()
+        await asyncio.sleep(0)
+        liberar.set()
+        resultado = await asyncio.wait_for(duplicada, LIMITE_S)
+
+        assert lider.cancelled()
+        assert resultado == {"valor": 1}
+        assert len(chamadas) == 2
+        assert coalescedor.resumo()["em_voo"] == 0
+
+    asyncio.run(cenario())
+
+
+def test_duplicada_cancelada_nao_afeta_lider():
+    """Cancelar uma duplicada não cancela a líder nem as outras duplicadas"""
+    async def cenario():
+        coalescedor = Coalescedor()
+        liberar = asyncio.Event()
+        chamadas = []
+        calcular = _calculo_lento(liberar, chamadas)
+
+        lider = asyncio.create_task(coalescedor.executar("k", calcular, 2))
+        await asyncio.sleep(0)
+        cancelada = asyncio.create_task(coalescedor.executar("k", calcular, 2))
+        outra = asyncio.create_task(coalescedor.executar("k", calcular, 2))
+        await asyncio.sleep(0)
+
+        cancelada.cancel()
+        await asyncio.sleep(0)
+        liberar.set()
+        resultados = await asyncio.wait_for(asyncio.gather(lider, outra), LIMITE_S)
+
+        assert cancelada.cancelled()
+        assert resultados == [{"valor": 2}, {"valor": 2}]
+        assert len(chamadas) == 1
+        assert coalescedor.resumo()["em_voo"] == 0
+
+    asyncio.run(cenario())
+
+
+if __name__ == "__main__":
+    for teste in (test_lider_cancelada_libera_duplicadas, test_duplicada_cancelada_nao_afeta_lider):
+        teste()
+        print(f"[OK] {teste.__name__}")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Testes da memória do vencedor por série (app/memoria_series.py)
+Uso: python test_memoria_series.py  (ou python -m pytest test_memoria_series.py)
+"""
+
+import io
+import contextlib
+import threading
+
+import numpy as np
+
+# Os módulos de app/libs imprimem exemplos ao serem importados
+with contextlib.redirect_stdout(io.StringIO()):
+    from app import memoria_series
+
+SERIE = (10 * np.sin(np.arange(60) / 2) + np.arange(60)).tolist()
+
+
+def _zerar():
+    memoria_series.memoria = memoria_series.MemoriaSeries()
+
+
+def test_erro_referencia_nao_finito_conta_como_degradado():
+    """Um erro de referência NaN não se compara: a chamada seguinte refaz o torneio"""
+    _zerar()
+    assert memoria_series.prever(SERIE, 3, "s")["torneio_completo"]
+    memoria_series.memoria.obter("s").erro_referencia = float("nan")
+
+    resultado = memoria_series.prever(SERIE, 3, "s")
+
+    assert resultado["torneio_completo"]
+    assert memoria_series.memoria.estatisticas["degradacoes"] == 1
+    assert np.isfinite(memoria_series.memoria.obter("s").erro_referencia)
+
+
+def test_chamadas_concorrentes_nao_perdem_contagens():
+    """Contadores e chamadas desde o torneio são atualizados sob a trava"""
+    _zerar()
+    memoria_series.prever(SERIE, 3, "s")
+    por_thread, n_threads = 20, 4
+
+    def prever():
+        for _ in range(por_thread):
+            memoria_series.prever(SERIE, 3, "s")
+
+    threads = [threading.Thread(target=prever) for _ in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    estatisticas = memoria_series.memoria.estatisticas
+    assert estatisticas["torneios"] + estatisticas["memoria"] == 1 + por_thread * n_threads
+    assert estatisticas["degradacoes"] == 0
+
+
+if __name__ == "__main__":
+    for teste in (test_erro_referencia_nao_finito_conta_como_degradado,
+                  test_chamadas_concorrentes_nao_perdem_contagens):
+        teste()
+        print(f"[OK] {teste.__name__}")